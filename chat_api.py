@@ -1,16 +1,203 @@
+import functools
+import json
+import math
+import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-from typing import Optional, Tuple, List
+from requests.adapters import HTTPAdapter
+from typing import Iterator, Optional, Tuple, List
 from logger import get_logger
 
+# orjson (tuỳ chọn) serialize payload nhanh hơn json chuẩn; không có thì dùng json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# httpx (tuỳ chọn) hỗ trợ HTTP/2: nhiều lần gửi song song dùng chung một kết nối (multiplex).
+# Chỉ dùng khi bật FPT_CHAT_HTTP2=1; mặc định (hoặc không có httpx) gửi qua _SESSION của requests
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 logger = get_logger()
 
+# Session dùng chung cho mọi lần gửi: giữ kết nối keep-alive tới FPT Chat, không bắt tay TCP/TLS lại mỗi request.
+# Retry do send_message_fpt tự xử lý nên adapter không retry (max_retries=0).
+# Số kết nối tối đa giữ trong pool cũng là giới hạn số luồng của send_message_fpt_many.
+CHAT_POOL_MAXSIZE = 16
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=CHAT_POOL_MAXSIZE, pool_maxsize=CHAT_POOL_MAXSIZE, max_retries=0)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+_DEFAULT_HEADERS = {"Content-Type": "application/json", "accept": "*/*"}
+_SESSION.headers.update(_DEFAULT_HEADERS)
+
+
+@functools.lru_cache(maxsize=1)
+def _http2_client():
+    """httpx.Client HTTP/2 khi bật FPT_CHAT_HTTP2 và có httpx + h2; ngược lại None (gửi qua _SESSION).
+
+    Đọc env ở lần gửi đầu tiên (sau khi .env đã được load), giống _auth_headers.
+    Lưu ý: httpx không đọc REQUESTS_CA_BUNDLE, chỉ dùng proxy/CA theo biến môi trường của chính httpx.
+    """
+    if os.getenv("FPT_CHAT_HTTP2", "").strip().lower() not in ("1", "true", "yes"):
+        return None
+    if httpx is None:
+        logger.warning("FPT_CHAT_HTTP2 is set but httpx is not installed; using requests")
+        return None
+    try:
+        return httpx.Client(
+            http2=True,
+            headers=_DEFAULT_HEADERS,
+            limits=httpx.Limits(max_connections=CHAT_POOL_MAXSIZE, max_keepalive_connections=CHAT_POOL_MAXSIZE),
+        )
+    except ImportError:
+        # httpx cài thiếu extra http2 (gói h2)
+        logger.warning("FPT_CHAT_HTTP2 is set but the h2 package is missing; using requests")
+        return None
+
+# Lỗi mạng của cả hai client đều được retry
+_NETWORK_ERRORS = (requests.RequestException,) + ((httpx.HTTPError,) if httpx is not None else ())
+
+# Backoff giữa các lần retry: base * 2^attempt (giới hạn BACKOFF_MAX_SECONDS) cộng jitter tới 50%
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 8.0
+
+# Lỗi HTTP mà gửi lại cũng không thành công (payload/xác thực/không tìm thấy người nhận) -> không retry
+UNRECOVERABLE_STATUSES = frozenset((400, 401, 403, 404, 422))
+
 
-def _is_allowed_domain(email: str, allowed_domains: list) -> bool:
+@functools.lru_cache(maxsize=8)
+def _allowed_prefixes(allowed_domains: tuple) -> Tuple[str, ...]:
+    """Danh sách domain viết hoa, tính một lần cho mỗi bộ domain."""
+    return tuple(d.upper() for d in allowed_domains)
+
+
+def _is_allowed_domain(email: str, allowed_domains) -> bool:
     if not email or "@" not in email:
         return False
-    domain = email.split("@")[-1]
-    return any(domain.upper().startswith(d.upper()) for d in allowed_domains)
+    domain = email.rpartition("@")[2].upper()
+    # str.startswith nhận tuple prefix -> so khớp trong C, không upper() lại từng domain mỗi lần gọi
+    return domain.startswith(_allowed_prefixes(tuple(allowed_domains)))
+
+
+class _TextPreview:
+    """Bọc text để log: chỉ cắt chuỗi (60 ký tự) khi log thực sự được định dạng."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self) -> str:
+        text = self.text
+        return (text[:60] + "...") if isinstance(text, str) and len(text) > 60 else str(text)
+
+
+@functools.lru_cache(maxsize=1)
+def _auth_headers() -> dict:
+    """Header xác thực từ env FPT_CHAT_TOKEN, đọc một lần ở lần gửi đầu tiên (sau khi .env đã được load)."""
+    chat_token = os.getenv("FPT_CHAT_TOKEN")
+    return {"Authorization": f"Bearer {chat_token}"} if chat_token else {}
+
+
+def reload_token() -> None:
+    """Đọc lại FPT_CHAT_TOKEN ở lần gửi kế tiếp (khi token trong env thay đổi)."""
+    _auth_headers.cache_clear()
+
+
+@functools.lru_cache(maxsize=32)
+def _sanitize_bot_id(bot_id) -> str:
+    """Chuẩn hoá bot_id (bỏ khoảng trắng và '/' hai đầu); bot_id gần như cố định nên kết quả được cache."""
+    return (str(bot_id) if bot_id is not None else "").strip().strip("/")
+
+
+@functools.lru_cache(maxsize=32)
+def _build_url(base_url: str, bot_id: str) -> str:
+    """URL gửi tin nhắn của bot, dựng một lần cho mỗi cặp (base_url, bot_id)."""
+    return f"{base_url.rstrip('/')}/bot/{bot_id}/send-message"
+
+
+def _finite_or_none(value):
+    """Thay NaN/Inf (kể cả lồng trong dict/list) bằng None, giống cách orjson ghi chúng thành null."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite_or_none(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite_or_none(v) for v in value]
+    return value
+
+
+def _encode_payload(payload: dict) -> bytes:
+    """
+    Serialize payload thành body JSON (UTF-8); Content-Type đã có trong header mặc định của _SESSION.
+
+    NaN/Inf được ghi thành null ở cả hai nhánh (orjson làm vậy sẵn; json chuẩn thì thay trước khi ghi),
+    không bao giờ raise ValueError hay sinh ra JSON không hợp lệ.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    try:
+        return json.dumps(payload, allow_nan=False).encode("utf-8")
+    except ValueError:
+        return json.dumps(_finite_or_none(payload), allow_nan=False).encode("utf-8")
+
+
+def _backoff(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_MAX_SECONDS) -> float:
+    """Thời gian chờ trước lần thử tiếp theo: luỹ thừa 2 có giới hạn + jitter ngẫu nhiên (tránh các luồng retry cùng lúc)."""
+    return min(cap, base * 2 ** attempt) * (1 + random.random() * 0.5)
+
+
+def _post_with_retry(
+    url: str,
+    payload: dict,
+    headers: dict,
+    timeout: int,
+    attempts: int,
+    label: str,
+    target,
+) -> Tuple[bool, dict]:
+    """POST payload tới FPT Chat, thử tối đa `attempts` lần; dừng sớm với lỗi HTTP không thể khắc phục bằng retry."""
+    kind = "emails" if "userEmails" in payload else "group"
+    last_error: dict = {}
+    # Encode một lần, dùng lại cho mọi lần retry
+    body = _encode_payload(payload)
+    # Payload không đổi giữa các lần thử nên chỉ log một lần; tham số truyền lazy, chỉ định dạng khi log level là DEBUG
+    logger.debug("Send ({}): to={} payload({})={}", label, target, kind, payload)
+    for attempt in range(1, attempts + 1):
+        try:
+            logger.debug("Attempt {} ({})", attempt, label)
+            http2_client = _http2_client()
+            if http2_client is not None:
+                resp = http2_client.post(url, content=body, headers=headers, timeout=timeout)
+            else:
+                resp = _SESSION.post(url, data=body, headers=headers, timeout=timeout)
+            # Kiểm tra 2xx theo status_code (httpx.Response không có thuộc tính .ok)
+            if 200 <= resp.status_code < 300:
+                logger.info("Sent message to {} {}", kind, target)
+                # Bot ack thường không có body: Content-Length: 0 thì không cần đọc/parse body
+                if resp.headers.get("Content-Length") == "0":
+                    return True, {"status": resp.status_code}
+                try:
+                    return True, resp.json()
+                except ValueError:
+                    return True, {"status": resp.status_code, "text": resp.text} if resp.content else {"status": resp.status_code}
+            last_error = {"status": resp.status_code, "detail": resp.text}
+            logger.warning("Chat API non-200 ({}): {}", label, last_error)
+            if resp.status_code in UNRECOVERABLE_STATUSES:
+                logger.warning("Stop retrying ({}): HTTP {} is not recoverable", label, resp.status_code)
+                break
+        except _NETWORK_ERRORS as e:
+            last_error = {"error": str(e)}
+            logger.warning("Network issue ({}) attempt={}: {}", label, attempt, e)
+        if attempt < attempts:
+            time.sleep(_backoff(attempt))
+    return False, last_error
 
 
 def send_message_fpt(
@@ -26,132 +213,57 @@ def send_message_fpt(
 
     Tries userEmails first; if not successful and group_id is provided, retries with groupId.
     """
-    # Print inputs (mask text to preview only)
-    text_preview = (text[:60] + "...") if isinstance(text, str) and len(text) > 60 else text
-    print(f"[Chat] INPUT base_url={base_url} bot_id={bot_id} text='{text_preview}' emails={user_emails} group_id={group_id} retries={max_retries} timeout={timeout}")
-    bot_id_sanitized = (str(bot_id) if bot_id is not None else "").strip().strip("/")
+    logger.debug(
+        "INPUT base_url={} bot_id={} text='{}' emails={} group_id={} retries={} timeout={}",
+        base_url, bot_id, _TextPreview(text), user_emails, group_id, max_retries, timeout,
+    )
+    bot_id_sanitized = _sanitize_bot_id(bot_id)
     if not bot_id_sanitized:
         err = {"error": "Missing FPT_CHAT_BOT_ID"}
         logger.error("Chat API missing bot_id (FPT_CHAT_BOT_ID)")
-        print("[Chat] ERROR: missing bot_id (FPT_CHAT_BOT_ID)")
         return False, err
-    url = f"{base_url.rstrip('/')}/bot/{bot_id_sanitized}/send-message"
-    headers = {"Content-Type": "application/json", "accept": "*/*"}
-    # Optional bearer token support via env FPT_CHAT_TOKEN
-    chat_token = os.getenv("FPT_CHAT_TOKEN") if 'os' in globals() else None
-    try:
-        import os as _os
-        chat_token = chat_token or _os.getenv("FPT_CHAT_TOKEN")
-    except Exception:
-        pass
-    if chat_token:
-        headers["Authorization"] = f"Bearer {chat_token}"
-    logger.info(f"Chat API URL: {url}")
-    print(f"[Chat] POST {url}")
-
-    last_error: Optional[dict] = None
+    url = _build_url(base_url, bot_id_sanitized)
+    # Content-Type/accept đã nằm trong header mặc định của _SESSION; bearer token (tuỳ chọn) lấy từ cache
+    headers = _auth_headers()
+    logger.info("Chat API URL: {}", url)
 
     # Case A: both email and group provided -> ưu tiên email 1 lần, lỗi thì chuyển qua group (retries)
     if user_emails and group_id:
-        # one-shot email
-        payload_email = {"userEmails": user_emails, "text": text}
-        try:
-            logger.debug(f"Attempt 1 (emails, prefer-first): to={user_emails}")
-            print(f"[Chat] attempt=1 via emails (prefer-first) -> {len(user_emails)} recipients")
-            print(f"[Chat] payload(emails)={payload_email}")
-            resp = requests.post(url, json=payload_email, headers=headers, timeout=timeout)
-            if resp.status_code == 200:
-                logger.info(f"Sent message to emails {user_emails}")
-                print(f"[Chat] -> {resp.status_code}")
-                try:
-                    return True, resp.json() if resp.content else {"status": resp.status_code}
-                except Exception:
-                    return True, {"status": resp.status_code, "text": resp.text}
-            last_error = {"status": resp.status_code, "detail": resp.text}
-            logger.warning(f"Chat API non-200 (emails prefer-first): {last_error}")
-            print(f"[Chat] -> {resp.status_code}: {resp.text[:120]}")
-        except requests.RequestException as e:
-            last_error = {"error": str(e)}
-            logger.warning(f"Network issue (emails prefer-first): {e}")
-            print(f"[Chat] network error (emails prefer-first): {e}")
-
-        # fallback group with retries
-        payload_group = {"groupId": group_id, "text": text}
-        for attempt in range(1, max_retries + 1):
-            try:
-                logger.debug(f"Attempt {attempt} (group fallback): groupId={group_id}")
-                print(f"[Chat] attempt={attempt} via group (fallback) -> {group_id}")
-                print(f"[Chat] payload(group)={payload_group}")
-                resp = requests.post(url, json=payload_group, headers=headers, timeout=timeout)
-                if resp.status_code == 200:
-                    logger.info(f"Sent message to group {group_id}")
-                    print(f"[Chat] -> {resp.status_code}")
-                    try:
-                        return True, resp.json() if resp.content else {"status": resp.status_code}
-                    except Exception:
-                        return True, {"status": resp.status_code, "text": resp.text}
-                last_error = {"status": resp.status_code, "detail": resp.text}
-                logger.warning(f"Chat API non-200 (group fallback): {last_error}")
-                print(f"[Chat] -> {resp.status_code}: {resp.text[:120]}")
-            except requests.RequestException as e:
-                last_error = {"error": str(e)}
-                logger.warning(f"Network issue (group fallback) attempt={attempt}: {e}")
-                print(f"[Chat] network error (group fallback) attempt={attempt}: {e}")
-            time.sleep(min(2 ** attempt, 8))
-        return False, last_error or {}
+        ok, result = _post_with_retry(url, {"userEmails": user_emails, "text": text}, headers, timeout, 1, "emails, prefer-first", user_emails)
+        if ok:
+            return True, result
+        return _post_with_retry(url, {"groupId": group_id, "text": text}, headers, timeout, max_retries, "group fallback", group_id)
 
     # Case B: only emails -> retries on emails
     if user_emails:
-        payload = {"userEmails": user_emails, "text": text}
-        for attempt in range(1, max_retries + 1):
-            try:
-                logger.debug(f"Attempt {attempt} (emails): to={user_emails}")
-                print(f"[Chat] attempt={attempt} via emails -> {len(user_emails)} recipients")
-                print(f"[Chat] payload(emails)={payload}")
-                resp = requests.post(url, json=payload, headers=headers, timeout=timeout)
-                if resp.status_code == 200:
-                    logger.info(f"Sent message to emails {user_emails}")
-                    print(f"[Chat] -> {resp.status_code}")
-                    try:
-                        return True, resp.json() if resp.content else {"status": resp.status_code}
-                    except Exception:
-                        return True, {"status": resp.status_code, "text": resp.text}
-                last_error = {"status": resp.status_code, "detail": resp.text}
-                logger.warning(f"Chat API non-200 (emails): {last_error}")
-                print(f"[Chat] -> {resp.status_code}: {resp.text[:120]}")
-            except requests.RequestException as e:
-                last_error = {"error": str(e)}
-                logger.warning(f"Network issue on attempt {attempt} (emails): {e}")
-                print(f"[Chat] network error (emails) attempt={attempt}: {e}")
-            time.sleep(min(2 ** attempt, 8))
-        return False, last_error or {}
+        return _post_with_retry(url, {"userEmails": user_emails, "text": text}, headers, timeout, max_retries, "emails", user_emails)
 
     # Case C: only group -> retries on group
     if group_id:
-        payload = {"groupId": group_id, "text": text}
-        for attempt in range(1, max_retries + 1):
-            try:
-                logger.debug(f"Attempt {attempt} (group): groupId={group_id}")
-                print(f"[Chat] attempt={attempt} via group -> {group_id}")
-                print(f"[Chat] payload(group)={payload}")
-                resp = requests.post(url, json=payload, headers=headers, timeout=timeout)
-                if resp.status_code == 200:
-                    logger.info(f"Sent message to group {group_id}")
-                    print(f"[Chat] -> {resp.status_code}")
-                    try:
-                        return True, resp.json() if resp.content else {"status": resp.status_code}
-                    except Exception:
-                        return True, {"status": resp.status_code, "text": resp.text}
-                last_error = {"status": resp.status_code, "detail": resp.text}
-                logger.warning(f"Chat API non-200 (group): {last_error}")
-                print(f"[Chat] -> {resp.status_code}: {resp.text[:120]}")
-            except requests.RequestException as e:
-                last_error = {"error": str(e)}
-                logger.warning(f"Network issue on attempt {attempt} (group): {e}")
-                print(f"[Chat] network error (group) attempt={attempt}: {e}")
-            time.sleep(min(2 ** attempt, 8))
-        return False, last_error or {}
+        return _post_with_retry(url, {"groupId": group_id, "text": text}, headers, timeout, max_retries, "group", group_id)
 
     # Case D: neither provided
     return False, {"error": "No recipients: both user_emails and group_id are empty"}
 
+
+def iter_send_message_fpt(items: List[dict], max_workers: int = CHAT_POOL_MAXSIZE) -> Iterator[Tuple[int, Tuple[bool, dict]]]:
+    """Gửi nhiều tin nhắn song song, trả về (vị trí item, kết quả) ngay khi từng tin gửi xong (thứ tự hoàn thành).
+
+    Mỗi item là kwargs của send_message_fpt. Số luồng không vượt quá CHAT_POOL_MAXSIZE để các luồng
+    không phải chờ/mở thêm kết nối ngoài pool của _SESSION.
+    """
+    if not items:
+        return
+    workers = max(1, min(max_workers, CHAT_POOL_MAXSIZE, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(send_message_fpt, **item): i for i, item in enumerate(items)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def send_message_fpt_many(items: List[dict], max_workers: int = CHAT_POOL_MAXSIZE) -> List[Tuple[bool, dict]]:
+    """Gửi nhiều tin nhắn song song; kết quả trả về theo đúng thứ tự items (xem iter_send_message_fpt)."""
+    results = [None] * len(items)
+    for i, result in iter_send_message_fpt(items, max_workers):
+        results[i] = result
+    return results
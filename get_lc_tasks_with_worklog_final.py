@@ -1,8 +1,10 @@
 import pandas as pd
+import numpy as np
 import requests
 from requests.auth import HTTPBasicAuth
 import urllib.parse
 from datetime import datetime, timedelta
+import io
 import os
 from dotenv import load_dotenv
 import json
@@ -10,6 +12,48 @@ import sys
 import time
 import re
 import csv
+import heapq
+import math
+from operator import itemgetter
+from collections import defaultdict
+
+# python-calamine (tuỳ chọn) đọc Excel bằng Rust, nhanh hơn nhiều so với openpyxl; không có thì để pandas tự chọn engine
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = None
+
+# Số task tối thiểu để gộp thống kê nhân viên bằng NumPy; dưới ngưỡng này vòng lặp Python nhanh hơn
+VECTORIZE_MIN_TASKS = 5000
+
+# Mẫu dòng cho các bảng Top N trong báo cáo (format spec được parse một lần khi import)
+EMP_ROW_FMT = "{idx:<5}{name:<30}{total:<15}{no_lw:<15}{ratio:.1f}%\n"
+EMP_LOGWORK_ROW_FMT = "{idx:<5}{name:<30}{total:<15}{actual:.1f} giờ\n"
+EMP_SAVING_ROW_FMT = "{idx:<5}{name:<30}{estimated:.1f}h          {actual:.1f}h          {saved:.1f}h          {ratio:.1f}%\n"
+SUMMARY_LOGWORK_RATIO_ROW_FMT = "{idx:<5}{name:<30}{projects:<10}{total:<10}{with_lw:<10}{ratio:.1f}%     {actual:.1f}h\n"
+SUMMARY_SAVING_ROW_FMT = "{idx:<5}{name:<30}{total:<10}{estimated:.1f}h     {actual:.1f}h     {saved:.1f}h     {ratio:.1f}%\n"
+SUMMARY_NO_LOGWORK_ROW_FMT = "{idx:<5}{name:<30}{projects:<10}{total:<10}{no_lw:<10}{ratio:.1f}%\n"
+
+# Các dự án không đưa vào báo cáo tổng hợp
+EXCLUDED_PROJECTS = frozenset({"FC", "IMS"})
+
+# Các dòng phân cách dùng lại trong báo cáo
+_EQ80 = "=" * 80 + "\n"
+_DASH60 = "-" * 60 + "\n"
+_DASH70 = "-" * 70 + "\n"
+_DASH75 = "-" * 75 + "\n"
+_DASH80 = "-" * 80 + "\n"
+_DASH85 = "-" * 85 + "\n"
+_DASH90 = "-" * 90 + "\n"
+
+# Dòng dự án trong bảng của báo cáo tổng hợp và ba dòng tổng của báo cáo dự án (synchronize_reports)
+_SUMMARY_ROW_RE = re.compile(r"^\|\s+(.+?)\s+\|\s+(\d+)\s+\|\s+(\d+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\d+)\s+\|", re.MULTILINE)
+_PROJECT_TOTALS_RE = re.compile(
+    r"(?P<est>- Tổng thời gian ước tính: [\d\.]+ giờ)"
+    r"|(?P<act>- Tổng thời gian thực tế: [\d\.]+ giờ)"
+    r"|(?P<save>- Thời gian tiết kiệm: [\d\.]+ giờ \([\d\.]+%\))"
+)
 
 def get_worklog(issue_key, jira_url, username, password):
     """
@@ -909,6 +953,13 @@ def format_time_duration(seconds):
             return f"{hours} giờ {minutes} phút {secs} giây"
         
 
+def _employee_rows(df):
+    """Duyệt (index, tên, email, SKILL_GROUP, PROJECTNAME) của DataFrame nhân viên; cột được chọn một lần, không tạo Series cho từng dòng"""
+    def column(name, default):
+        return df[name].tolist() if name in df.columns else [default] * len(df)
+    return zip(df.index, column('NAME', 'Không có tên'), column('EMAIL', ''),
+               column('SKILL_GROUP', 'Không xác định'), column('PROJECTNAME', 'Không xác định'))
+
 
 def main():
     print("=== LẤY DANH SÁCH TASK VÀ LOG WORK CỦA NHÂN VIÊN LC TỪ JIRA ===")
@@ -932,7 +983,7 @@ def main():
     
     # Chọn sheet từ file Excel
     try:
-        excel_info = pd.ExcelFile(excel_file)
+        excel_info = pd.ExcelFile(excel_file, engine=EXCEL_ENGINE)
         sheet_names = excel_info.sheet_names
         print(f"File Excel có {len(sheet_names)} sheet: {', '.join(sheet_names)}")
         
@@ -949,7 +1000,7 @@ def main():
             print(f"Sử dụng sheet: {sheet_name}")
         
         # Đọc dữ liệu từ sheet
-        df = pd.read_excel(excel_file, sheet_name=sheet_name)
+        df = pd.read_excel(excel_file, sheet_name=sheet_name, engine=EXCEL_ENGINE)
         print(f"✅ Đã đọc thành công file Excel với {len(df)} bản ghi")
         
         # Kiểm tra và chuyển đổi tên cột nếu cần
@@ -1130,7 +1181,7 @@ def main():
     
     try:
         # Đọc file Excel
-        df = pd.read_excel(excel_file, sheet_name=sheet_name)
+        df = pd.read_excel(excel_file, sheet_name=sheet_name, engine=EXCEL_ENGINE)
         print(f"✅ Đã đọc thành công file Excel với {len(df)} bản ghi")
         
         # Kiểm tra cột EMAIL
@@ -1237,11 +1288,7 @@ def main():
         if removed_by_duplication > 0:
             print("\n📋 DANH SÁCH NHÂN VIÊN BỊ LOẠI BỎ DO TRÙNG LẶP EMAIL:")
             duplicate_df = df_before_dedup[df_before_dedup.duplicated(subset=['EMAIL'], keep='first')]
-            for idx, row in duplicate_df.iterrows():
-                name = row.get('NAME', 'Không có tên')
-                email = row.get('EMAIL', '')
-                skill_group = row.get('SKILL_GROUP', 'Không xác định')
-                project_name = row.get('PROJECTNAME', 'Không xác định')
+            for idx, name, email, skill_group, project_name in _employee_rows(duplicate_df):
                 print(f"  {idx+1}. {name} ({email}) - SKILL: {skill_group}, PROJECT: {project_name}")
         
         # Loại trừ một số SKILL_GROUP không mong muốn
@@ -1281,11 +1328,7 @@ def main():
                     print(f"  - {skill}: {count} nhân viên")
                 
                 print("\nDanh sách chi tiết:")
-                for idx, row in excluded_employees_by_skill.iterrows():
-                    name = row.get('NAME', 'Không có tên')
-                    email = row.get('EMAIL', '')
-                    skill_group = row.get('SKILL_GROUP', 'Không xác định')
-                    project_name = row.get('PROJECTNAME', 'Không xác định')
+                for idx, name, email, skill_group, project_name in _employee_rows(excluded_employees_by_skill):
                     print(f"  {idx+1}. {name} ({email}) - SKILL: {skill_group}, PROJECT: {project_name}")
             
             print(f"ℹ️ Còn lại {len(df)} nhân viên sau khi lọc theo SKILL_GROUP")
@@ -1335,11 +1378,7 @@ def main():
             # Hiển thị danh sách bị loại theo email
             if removed_by_email > 0:
                 print("\n📋 DANH SÁCH NHÂN VIÊN BỊ LOẠI BỎ THEO EMAIL:")
-                for idx, row in excluded_employees_by_email.iterrows():
-                    name = row.get('NAME', 'Không có tên')
-                    email = row.get('EMAIL', '')
-                    skill_group = row.get('SKILL_GROUP', 'Không xác định') if 'SKILL_GROUP' in row else 'Không xác định'
-                    project_name = row.get('PROJECTNAME', 'Không xác định') if 'PROJECTNAME' in row else 'Không xác định'
+                for idx, name, email, skill_group, project_name in _employee_rows(excluded_employees_by_email):
                     print(f"  {idx+1}. {name} ({email}) - SKILL: {skill_group}, PROJECT: {project_name}")
         
         if not_found_emails:
@@ -1413,11 +1452,12 @@ def main():
             if exclude_emails_input.strip() and found_emails:
                 f.write(f"Loại bỏ {len(found_emails)} email: {', '.join(found_emails)}\n")
                 
-            f.write(f"Số nhân viên ban đầu: {len(pd.read_excel(excel_file, sheet_name=sheet_name))}\n")
-            f.write(f"Số nhân viên sau khi loại bỏ trùng lặp: {len(pd.read_excel(excel_file, sheet_name=sheet_name).drop_duplicates(subset=['EMAIL']))}\n")
+            # Dùng lại DataFrame đã đọc (original_df) thay vì đọc lại file Excel nhiều lần
+            dedup_df = original_df.drop_duplicates(subset=['EMAIL'])
+            f.write(f"Số nhân viên ban đầu: {original_count}\n")
+            f.write(f"Số nhân viên sau khi loại bỏ trùng lặp: {len(dedup_df)}\n")
             if 'SKILL_GROUP' in df.columns:
-                csv_df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                csv_df = csv_df.drop_duplicates(subset=['EMAIL'])
+                csv_df = dedup_df
                 filtered_df = csv_df[~csv_df['SKILL_GROUP'].isin(excluded_skills)]
                 f.write(f"Số nhân viên sau khi lọc SKILL_GROUP: {len(filtered_df)}\n")
             
@@ -1678,31 +1718,35 @@ def main():
                                 parent_to_children[parent_key] = []
                             parent_to_children[parent_key].append(task)
 
-                    for task in tasks:
-                        task_key = task.get('key')
-                        if not task.get('is_subtask') and task_key in parent_to_children:
-                            if not task.get('has_worklog'):  # Nếu task cha chưa có logwork
-                                children_with_logwork = [child for child in parent_to_children[task_key] if child.get('has_worklog', False)]
-                                if children_with_logwork:  # Nếu có ít nhất một task con có logwork
-                                    # Đánh dấu task cha là có logwork
-                                    task['has_worklog'] = True
-                                    task['has_child_with_logwork'] = True  # Thêm trường để đánh dấu
+                    tasks_by_key = {task['key']: task for task in tasks if task.get('key')}
+                    for task_key, children in parent_to_children.items():
+                        task = tasks_by_key.get(task_key)
+                        if task is None or task.get('is_subtask'):
+                            continue
+                        children_total_hours = 0
+                        any_child_logwork = False
+                        for child in children:
+                            if child.get('has_worklog', False):
+                                children_total_hours += child.get('total_hours', 0) or 0
+                                any_child_logwork = True
+                        if not task.get('has_worklog'):  # Nếu task cha chưa có logwork
+                            if any_child_logwork:  # Nếu có ít nhất một task con có logwork
+                                # Đánh dấu task cha là có logwork
+                                task['has_worklog'] = True
+                                task['has_child_with_logwork'] = True  # Thêm trường để đánh dấu
+                                
+                                # Cập nhật time_saved_hours nếu đang là -1 (không có logwork)
+                                if task.get('time_saved_hours', -1) == -1:
+                                    # Cập nhật thời gian thực tế cho task cha (tổng từ các task con)
+                                    if task.get('total_hours', 0) == 0:  # Chỉ cập nhật nếu task cha chưa có giá trị
+                                        task['total_hours'] = children_total_hours
                                     
-                                    # Cập nhật time_saved_hours nếu đang là -1 (không có logwork)
-                                    if task.get('time_saved_hours', -1) == -1:
-                                        # Tính tổng thời gian thực tế từ các task con
-                                        children_total_hours = sum(child.get('total_hours', 0) for child in children_with_logwork)
-                                        
-                                        # Cập nhật thời gian thực tế cho task cha
-                                        if task.get('total_hours', 0) == 0:  # Chỉ cập nhật nếu task cha chưa có giá trị
-                                            task['total_hours'] = children_total_hours
-                                        
-                                        # Nếu task cha có estimate, tính time_saved_hours
-                                        if task.get('original_estimate_hours', 0) > 0:
-                                            task['time_saved_hours'] = task.get('original_estimate_hours', 0) - task.get('total_hours', 0)
-                                        else:
-                                            # Nếu không có estimate, đặt thành 0 (không tiết kiệm)
-                                            task['time_saved_hours'] = 0
+                                    # Nếu task cha có estimate, tính time_saved_hours
+                                    if task.get('original_estimate_hours', 0) > 0:
+                                        task['time_saved_hours'] = task.get('original_estimate_hours', 0) - task.get('total_hours', 0)
+                                    else:
+                                        # Nếu không có estimate, đặt thành 0 (không tiết kiệm)
+                                        task['time_saved_hours'] = 0
                 # Lưu tasks của nhân viên này vào file riêng
                 employee_file = f"{result_dir}/{email.split('@')[0]}_{timestamp}.csv"
                 
@@ -2395,9 +2439,13 @@ def main():
                     f.write(f"• Tổng thời gian chênh lệch: -{abs(total_time_saved):.2f} giờ\n\n")
                 
                 f.write("DANH SÁCH NHÂN VIÊN ĐÃ XỬ LÝ:\n")
-                for idx, row in df.iterrows():
-                    name = row.get('NAME', 'Không có tên')
-                    email = row.get('EMAIL', '')
+                # Lấy cột một lần thay vì tạo Series cho từng dòng bằng iterrows
+                names = df['NAME'].tolist() if 'NAME' in df.columns else ['Không có tên'] * len(df)
+                emails = df['EMAIL'].tolist()
+                # Bảng tra email theo tên (giữ dòng đầu tiên như next(...) trước đây)
+                email_by_name = {}
+                for name, email in zip(names, emails):
+                    email_by_name.setdefault(name, email)
                     task_count = employee_task_counts.get(name, 0)
                     worklog_hours = employee_worklog_hours.get(name, 0)
                     f.write(f"• {name} ({email}): {task_count} task, {worklog_hours:.2f} giờ log work\n")
@@ -2436,7 +2484,7 @@ def main():
                     if name not in employee_task_counts or employee_task_counts[name] == 0:
                         continue
                         
-                    email = next((row.get('EMAIL', '') for idx, row in df.iterrows() if row.get('NAME', '') == name), '')
+                    email = email_by_name.get(name, '') if 'NAME' in df.columns else ''
                     task_count = employee_task_counts.get(name, 0)
                     worklog_task_count = employee_worklog_tasks.get(name, 0)
                     worklog_hours = employee_worklog_hours.get(name, 0)
@@ -2990,7 +3038,9 @@ def main():
         # Tạo báo cáo cho từng dự án
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         success_count = 0
-        
+        project_totals = {}
+        # all_tasks dùng chung cho mọi báo cáo: chỉ cập nhật task cha từ task con ở lần gọi đầu tiên
+        all_tasks_rolled_up = False
         
         for project_name, count in actual_projects.items():
             # KIỂM TRA CUỐI CÙNG: Không tạo báo cáo riêng cho IMS
@@ -3008,8 +3058,9 @@ def main():
             project_report_file = os.path.join(project_reports_dir, f"{safe_project_name}_{timestamp}.txt")
             
             # Tạo báo cáo dự án
-            if create_project_report(project_name, all_tasks, employee_detailed_stats, project_report_file):
+            if create_project_report(project_name, all_tasks, employee_detailed_stats, project_report_file, project_totals=project_totals, rolled_up=all_tasks_rolled_up):
                 success_count += 1
+            all_tasks_rolled_up = True
         
         print(f"✅ Đã tạo {success_count}/{len(actual_projects)} báo cáo dự án trong thư mục: {project_reports_dir}")
             
@@ -3017,16 +3068,12 @@ def main():
         summary_report_file = os.path.join(project_reports_dir, f"all_projects_summary_{timestamp}.txt")
         summary_csv_file = os.path.join(project_reports_dir, f"all_projects_summary_{timestamp}.csv")
         
-        project_stats_for_comparison = create_projects_summary_report(all_tasks, summary_report_file, summary_csv_file)
+        project_stats_for_comparison = create_projects_summary_report(all_tasks, summary_report_file, summary_csv_file, rolled_up=all_tasks_rolled_up)
         
         # Kiểm tra tính nhất quán giữa báo cáo tổng hợp và báo cáo chi tiết dự án
         if project_stats_for_comparison:
-            # Lấy tất cả các file trong thư mục, ngoại trừ file báo cáo tổng hợp
-            project_report_files = [os.path.join(project_reports_dir, f) for f in os.listdir(project_reports_dir) 
-                                    if not f.startswith("all_projects_summary")]
-            
-            # Kiểm tra tính nhất quán
-            is_consistent = check_consistency(project_stats_for_comparison, project_report_files)
+            # Kiểm tra tính nhất quán với số liệu đã giữ lại khi tạo từng báo cáo dự án
+            is_consistent = check_consistency(project_stats_for_comparison, project_totals)
             
             if not is_consistent:
                 print("\n⚠️ Cần kiểm tra lại báo cáo chi tiết dự án và tổng hợp!")
@@ -3468,7 +3515,44 @@ def calculate_saved_time(estimated_hours, actual_hours):
     saving_ratio = (saved_hours / estimated_hours * 100) if estimated_hours > 0 else 0
     return saved_hours, saving_ratio
 
-def create_employee_detailed_report(employee_name, employee_email, tasks, output_file):
+def calculate_saved_time_array(estimated_hours, actual_hours):
+    """
+    Tính thời gian tiết kiệm cho nhiều task cùng lúc bằng NumPy (cùng công thức với calculate_saved_time)
+    
+    Args:
+        estimated_hours (list): Danh sách thời gian ước tính (giờ)
+        actual_hours (list): Danh sách thời gian thực tế (giờ)
+        
+    Returns:
+        tuple: (mảng thời gian tiết kiệm, mảng tỷ lệ tiết kiệm %)
+    """
+    est_arr = np.asarray(estimated_hours, dtype=np.float64)
+    act_arr = np.asarray(actual_hours, dtype=np.float64)
+    saved_arr = est_arr - act_arr
+    ratio_arr = np.divide(saved_arr, est_arr, out=np.zeros_like(est_arr), where=est_arr > 0) * 100
+    return saved_arr, ratio_arr
+
+def _write_report_file(output_file, content):
+    """
+    Ghi nội dung báo cáo ra file bằng os.write trên file descriptor thô
+    
+    Nội dung được encode UTF-8 một lần rồi ghi thẳng xuống fd, không qua lớp
+    TextIOWrapper/BufferedWriter (không khóa, không encoder theo từng lần ghi).
+    
+    Args:
+        output_file (str): Đường dẫn đến file báo cáo
+        content (str): Toàn bộ nội dung báo cáo
+    """
+    data = memoryview(content.encode('utf-8'))
+    fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        written = 0
+        while written < len(data):
+            written += os.write(fd, data[written:])
+    finally:
+        os.close(fd)
+
+def create_employee_detailed_report(employee_name, employee_email, tasks, output_file, include_task_details=True, rolled_up=False):
     """
     Tạo báo cáo chi tiết về task của một nhân viên và lưu vào file txt
     
@@ -3477,26 +3561,44 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
         employee_email (str): Email hoặc tài khoản của nhân viên
         tasks (list): Danh sách các task của nhân viên
         output_file (str): Đường dẫn đến file báo cáo
+        include_task_details (bool): Có ghi phần danh sách task chi tiết (kèm log work) hay không
+        rolled_up (bool): True nếu tasks đã được cập nhật logwork/estimate từ task con (bỏ qua bước cập nhật)
     """
     try:
          # Cập nhật trạng thái logwork cho task cha trước khi tạo báo cáo
-        parent_to_children = {}
-        for task in tasks:
-            if task.get('is_subtask') and task.get('parent_key'):
-                parent_key = task.get('parent_key')
-                if parent_key not in parent_to_children:
-                    parent_to_children[parent_key] = []
-                parent_to_children[parent_key].append(task)
-        
-        # Cập nhật trạng thái task cha dựa trên task con
-        for task in tasks:
-            task_key = task.get('key')
-            if task_key in parent_to_children:  # Nếu task này là task cha có con
-                children = parent_to_children[task_key]
+        if not rolled_up:
+            parent_to_children = {}
+            for task in tasks:
+                if task.get('is_subtask') and task.get('parent_key'):
+                    parent_key = task.get('parent_key')
+                    if parent_key not in parent_to_children:
+                        parent_to_children[parent_key] = []
+                    parent_to_children[parent_key].append(task)
+            
+            # Cập nhật trạng thái task cha dựa trên task con
+            # Chỉ duyệt các task cha có con (O(P)) thay vì quét toàn bộ danh sách task
+            tasks_by_key = {task['key']: task for task in tasks if task.get('key')}
+            # Task cha cần tính thời gian tiết kiệm, gom lại để tính một lần sau vòng lặp
+            saving_parents = []
+            saving_estimates = []
+            saving_actuals = []
+            for task_key, children in parent_to_children.items():
+                task = tasks_by_key.get(task_key)
+                if task is None:  # Task cha không nằm trong danh sách hiện tại
+                    continue
+                
+                # Gộp các phép cộng trên task con vào một lượt duyệt duy nhất
+                total_child_estimate = 0
+                total_child_time = 0
+                any_child_logwork = False
+                for child in children:
+                    total_child_estimate += child.get('original_estimate_hours', 0) or 0
+                    if child.get('has_worklog', False):
+                        total_child_time += child.get('total_hours', 0) or 0
+                        any_child_logwork = True
                 
                 # Nếu task cha không có estimate nhưng các task con có estimate
                 if task.get('original_estimate_hours', 0) == 0:
-                    total_child_estimate = sum(child.get('original_estimate_hours', 0) for child in children)
                     if total_child_estimate > 0:
                         # Cập nhật estimate cho task cha từ tổng estimate của các task con
                         task['original_estimate_hours'] = total_child_estimate
@@ -3505,24 +3607,18 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
                 
                 # Kiểm tra và cập nhật trạng thái logwork
                 if not task.get('has_worklog'):  # Nếu task cha chưa có log work
-                    children_with_logwork = [child for child in children if child.get('has_worklog', False)]
-                    if children_with_logwork:  # Nếu có ít nhất một task con đã log work
+                    if any_child_logwork:  # Nếu có ít nhất một task con đã log work
                         # Đánh dấu task cha là đã log work
                         task['has_worklog'] = True
                         task['has_child_with_logwork'] = True  # Thêm trường để đánh dấu
                         
                         # Quan trọng: Cập nhật time_saved_hours nếu đang là -1 (không có logwork)
                         if task.get('time_saved_hours', -1) == -1:
-                            # Tính tổng thời gian từ các task con
-                            total_child_time = sum(child.get('total_hours', 0) for child in children_with_logwork)
-                            
                             # Cập nhật thời gian thực tế cho task cha từ tổng thời gian của các task con
                             task['total_hours'] = total_child_time
                             
                             # Nếu task cha không có estimate nhưng các task con có estimate
                             if task.get('original_estimate_hours', 0) == 0:
-                                # Tính tổng estimate từ task con
-                                total_child_estimate = sum(child.get('original_estimate_hours', 0) for child in children)
                                 if total_child_estimate > 0:
                                     # Cập nhật estimate cho task cha
                                     task['original_estimate_hours'] = total_child_estimate
@@ -3531,14 +3627,21 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
                             
                             # Sau đó tính time_saved_hours
                             if task.get('original_estimate_hours', 0) > 0:
-                                saved_hours, saving_ratio = calculate_saved_time(task.get('original_estimate_hours', 0), total_child_time)
-                                task['time_saved_hours'] = saved_hours
-                                task['time_saved_percent'] = saving_ratio
-                                print(f"   ℹ️ Cập nhật time_saved_hours cho task cha {task_key} từ task con: {saved_hours:.2f}h ({saving_ratio:.1f}%)")
+                                saving_parents.append(task)
+                                saving_estimates.append(task.get('original_estimate_hours', 0) or 0)
+                                saving_actuals.append(total_child_time)
                             else:
                                 # Nếu thực sự không có estimate nào (cả cha và con đều không có)
                                 task['time_saved_hours'] = -2  # Đánh dấu đặc biệt: có logwork nhưng không có estimate
                                 print(f"   ℹ️ Task cha {task_key} đã được đánh dấu có logwork (từ task con) nhưng không có estimate")
+            
+            # Tính thời gian tiết kiệm cho tất cả task cha trong một phép tính NumPy
+            if saving_parents:
+                saved_arr, ratio_arr = calculate_saved_time_array(saving_estimates, saving_actuals)
+                for task, saved_hours, saving_ratio in zip(saving_parents, saved_arr.tolist(), ratio_arr.tolist()):
+                    task['time_saved_hours'] = saved_hours
+                    task['time_saved_percent'] = saving_ratio
+                    print(f"   ℹ️ Cập nhật time_saved_hours cho task cha {task['key']} từ task con: {saved_hours:.2f}h ({saving_ratio:.1f}%)")
 
 
 
@@ -3690,23 +3793,23 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
         total_saved_hours = sum(max(0, task.get('time_saved_hours', 0)) for task in tasks if task.get('time_saved_hours', 0) > 0)
         saved_percentage = (total_saved_hours / total_estimate_hours * 100) if total_estimate_hours > 0 else 0
         
-        # Tạo báo cáo
-        with open(output_file, 'w', encoding='utf-8') as f:
+        # Tạo báo cáo: gom nội dung trong bộ nhớ rồi encode + ghi một lần
+        with io.StringIO() as f:
             # Header trang trí
-            f.write("=" * 80 + "\n")
+            f.write(_EQ80)
             f.write(f"{'BÁO CÁO CHI TIẾT CÔNG VIỆC NHÂN VIÊN':^80}\n")
             f.write("=" * 80 + "\n\n")
             f.write(f"📅 Thời gian tạo: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n")
             
             # Thông tin nhân viên
             f.write("📋 THÔNG TIN NHÂN VIÊN\n")
-            f.write("-" * 80 + "\n")
+            f.write(_DASH80)
             f.write(f"👤 Họ và tên: {employee_name}\n")
             f.write(f"📧 Mail/Account: {employee_email}\n\n")
             
             # Thống kê tổng quan
             f.write("📊 THỐNG KÊ TỔNG QUAN\n")
-            f.write("-" * 80 + "\n")
+            f.write(_DASH80)
             f.write(f"📈 Tổng task: {len(tasks)}\n")
             f.write(f"✅ Task có logwork: {len(tasks_with_logwork)}\n")
             f.write(f"⏳ Task không có logwork: {len(tasks_no_logwork)}\n")
@@ -3717,7 +3820,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             
             # Thông tin thời gian
             f.write("⏱️ TỔNG HỢP THỜI GIAN\n")
-            f.write("-" * 80 + "\n")
+            f.write(_DASH80)
             f.write(f"🔍 Tổng thời gian dự kiến (không AI): {total_estimate_hours:.2f} giờ\n")
             f.write(f"⚙️ Tổng thời gian dùng AI: {total_actual_hours:.2f} giờ\n")
             if total_saved_hours > 0:
@@ -3729,7 +3832,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             
             # Thống kê theo component
             f.write("\n📊 THỐNG KÊ THEO COMPONENT\n")
-            f.write("-" * 80 + "\n")
+            f.write(_DASH80)
             
             if components:
                 for component_name, component_data in sorted(components.items(), key=lambda x: x[1]['total_tasks'], reverse=True):
@@ -3750,7 +3853,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             
             # Thống kê theo dự án thực tế
             f.write("\n📊 THỐNG KÊ THEO DỰ ÁN\n")
-            f.write("-" * 80 + "\n")
+            f.write(_DASH80)
             
             if actual_projects:
                 for project_name, project_data in sorted(actual_projects.items(), key=lambda x: x[1]['total_tasks'], reverse=True):
@@ -3772,7 +3875,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             # Chi tiết các task có logwork và tiết kiệm thời gian
             f.write("\n" + "=" * 80 + "\n")
             f.write(f"{'💎 DANH SÁCH TASK TIẾT KIỆM THỜI GIAN':^80}\n")
-            f.write("=" * 80 + "\n")
+            f.write(_EQ80)
             if tasks_with_saving:
                 for idx, task in enumerate(sorted(tasks_with_saving, key=lambda x: x.get('time_saved_hours', 0), reverse=True), 1):
                     time_saved = task.get('time_saved_hours', 0)
@@ -3792,7 +3895,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             
             # Chi tiết các task không có logwork
             f.write("⏳ DANH SÁCH TASK CHƯA CÓ LOGWORK\n")
-            f.write("=" * 80 + "\n")
+            f.write(_EQ80)
             if tasks_no_logwork:
                 for idx, task in enumerate(sorted(tasks_no_logwork, key=lambda x: x.get('original_estimate_hours', 0), reverse=True), 1):
                     f.write(f"{idx}. [{task.get('key', '')}] {task.get('summary', '')}\n")
@@ -3813,7 +3916,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             
             # Chi tiết các task có logwork nhưng không tiết kiệm
             f.write("⚖️ DANH SÁCH TASK CÓ LOGWORK NHƯNG KHÔNG TIẾT KIỆM\n")
-            f.write("=" * 80 + "\n")
+            f.write(_EQ80)
             if tasks_no_saving:
                 for idx, task in enumerate(sorted(tasks_no_saving, key=lambda x: x.get('original_estimate_hours', 0), reverse=True), 1):
                     f.write(f"{idx}. [{task.get('key', '')}] {task.get('summary', '')}\n")
@@ -3832,7 +3935,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             
             # Chi tiết các task có logwork nhưng không có estimate
             f.write("⚡ DANH SÁCH TASK CÓ LOGWORK NHƯNG KHÔNG CÓ ESTIMATE\n")
-            f.write("=" * 80 + "\n")
+            f.write(_EQ80)
             if tasks_no_estimate:
                 for idx, task in enumerate(sorted(tasks_no_estimate, key=lambda x: x.get('total_hours', 0), reverse=True), 1):
                     f.write(f"{idx}. [{task.get('key', '')}] {task.get('summary', '')}\n")
@@ -3851,7 +3954,7 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             
             # Chi tiết các task vượt thời gian
             f.write("⚠️ DANH SÁCH TASK VƯỢT THỜI GIAN DỰ KIẾN\n")
-            f.write("=" * 80 + "\n")
+            f.write(_EQ80)
             if tasks_exceed_time:
                 for idx, task in enumerate(sorted(tasks_exceed_time, key=lambda x: x.get('time_saved_hours', 0)), 1):
                     time_exceed = abs(task.get('time_saved_hours', 0))
@@ -3869,64 +3972,67 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
             # Footer
             f.write("\n" + "=" * 80 + "\n")
             f.write(f"{'KẾT THÚC BÁO CÁO':^80}\n")
-            f.write("=" * 80 + "\n")
+            f.write(_EQ80)
             
             # Thêm phần hiển thị danh sách task nếu cần
-            f.write("\n📝 DANH SÁCH TASK CHI TIẾT\n")
-            f.write("-" * 80 + "\n")
-            
-            for idx, task in enumerate(sorted(tasks, key=lambda x: x.get('key', '')), 1):
-                key = task.get('key', '')
-                summary = task.get('summary', '')
-                status = task.get('status', '')
-                updated = task.get('updated', '')
-                has_worklog = "✓" if task.get('has_worklog', False) else "✗"
-                
-                f.write(f"{idx}. [{key}] {summary}\n")
-                f.write(f"   Trạng thái: {status}, Cập nhật: {updated}, Logwork: {has_worklog}\n")
-                f.write(f"   Link: {task.get('link', '')}\n")
-                
-                # Hiển thị chi tiết các log work
-                worklogs = task.get('worklogs', [])
-                if worklogs:
-                    f.write(f"   Log work: {len(worklogs)} lần | Tổng: {task.get('total_hours', 0):.2f}h\n")
-                    for log_idx, log in enumerate(sorted(worklogs, key=lambda x: x.get('started', '')), 1):
-                        author = log.get('author', 'Unknown')
-                        time_spent = log.get('time_spent', '')
-                        hours = log.get('hours_spent', 0)
-                        started = log.get('started', '')
-                        comment = log.get('comment', 'Không có comment')
-                        
-                        # Rút gọn comment nếu quá dài
-                        if len(comment) > 100:
-                            comment = comment[:100] + "..."
-                            
-                        f.write(f"     {log_idx}. {author} - {started} - {hours:.2f}h\n")
-                        if comment:
-                            f.write(f"        {comment}\n")
-                else:
-                    f.write("   ⚠️ Chưa có log work nào!\n")
-                
-                # Chi tiết estimate và tiết kiệm
-                est_hours = task.get('original_estimate_hours', 0)
-                actual_hours = task.get('total_hours', 0)
-                time_saved = task.get('time_saved_hours', -1)
+            if include_task_details:
+                f.write("\n📝 DANH SÁCH TASK CHI TIẾT\n")
+                f.write(_DASH80)
                 
-                if est_hours > 0:
-                    f.write(f"   Estimate: {est_hours:.2f}h | Actual: {actual_hours:.2f}h")
-                    if time_saved > 0:
-                        saved_percent = task.get('time_saved_percent', 0)
-                        f.write(f" | Saved: {time_saved:.2f}h ({saved_percent:.1f}%)")
-                    elif time_saved == 0:
-                        f.write(" | No time saved")
-                    elif time_saved < 0 and time_saved != -1 and time_saved != -2:
-                        f.write(f" | ⚠️ Exceeded: {abs(time_saved):.2f}h")
+                for idx, task in enumerate(sorted(tasks, key=itemgetter('key')), 1):
+                    key = task.get('key', '')
+                    summary = task.get('summary', '')
+                    status = task.get('status', '')
+                    updated = task.get('updated', '')
+                    has_worklog = "✓" if task.get('has_worklog', False) else "✗"
+                    
+                    f.write(f"{idx}. [{key}] {summary}\n")
+                    f.write(f"   Trạng thái: {status}, Cập nhật: {updated}, Logwork: {has_worklog}\n")
+                    f.write(f"   Link: {task.get('link', '')}\n")
+                    
+                    # Hiển thị chi tiết các log work
+                    worklogs = task.get('worklogs', [])
+                    if worklogs:
+                        f.write(f"   Log work: {len(worklogs)} lần | Tổng: {task.get('total_hours', 0):.2f}h\n")
+                        for log_idx, log in enumerate(worklogs if len(worklogs) < 2 else sorted(worklogs, key=lambda x: x.get('started') or ''), 1):
+                            author = log.get('author', 'Unknown')
+                            time_spent = log.get('time_spent', '')
+                            hours = log.get('hours_spent', 0)
+                            started = log.get('started', '')
+                            comment = log.get('comment', 'Không có comment')
+                            
+                            # Rút gọn comment nếu quá dài
+                            if len(comment) > 100:
+                                comment = comment[:100] + "..."
+                                
+                            f.write(f"     {log_idx}. {author} - {started} - {hours:.2f}h\n")
+                            if comment:
+                                f.write(f"        {comment}\n")
+                    else:
+                        f.write("   ⚠️ Chưa có log work nào!\n")
+                    
+                    # Chi tiết estimate và tiết kiệm
+                    est_hours = task.get('original_estimate_hours', 0)
+                    actual_hours = task.get('total_hours', 0)
+                    time_saved = task.get('time_saved_hours', -1)
+                    
+                    if est_hours > 0:
+                        f.write(f"   Estimate: {est_hours:.2f}h | Actual: {actual_hours:.2f}h")
+                        if time_saved > 0:
+                            saved_percent = task.get('time_saved_percent', 0)
+                            f.write(f" | Saved: {time_saved:.2f}h ({saved_percent:.1f}%)")
+                        elif time_saved == 0:
+                            f.write(" | No time saved")
+                        elif time_saved < 0 and time_saved != -1 and time_saved != -2:
+                            f.write(f" | ⚠️ Exceeded: {abs(time_saved):.2f}h")
+                        f.write("\n")
+                    elif time_saved == -2:
+                        f.write(f"   ℹ️ Đã log work {actual_hours:.2f}h nhưng không có estimate\n")
+                    
+                    # Thêm dòng trống giữa các task
                     f.write("\n")
-                elif time_saved == -2:
-                    f.write(f"   ℹ️ Đã log work {actual_hours:.2f}h nhưng không có estimate\n")
-                
-                # Thêm dòng trống giữa các task
-                f.write("\n")
+            
+            _write_report_file(output_file, f.getvalue())
             
             print(f"✅ Đã tạo báo cáo chi tiết cho {employee_name}: {output_file}")
             return True
@@ -3934,7 +4040,57 @@ def create_employee_detailed_report(employee_name, employee_email, tasks, output
         print(f"   ❌ Lỗi khi tạo báo cáo chi tiết: {str(e)}")
         return False
 
-def create_project_report(project_name, tasks, employee_detailed_stats, output_file):
+def _aggregate_employee_stats_numpy(project_tasks):
+    """
+    Gộp thống kê theo nhân viên bằng NumPy cho danh sách task lớn
+    
+    Dữ liệu được tách thành các mảng song song (mã nhân viên, estimate, thực tế, logwork,
+    tiết kiệm) rồi cộng theo nhóm bằng np.bincount. Kết quả giống vòng lặp Python trong
+    create_project_report.
+    
+    Args:
+        project_tasks (list): Danh sách task của dự án
+        
+    Returns:
+        dict: Thống kê của từng nhân viên (theo thứ tự xuất hiện đầu tiên)
+    """
+    employee_ids = {}
+    emails = []
+    for task in project_tasks:
+        employee_name = task.get('employee_name', 'Unknown')
+        if employee_name not in employee_ids:
+            employee_ids[employee_name] = len(employee_ids)
+            emails.append(task.get('employee_email', ''))
+    
+    count = len(project_tasks)
+    emp_id = np.fromiter((employee_ids[task.get('employee_name', 'Unknown')] for task in project_tasks), dtype=np.intp, count=count)
+    est = np.fromiter((task.get('original_estimate_hours', 0) or 0 for task in project_tasks), dtype=np.float64, count=count)
+    act = np.fromiter((task.get('total_hours', 0) or 0 for task in project_tasks), dtype=np.float64, count=count)
+    has_wl = np.fromiter((bool(task.get('has_worklog', False)) for task in project_tasks), dtype=np.float64, count=count)
+    saved = np.fromiter((task.get('time_saved_hours', 0) or 0 for task in project_tasks), dtype=np.float64, count=count)
+    
+    size = len(employee_ids)
+    total_tasks = np.bincount(emp_id, minlength=size)
+    tasks_with_logwork = np.bincount(emp_id, weights=has_wl, minlength=size)
+    estimated_hours = np.bincount(emp_id, weights=est, minlength=size)
+    actual_hours = np.bincount(emp_id, weights=act, minlength=size)
+    saved_hours = np.bincount(emp_id, weights=np.where(saved > 0, saved, 0.0), minlength=size)
+    
+    employees = {}
+    for employee_name, i in employee_ids.items():
+        with_logwork = int(tasks_with_logwork[i])
+        employees[employee_name] = {
+            'email': emails[i],
+            'total_tasks': int(total_tasks[i]),
+            'tasks_with_logwork': with_logwork,
+            'tasks_without_logwork': int(total_tasks[i]) - with_logwork,
+            'estimated_hours': float(estimated_hours[i]),
+            'actual_hours': float(actual_hours[i]),
+            'saved_hours': float(saved_hours[i])
+        }
+    return employees
+
+def create_project_report(project_name, tasks, employee_detailed_stats, output_file, include_employee_details=True, project_totals=None, rolled_up=False):
     """
     Tạo báo cáo chi tiết về một dự án và lưu vào file txt
     
@@ -3943,26 +4099,48 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
         tasks (list): Danh sách các task của dự án
         employee_detailed_stats (dict): Thống kê chi tiết của các nhân viên
         output_file (str): Đường dẫn đến file báo cáo
+        include_employee_details (bool): Có ghi phần chi tiết từng nhân viên (task, log work) hay không
+        project_totals (dict): Nếu có, lưu số liệu tổng của dự án vào đây (theo tên dự án) để check_consistency so sánh
+        rolled_up (bool): True nếu tasks đã được cập nhật logwork/estimate từ task con (bỏ qua bước cập nhật)
     """
+    # Gán dict.get vào biến cục bộ để tránh tra cứu thuộc tính trong các vòng lọc lớn
+    _get = dict.get
+    
     try:
          # Cập nhật trạng thái logwork cho task cha trước khi tạo báo cáo
-        parent_to_children = {}
-        for task in tasks:
-            if task.get('is_subtask') and task.get('parent_key'):
-                parent_key = task.get('parent_key')
-                if parent_key not in parent_to_children:
-                    parent_to_children[parent_key] = []
-                parent_to_children[parent_key].append(task)
-        
-        # Cập nhật trạng thái task cha dựa trên task con
-        for task in tasks:
-            task_key = task.get('key')
-            if task_key in parent_to_children:  # Nếu task này là task cha có con
-                children = parent_to_children[task_key]
+        if not rolled_up:
+            parent_to_children = {}
+            for task in tasks:
+                if task.get('is_subtask') and task.get('parent_key'):
+                    parent_key = task.get('parent_key')
+                    if parent_key not in parent_to_children:
+                        parent_to_children[parent_key] = []
+                    parent_to_children[parent_key].append(task)
+            
+            # Cập nhật trạng thái task cha dựa trên task con
+            # Chỉ duyệt các task cha có con (O(P)) thay vì quét toàn bộ danh sách task
+            tasks_by_key = {task['key']: task for task in tasks if task.get('key')}
+            # Task cha cần tính thời gian tiết kiệm, gom lại để tính một lần sau vòng lặp
+            saving_parents = []
+            saving_estimates = []
+            saving_actuals = []
+            for task_key, children in parent_to_children.items():
+                task = tasks_by_key.get(task_key)
+                if task is None:  # Task cha không nằm trong danh sách hiện tại
+                    continue
+                
+                # Gộp các phép cộng trên task con vào một lượt duyệt duy nhất
+                total_child_estimate = 0
+                total_child_time = 0
+                any_child_logwork = False
+                for child in children:
+                    total_child_estimate += child.get('original_estimate_hours', 0) or 0
+                    if child.get('has_worklog', False):
+                        total_child_time += child.get('total_hours', 0) or 0
+                        any_child_logwork = True
                 
                 # Nếu task cha không có estimate nhưng các task con có estimate
                 if task.get('original_estimate_hours', 0) == 0:
-                    total_child_estimate = sum(child.get('original_estimate_hours', 0) for child in children)
                     if total_child_estimate > 0:
                         # Cập nhật estimate cho task cha từ tổng estimate của các task con
                         task['original_estimate_hours'] = total_child_estimate
@@ -3971,24 +4149,18 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
                 
                 # Kiểm tra và cập nhật trạng thái logwork
                 if not task.get('has_worklog'):  # Nếu task cha chưa có log work
-                    children_with_logwork = [child for child in children if child.get('has_worklog', False)]
-                    if children_with_logwork:  # Nếu có ít nhất một task con đã log work
+                    if any_child_logwork:  # Nếu có ít nhất một task con đã log work
                         # Đánh dấu task cha là đã log work
                         task['has_worklog'] = True
                         task['has_child_with_logwork'] = True  # Thêm trường để đánh dấu
                         
                         # Quan trọng: Cập nhật time_saved_hours nếu đang là -1 (không có logwork)
                         if task.get('time_saved_hours', -1) == -1:
-                            # Tính tổng thời gian từ các task con
-                            total_child_time = sum(child.get('total_hours', 0) for child in children_with_logwork)
-                            
                             # Cập nhật thời gian thực tế cho task cha từ tổng thời gian của các task con
                             task['total_hours'] = total_child_time
                             
                             # Nếu task cha không có estimate nhưng các task con có estimate
                             if task.get('original_estimate_hours', 0) == 0:
-                                # Tính tổng estimate từ task con
-                                total_child_estimate = sum(child.get('original_estimate_hours', 0) for child in children)
                                 if total_child_estimate > 0:
                                     # Cập nhật estimate cho task cha
                                     task['original_estimate_hours'] = total_child_estimate
@@ -3997,21 +4169,28 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
                             
                             # Sau đó tính time_saved_hours
                             if task.get('original_estimate_hours', 0) > 0:
-                                saved_hours, saving_ratio = calculate_saved_time(task.get('original_estimate_hours', 0), total_child_time)
-                                task['time_saved_hours'] = saved_hours
-                                task['time_saved_percent'] = saving_ratio
-                                print(f"   ℹ️ Cập nhật time_saved_hours cho task cha {task_key} từ task con: {saved_hours:.2f}h ({saving_ratio:.1f}%)")
+                                saving_parents.append(task)
+                                saving_estimates.append(task.get('original_estimate_hours', 0) or 0)
+                                saving_actuals.append(total_child_time)
                             else:
                                 # Nếu thực sự không có estimate nào (cả cha và con đều không có)
                                 task['time_saved_hours'] = -2  # Đánh dấu đặc biệt: có logwork nhưng không có estimate
                                 print(f"   ℹ️ Task cha {task_key} đã được đánh dấu có logwork (từ task con) nhưng không có estimate")
+            
+            # Tính thời gian tiết kiệm cho tất cả task cha trong một phép tính NumPy
+            if saving_parents:
+                saved_arr, ratio_arr = calculate_saved_time_array(saving_estimates, saving_actuals)
+                for task, saved_hours, saving_ratio in zip(saving_parents, saved_arr.tolist(), ratio_arr.tolist()):
+                    task['time_saved_hours'] = saved_hours
+                    task['time_saved_percent'] = saving_ratio
+                    print(f"   ℹ️ Cập nhật time_saved_hours cho task cha {task['key']} từ task con: {saved_hours:.2f}h ({saving_ratio:.1f}%)")
         # Bỏ qua dự án FC
         if project_name == "FC":
             print(f"🚫 Bỏ qua tạo báo cáo cho dự án FC")
             return True
             
         # Lọc task thuộc dự án
-        project_tasks = [task for task in tasks if task.get('actual_project', '') == project_name]
+        project_tasks = [t for t in tasks if _get(t, 'actual_project', '') == project_name]
         
         if not project_tasks:
             print(f"⚠️ Không tìm thấy task nào thuộc dự án {project_name}")
@@ -4033,64 +4212,77 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
                 parent_to_children[parent_key].append(task)
         
         # Cập nhật trạng thái log work của task cha dựa trên con
-        for task in project_tasks:
+        project_tasks_by_key = {task['key']: task for task in project_tasks if task.get('key')}
+        for task_key, children in parent_to_children.items():
             # Nếu task là task cha (không phải là subtask) và có các task con
-            task_key = task.get('key')
-            if not task.get('is_subtask') and task_key in parent_to_children:
-                # Kiểm tra xem có task con nào đã log work không
-                if not task.get('has_worklog'):  # Nếu task cha chưa có log work
-                    children_with_logwork = [child for child in parent_to_children[task_key] if child.get('has_worklog', False)]
-                    if children_with_logwork:  # Nếu có ít nhất một task con đã log work
-                        # Đánh dấu task cha là đã log work
-                        task['has_worklog'] = True
-                        task['has_child_with_logwork'] = True  # Thêm trường để đánh dấu
+            task = project_tasks_by_key.get(task_key)
+            if task is None or task.get('is_subtask'):
+                continue
+            # Gộp các phép cộng trên task con vào một lượt duyệt duy nhất
+            children_total_hours = 0
+            any_child_logwork = False
+            for child in children:
+                if child.get('has_worklog', False):
+                    children_total_hours += child.get('total_hours', 0) or 0
+                    any_child_logwork = True
+            # Kiểm tra xem có task con nào đã log work không
+            if not task.get('has_worklog'):  # Nếu task cha chưa có log work
+                if any_child_logwork:  # Nếu có ít nhất một task con đã log work
+                    # Đánh dấu task cha là đã log work
+                    task['has_worklog'] = True
+                    task['has_child_with_logwork'] = True  # Thêm trường để đánh dấu
+                    
+                    # Quan trọng: Cập nhật time_saved_hours nếu đang là -1 (không có logwork)
+                    if task.get('time_saved_hours', -1) == -1:
+                        # Cập nhật thời gian thực tế cho task cha (tổng từ các task con)
+                        if task.get('total_hours', 0) == 0:  # Chỉ cập nhật nếu task cha chưa có giá trị
+                            task['total_hours'] = children_total_hours
                         
-                        # Quan trọng: Cập nhật time_saved_hours nếu đang là -1 (không có logwork)
-                        if task.get('time_saved_hours', -1) == -1:
-                            # Tính tổng thời gian thực tế từ các task con
-                            children_total_hours = sum(child.get('total_hours', 0) for child in children_with_logwork)
-                            
-                            # Cập nhật thời gian thực tế cho task cha
-                            if task.get('total_hours', 0) == 0:  # Chỉ cập nhật nếu task cha chưa có giá trị
-                                task['total_hours'] = children_total_hours
-                            
-                            # Nếu task cha có estimate, tính time_saved_hours
-                            if task.get('original_estimate_hours', 0) > 0:
-                                task['time_saved_hours'] = task.get('original_estimate_hours', 0) - task.get('total_hours', 0)
-                            else:
-                                # Nếu không có estimate, đặt thành 0 (không tiết kiệm)
-                                task['time_saved_hours'] = 0
+                        # Nếu task cha có estimate, tính time_saved_hours
+                        if task.get('original_estimate_hours', 0) > 0:
+                            task['time_saved_hours'] = task.get('original_estimate_hours', 0) - task.get('total_hours', 0)
+                        else:
+                            # Nếu không có estimate, đặt thành 0 (không tiết kiệm)
+                            task['time_saved_hours'] = 0
+    
+        # Chỉ mục task theo nhân viên, dùng cho phần chi tiết từng nhân viên
+        tasks_by_employee = {}
+        for task in project_tasks:
+            tasks_by_employee.setdefault(task.get('employee_name', ''), []).append(task)
         
         # Xử lý từng nhân viên
-        for task in project_tasks:
-            employee_name = task.get('employee_name', 'Unknown')
-            employee_email = task.get('employee_email', '')
-            
-            if employee_name not in employees:
-                employees[employee_name] = {
-                    'email': employee_email,
-                    'total_tasks': 0,
-                    'tasks_with_logwork': 0,
-                    'tasks_without_logwork': 0,
-                    'estimated_hours': 0,
-                    'actual_hours': 0,
-                    'saved_hours': 0
-                }
+        if len(project_tasks) > VECTORIZE_MIN_TASKS:
+            employees = _aggregate_employee_stats_numpy(project_tasks)
+        else:
+            for task in project_tasks:
+                employee_name = task.get('employee_name', 'Unknown')
+                employee_email = task.get('employee_email', '')
                 
-            # Cập nhật thống kê nhân viên
-            employees[employee_name]['total_tasks'] += 1
-            employees[employee_name]['estimated_hours'] += task.get('original_estimate_hours', 0) or 0
-            employees[employee_name]['actual_hours'] += task.get('total_hours', 0) or 0
-            
-            if task.get('has_worklog', False):
-                employees[employee_name]['tasks_with_logwork'] += 1
-            else:
-                employees[employee_name]['tasks_without_logwork'] += 1
-            
-            # Tính thời gian tiết kiệm
-            time_saved = task.get('time_saved_hours', 0)
-            if time_saved > 0:
-                employees[employee_name]['saved_hours'] += time_saved
+                if employee_name not in employees:
+                    employees[employee_name] = {
+                        'email': employee_email,
+                        'total_tasks': 0,
+                        'tasks_with_logwork': 0,
+                        'tasks_without_logwork': 0,
+                        'estimated_hours': 0,
+                        'actual_hours': 0,
+                        'saved_hours': 0
+                    }
+                    
+                # Cập nhật thống kê nhân viên
+                employees[employee_name]['total_tasks'] += 1
+                employees[employee_name]['estimated_hours'] += task.get('original_estimate_hours', 0) or 0
+                employees[employee_name]['actual_hours'] += task.get('total_hours', 0) or 0
+                
+                if task.get('has_worklog', False):
+                    employees[employee_name]['tasks_with_logwork'] += 1
+                else:
+                    employees[employee_name]['tasks_without_logwork'] += 1
+                
+                # Tính thời gian tiết kiệm
+                time_saved = task.get('time_saved_hours', 0)
+                if time_saved > 0:
+                    employees[employee_name]['saved_hours'] += time_saved
         
         # Tính tỷ lệ không logwork và tỷ lệ tiết kiệm
         for name, stats in employees.items():
@@ -4107,14 +4299,26 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
             else:
                 stats['saving_ratio'] = 0
                 
-        # Tính các chỉ số tổng hợp của dự án
+        # Tính các chỉ số tổng hợp của dự án (một lượt duyệt cho cả bốn bộ đếm)
+        tasks_with_logwork = 0
+        tasks_without_logwork = 0
+        total_estimated_hours = 0
+        total_actual_hours = 0
+        for t in project_tasks:
+            if _get(t, 'has_worklog', False):
+                tasks_with_logwork += 1
+            else:
+                tasks_without_logwork += 1
+            total_estimated_hours += _get(t, 'original_estimate_hours', 0) or 0
+            total_actual_hours += _get(t, 'total_hours', 0) or 0
+        
         project_stats = {
             'total_tasks': len(project_tasks),
             'total_employees': len(employees),
-            'total_estimated_hours': sum(task.get('original_estimate_hours', 0) or 0 for task in project_tasks),
-            'total_actual_hours': sum(task.get('total_hours', 0) or 0 for task in project_tasks),
-            'tasks_with_logwork': len([task for task in project_tasks if task.get('has_worklog', False)]),
-            'tasks_without_logwork': len([task for task in project_tasks if not task.get('has_worklog', False)]),
+            'total_estimated_hours': total_estimated_hours,
+            'total_actual_hours': total_actual_hours,
+            'tasks_with_logwork': tasks_with_logwork,
+            'tasks_without_logwork': tasks_without_logwork,
         }
         
         project_stats['logwork_ratio'] = (project_stats['tasks_with_logwork'] / project_stats['total_tasks'] * 100) if project_stats['total_tasks'] > 0 else 0
@@ -4122,35 +4326,35 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
         project_stats['saving_ratio'] = (project_stats['saved_hours'] / project_stats['total_estimated_hours'] * 100) if project_stats['total_estimated_hours'] > 0 else 0
         
         # Top 10 nhân viên không logwork
-        top_no_logwork = sorted(
-            [item for item in employees.items() if item[1]['tasks_without_logwork'] > 0],
-            key=lambda x: x[1]['tasks_without_logwork'],
-            reverse=True
-        )[:10]
+        top_no_logwork = heapq.nlargest(
+            10,
+            (item for item in employees.items() if item[1]['tasks_without_logwork'] > 0),
+            key=lambda x: x[1]['tasks_without_logwork']
+        )
         
         # Top 10 nhân viên logwork nhiều nhất
-        top_logwork = sorted(
+        top_logwork = heapq.nlargest(
+            10,
             employees.items(),
-            key=lambda x: x[1]['actual_hours'],
-            reverse=True
-        )[:10]
+            key=lambda x: x[1]['actual_hours']
+        )
         
         # Top 10 nhân viên tiết kiệm thời gian nhiều nhất
-        top_saving = sorted(
-            [item for item in employees.items() if item[1]['estimated_hours'] > 0],
-            key=lambda x: x[1]['saving_ratio'],
-            reverse=True
-        )[:10]
+        top_saving = heapq.nlargest(
+            10,
+            (item for item in employees.items() if item[1]['estimated_hours'] > 0),
+            key=lambda x: x[1]['saving_ratio']
+        )
         
         # Top 10 nhân viên có tỷ lệ không logwork cao nhất
-        top_no_logwork_ratio = sorted(
-            [item for item in employees.items() if item[1]['tasks_without_logwork'] > 0],
-            key=lambda x: x[1]['no_logwork_ratio'],
-            reverse=True
-        )[:10]
+        top_no_logwork_ratio = heapq.nlargest(
+            10,
+            (item for item in employees.items() if item[1]['tasks_without_logwork'] > 0),
+            key=lambda x: x[1]['no_logwork_ratio']
+        )
         
-        # Tạo báo cáo
-        with open(output_file, 'w', encoding='utf-8') as f:
+        # Tạo báo cáo: gom nội dung trong bộ nhớ rồi encode + ghi một lần
+        with io.StringIO() as f:
             # Tiêu đề
             f.write(f"=== BÁO CÁO DỰ ÁN: {project_name} ===\n\n")
             
@@ -4176,11 +4380,10 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
             if top_no_logwork:
                 header = f"{'STT':<5}{'Tên nhân viên':<30}{'Tổng task':<15}{'Không logwork':<15}{'Tỷ lệ':<10}\n"
                 f.write(header)
-                f.write("-" * 75 + "\n")
+                f.write(_DASH75)
                 
                 for idx, (name, stats) in enumerate(top_no_logwork, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['total_tasks']:<15}{stats['tasks_without_logwork']:<15}{stats['no_logwork_ratio']:.1f}%\n"
-                    f.write(row)
+                    f.write(EMP_ROW_FMT.format(idx=idx, name=name[:28], total=stats['total_tasks'], no_lw=stats['tasks_without_logwork'], ratio=stats['no_logwork_ratio']))
             else:
                 f.write("Không có nhân viên nào có task không logwork\n")
             f.write("\n")
@@ -4192,11 +4395,10 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
             if top_no_logwork_ratio:
                 header = f"{'STT':<5}{'Tên nhân viên':<30}{'Tổng task':<15}{'Không logwork':<15}{'Tỷ lệ':<10}\n"
                 f.write(header)
-                f.write("-" * 75 + "\n")
+                f.write(_DASH75)
                 
                 for idx, (name, stats) in enumerate(top_no_logwork_ratio, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['total_tasks']:<15}{stats['tasks_without_logwork']:<15}{stats['no_logwork_ratio']:.1f}%\n"
-                    f.write(row)
+                    f.write(EMP_ROW_FMT.format(idx=idx, name=name[:28], total=stats['total_tasks'], no_lw=stats['tasks_without_logwork'], ratio=stats['no_logwork_ratio']))
             else:
                 f.write("Không có nhân viên nào có task không logwork\n")
             f.write("\n")
@@ -4206,11 +4408,10 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
             if top_logwork:
                 header = f"{'STT':<5}{'Tên nhân viên':<30}{'Tổng task':<15}{'Số giờ logwork':<20}\n"
                 f.write(header)
-                f.write("-" * 70 + "\n")
+                f.write(_DASH70)
                 
                 for idx, (name, stats) in enumerate(top_logwork, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['total_tasks']:<15}{stats['actual_hours']:.1f} giờ\n"
-                    f.write(row)
+                    f.write(EMP_LOGWORK_ROW_FMT.format(idx=idx, name=name[:28], total=stats['total_tasks'], actual=stats['actual_hours']))
             else:
                 f.write("Không có dữ liệu\n")
             f.write("\n")
@@ -4220,73 +4421,88 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
             if top_saving:
                 header = f"{'STT':<5}{'Tên nhân viên':<30}{'Ước tính':<15}{'Thực tế':<15}{'Tiết kiệm':<15}{'Tỷ lệ':<10}\n"
                 f.write(header)
-                f.write("-" * 90 + "\n")
+                f.write(_DASH90)
                 
                 for idx, (name, stats) in enumerate(top_saving, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['estimated_hours']:.1f}h{' ':<10}{stats['actual_hours']:.1f}h{' ':<10}{stats['saved_hours']:.1f}h{' ':<10}{stats['saving_ratio']:.1f}%\n"
-                    f.write(row)
+                    f.write(EMP_SAVING_ROW_FMT.format(idx=idx, name=name[:28], estimated=stats['estimated_hours'], actual=stats['actual_hours'], saved=stats['saved_hours'], ratio=stats['saving_ratio']))
             else:
                 f.write("Không có dữ liệu\n")
             f.write("\n")
             
             # Chi tiết từng nhân viên
-            f.write("📝 CHI TIẾT TỪNG NHÂN VIÊN:\n\n")
-            
-            for employee_name, stats in sorted(employees.items(), key=lambda x: x[0]):
-                f.write(f"👤 {employee_name} ({stats['email']}):\n")
-                f.write(f"- Tổng số task: {stats['total_tasks']}\n")
-                f.write(f"- Số task có logwork: {stats['tasks_with_logwork']} ({(stats['tasks_with_logwork']/stats['total_tasks']*100) if stats['total_tasks'] > 0 else 0:.1f}%)\n")
-                f.write(f"- Số task không logwork: {stats['tasks_without_logwork']}\n")
-                f.write(f"- Thời gian ước tính: {stats['estimated_hours']:.1f} giờ\n")
-                f.write(f"- Thời gian thực tế: {stats['actual_hours']:.1f} giờ\n")
-                f.write(f"- Thời gian tiết kiệm: {stats['saved_hours']:.1f} giờ ({stats['saving_ratio']:.1f}%)\n")
-                
-                # Chi tiết các task của nhân viên
-                employee_tasks = [task for task in project_tasks if task.get('employee_name', '') == employee_name]
-                
-                if employee_tasks:
-                    f.write("\n   DANH SÁCH TASK:\n")
+            if include_employee_details:
+                f.write("📝 CHI TIẾT TỪNG NHÂN VIÊN:\n\n")
+                
+                for employee_name, stats in sorted(employees.items(), key=lambda x: x[0]):
+                    f.write(f"👤 {employee_name} ({stats['email']}):\n")
+                    f.write(f"- Tổng số task: {stats['total_tasks']}\n")
+                    f.write(f"- Số task có logwork: {stats['tasks_with_logwork']} ({(stats['tasks_with_logwork']/stats['total_tasks']*100) if stats['total_tasks'] > 0 else 0:.1f}%)\n")
+                    f.write(f"- Số task không logwork: {stats['tasks_without_logwork']}\n")
+                    f.write(f"- Thời gian ước tính: {stats['estimated_hours']:.1f} giờ\n")
+                    f.write(f"- Thời gian thực tế: {stats['actual_hours']:.1f} giờ\n")
+                    f.write(f"- Thời gian tiết kiệm: {stats['saved_hours']:.1f} giờ ({stats['saving_ratio']:.1f}%)\n")
                     
-                    for idx, task in enumerate(sorted(employee_tasks, key=lambda x: x.get('key', '')), 1):
-                        key = task.get('key', '')
-                        summary = task.get('summary', '')[:50] + ('...' if len(task.get('summary', '')) > 50 else '')
-                        status = task.get('status', '')
-                        est_hours = task.get('original_estimate_hours', 0) or 0
-                        actual_hours = task.get('total_hours', 0) or 0
-                        has_logwork = "✓" if task.get('has_worklog', False) else "✗"
-                        
-                        f.write(f"   {idx}. [{key}] {summary} - Trạng thái: {status}\n")
-                        
-                        # Hiển thị thông tin nếu task cha có log work thông qua task con
-                        if task.get('has_child_with_logwork', False):
-                            f.write(f"      Logwork: {has_logwork} (✓ qua task con), Ước tính: {est_hours:.1f}h, Thực tế: {actual_hours:.1f}h\n")
-                            # Hiển thị danh sách task con có log work
-                            if key in parent_to_children:
-                                children_with_logwork = [child for child in parent_to_children[key] if child.get('has_worklog', False)]
-                                f.write(f"      👉 Có {len(children_with_logwork)}/{len(parent_to_children[key])} task con đã log work:\n")
-                                for idx_child, child in enumerate(children_with_logwork, 1):
-                                    child_key = child.get('key', '')
-                                    child_summary = child.get('summary', '')[:40] + ('...' if len(child.get('summary', '')) > 40 else '')
-                                    child_hours = child.get('total_hours', 0) or 0
-                                    f.write(f"        {idx_child}. [{child_key}] {child_summary} - {child_hours:.1f}h\n")
-                        else:
-                            f.write(f"      Logwork: {has_logwork}, Ước tính: {est_hours:.1f}h, Thực tế: {actual_hours:.1f}h\n")
+                    # Chi tiết các task của nhân viên
+                    employee_tasks = tasks_by_employee.get(employee_name, [])
+                    
+                    if employee_tasks:
+                        f.write("\n   DANH SÁCH TASK:\n")
                         
-                        # Hiển thị chi tiết từng lần logwork nếu có
-                        worklogs = task.get('worklogs', [])
-                        if worklogs:
-                            f.write(f"      Chi tiết logwork ({len(worklogs)} lần):\n")
-                            for log_idx, log in enumerate(sorted(worklogs, key=lambda x: x.get('started', '')), 1):
-                                author = log.get('author', 'Unknown')
-                                started = log.get('started', 'Unknown')
-                                hours = log.get('hours_spent', 0)
-                                comment = log.get('comment', 'Không có comment')
-                                comment_display = comment[:100] + '...' if len(comment) > 100 else comment
-                                
-                                f.write(f"        {log_idx}. {author} - {started} - {hours:.1f}h\n")
-                                f.write(f"           Comment: {comment_display}\n")
-                
-                f.write("\n" + "-" * 80 + "\n\n")
+                        for idx, task in enumerate(sorted(employee_tasks, key=itemgetter('key')), 1):
+                            key = task.get('key', '')
+                            summary = task.get('summary', '')
+                            if len(summary) > 50:
+                                summary = summary[:50] + '...'
+                            status = task.get('status', '')
+                            est_hours = task.get('original_estimate_hours', 0) or 0
+                            actual_hours = task.get('total_hours', 0) or 0
+                            has_logwork = "✓" if task.get('has_worklog', False) else "✗"
+                            
+                            f.write(f"   {idx}. [{key}] {summary} - Trạng thái: {status}\n")
+                            
+                            # Hiển thị thông tin nếu task cha có log work thông qua task con
+                            if task.get('has_child_with_logwork', False):
+                                f.write(f"      Logwork: {has_logwork} (✓ qua task con), Ước tính: {est_hours:.1f}h, Thực tế: {actual_hours:.1f}h\n")
+                                # Hiển thị danh sách task con có log work
+                                if key in parent_to_children:
+                                    children_with_logwork = [child for child in parent_to_children[key] if child.get('has_worklog', False)]
+                                    f.write(f"      👉 Có {len(children_with_logwork)}/{len(parent_to_children[key])} task con đã log work:\n")
+                                    for idx_child, child in enumerate(children_with_logwork, 1):
+                                        child_key = child.get('key', '')
+                                        child_summary = child.get('summary', '')
+                                        if len(child_summary) > 40:
+                                            child_summary = child_summary[:40] + '...'
+                                        child_hours = child.get('total_hours', 0) or 0
+                                        f.write(f"        {idx_child}. [{child_key}] {child_summary} - {child_hours:.1f}h\n")
+                            else:
+                                f.write(f"      Logwork: {has_logwork}, Ước tính: {est_hours:.1f}h, Thực tế: {actual_hours:.1f}h\n")
+                            
+                            # Hiển thị chi tiết từng lần logwork nếu có
+                            worklogs = task.get('worklogs', [])
+                            if worklogs:
+                                f.write(f"      Chi tiết logwork ({len(worklogs)} lần):\n")
+                                for log_idx, log in enumerate(worklogs if len(worklogs) < 2 else sorted(worklogs, key=lambda x: x.get('started') or ''), 1):
+                                    author = log.get('author', 'Unknown')
+                                    started = log.get('started', 'Unknown')
+                                    hours = log.get('hours_spent', 0)
+                                    comment = log.get('comment', 'Không có comment')
+                                    comment_display = comment[:100] + '...' if len(comment) > 100 else comment
+                                    
+                                    f.write(f"        {log_idx}. {author} - {started} - {hours:.1f}h\n")
+                                    f.write(f"           Comment: {comment_display}\n")
+                    
+                    f.write("\n" + "-" * 80 + "\n\n")
+            
+            _write_report_file(output_file, f.getvalue())
+        
+        # Giữ lại số liệu tổng của dự án để so sánh với báo cáo tổng hợp mà không phải đọc lại file
+        if project_totals is not None:
+            project_totals[project_name] = {
+                'report_file': os.path.basename(output_file),
+                'estimated_hours': project_stats['total_estimated_hours'],
+                'actual_hours': project_stats['total_actual_hours'],
+                'saved_hours': project_stats['saved_hours']
+            }
         
         print(f"✅ Đã tạo báo cáo dự án {project_name}: {output_file}")
         return True
@@ -4295,7 +4511,323 @@ def create_project_report(project_name, tasks, employee_detailed_stats, output_f
         print(f"❌ Lỗi khi tạo báo cáo dự án {project_name}: {str(e)}")
         return False
 
-def create_projects_summary_report(all_tasks, output_file, csv_output_file):
+def _new_summary_project_stats():
+    """Bản ghi thống kê rỗng của một dự án trong báo cáo tổng hợp"""
+    return {
+        'total_tasks': 0,
+        'tasks_with_worklog': 0,
+        'tasks_without_worklog': 0,
+        'estimated_hours': 0,
+        'actual_hours': 0,
+        'saved_hours': 0,
+        'employee_set': set(),
+        'employees_with_worklog': set(),
+        'employees_without_worklog': set()
+    }
+
+def _new_summary_employee_stats():
+    """Bản ghi thống kê rỗng của một nhân viên trong một dự án (báo cáo tổng hợp)"""
+    return {
+        'email': '',
+        'total_tasks': 0,
+        'tasks_with_worklog': 0,
+        'tasks_without_worklog': 0,
+        'estimated_hours': 0,
+        'actual_hours': 0,
+        'saved_hours': 0
+    }
+
+def _new_summary_all_employee_stats():
+    """Bản ghi thống kê rỗng của một nhân viên trên tất cả dự án (báo cáo tổng hợp)"""
+    stats = _new_summary_employee_stats()
+    stats['projects'] = []  # Danh sách dự án (có thể trùng), chỉ đếm số dự án khác nhau khi tổng hợp
+    return stats
+
+def _fill_summary_ratios(stats):
+    """
+    Tính các tỷ lệ phái sinh (log work, không log work, tiết kiệm) cho một bản ghi thống kê
+    
+    Args:
+        stats (dict): Bản ghi thống kê của dự án hoặc nhân viên (được cập nhật tại chỗ)
+    """
+    total_tasks = stats['total_tasks']
+    if total_tasks > 0:
+        stats['logwork_ratio'] = (stats['tasks_with_worklog'] / total_tasks) * 100
+        stats['no_logwork_ratio'] = (stats['tasks_without_worklog'] / total_tasks) * 100
+    else:
+        stats['logwork_ratio'] = 0
+        stats['no_logwork_ratio'] = 0
+    
+    if stats['estimated_hours'] > 0:
+        stats['saving_ratio'] = (stats['saved_hours'] / stats['estimated_hours']) * 100
+    else:
+        stats['saving_ratio'] = 0
+
+def _aggregate_summary_stats_loop(all_tasks):
+    """
+    Gộp thống kê dự án / nhân viên cho báo cáo tổng hợp bằng vòng lặp Python (danh sách task nhỏ)
+    
+    Args:
+        all_tasks (list): Danh sách tất cả các task
+        
+    Returns:
+        tuple: (projects, project_employees, all_employees)
+    """
+    projects = defaultdict(_new_summary_project_stats)
+    project_employees = defaultdict(lambda: defaultdict(_new_summary_employee_stats))
+    all_employees = defaultdict(_new_summary_all_employee_stats)
+    
+    # Xử lý từng task để thu thập thông tin
+    for task in all_tasks:
+        project_name = task.get('actual_project', task.get('project', 'Unknown'))
+        
+        # Bỏ qua các dự án không mong muốn trong báo cáo tổng hợp
+        if project_name in EXCLUDED_PROJECTS:
+            continue
+            
+        # DEBUG: Kiểm tra PKT và WAK có được gán đúng actual_project không
+        # if task.get('project') == 'PKT' and project_name != '[Project] Kho Tổng + PIM':
+        #     print(f"🔍 DEBUG: Task {task.get('key')} từ PKT có actual_project = '{project_name}' thay vì '[Project] Kho Tổng + PIM'!")
+        
+        # if task.get('project') == 'WAK' and project_name != 'Web App KHLC':
+        #     print(f"🔍 DEBUG: Task {task.get('key')} từ WAK có actual_project = '{project_name}' thay vì 'Web App KHLC'!")
+            
+        # DEBUG: Cảnh báo nếu PKT hoặc WAK vẫn xuất hiện như tên dự án
+        # if project_name in ['PKT', 'WAK']:
+        #     print(f"🚨 CẢNH BÁO: Task {task.get('key')} có actual_project = '{project_name}' - logic get_actual_project() KHÔNG hoạt động!")
+            
+        employee_name = task.get('employee_name', 'Unknown')
+        # Intern tên dự án / nhân viên: các lần tra cứu dict/set sau so sánh con trỏ trước khi so chuỗi
+        if type(project_name) is str:
+            project_name = sys.intern(project_name)
+        if type(employee_name) is str:
+            employee_name = sys.intern(employee_name)
+        employee_email = task.get('employee_email', '')
+        has_worklog = task.get('has_worklog', False)
+        estimated_hours = task.get('original_estimate_hours', 0) or 0
+        actual_hours = task.get('total_hours', 0) or 0
+        time_saved = task.get('time_saved_hours', 0)
+        
+        # Cập nhật thông tin dự án
+        pstats = projects[project_name]
+        pstats['total_tasks'] += 1
+        pstats['employee_set'].add(employee_name)
+        
+        if has_worklog:
+            pstats['tasks_with_worklog'] += 1
+            pstats['estimated_hours'] += estimated_hours
+            pstats['actual_hours'] += actual_hours
+            
+            # Cập nhật trạng thái log work của nhân viên
+            pstats['employees_with_worklog'].add(employee_name)
+            
+            # Tính toán thời gian tiết kiệm cho những task có log work và có estimate
+            if estimated_hours > 0 and time_saved != -1 and time_saved != -2:
+                # time_saved == -1 nghĩa là không có log work
+                # time_saved == -2 nghĩa là có log work nhưng không có estimate
+                if time_saved > 0:
+                    pstats['saved_hours'] += time_saved
+        else:
+            pstats['tasks_without_worklog'] += 1
+            # Cập nhật trạng thái log work của nhân viên
+            pstats['employees_without_worklog'].add(employee_name)
+        
+        # Cập nhật thông tin nhân viên trong dự án (email lấy từ task đầu tiên)
+        estats = project_employees[project_name][employee_name]
+        if estats['total_tasks'] == 0:
+            estats['email'] = employee_email
+        estats['total_tasks'] += 1
+        
+        if has_worklog:
+            estats['tasks_with_worklog'] += 1
+            estats['estimated_hours'] += estimated_hours
+            estats['actual_hours'] += actual_hours
+            
+            # Tính toán thời gian tiết kiệm
+            if estimated_hours > 0 and time_saved != -1 and time_saved != -2:
+                if time_saved > 0:
+                    estats['saved_hours'] += time_saved
+        else:
+            estats['tasks_without_worklog'] += 1
+        
+        # Cập nhật thông tin nhân viên tổng hợp
+        astats = all_employees[employee_name]
+        if astats['total_tasks'] == 0:
+            astats['email'] = employee_email
+        astats['total_tasks'] += 1
+        # Chỉ so sánh với dự án vừa thêm (task thường liền nhau theo dự án), bỏ trùng khi đếm
+        projects_list = astats['projects']
+        if not projects_list or projects_list[-1] != project_name:
+            projects_list.append(project_name)
+        
+        if has_worklog:
+            astats['tasks_with_worklog'] += 1
+            astats['estimated_hours'] += estimated_hours
+            astats['actual_hours'] += actual_hours
+            
+            # Tính toán thời gian tiết kiệm
+            if estimated_hours > 0 and time_saved != -1 and time_saved != -2:
+                if time_saved > 0:
+                    astats['saved_hours'] += time_saved
+        else:
+            astats['tasks_without_worklog'] += 1
+    
+    # Chuyển về dict thường để các bước sau không vô tình tạo khóa mới
+    projects = dict(projects)
+    project_employees = {name: dict(employees) for name, employees in project_employees.items()}
+    all_employees = dict(all_employees)
+    return projects, project_employees, all_employees
+
+def _aggregate_summary_stats_vectorized(all_tasks):
+    """
+    Gộp thống kê dự án / nhân viên cho báo cáo tổng hợp bằng NumPy (mã nhóm + np.bincount)
+    
+    Kết quả có cùng cấu trúc (và cùng thứ tự xuất hiện) với _aggregate_summary_stats_loop,
+    dùng khi số lượng task lớn.
+    
+    Args:
+        all_tasks (list): Danh sách tất cả các task
+        
+    Returns:
+        tuple: (projects, project_employees, all_employees)
+    """
+    tasks = []
+    project_names = []
+    for task in all_tasks:
+        project_name = task.get('actual_project', task.get('project', 'Unknown'))
+        # Bỏ qua các dự án không mong muốn trong báo cáo tổng hợp
+        if project_name in EXCLUDED_PROJECTS:
+            continue
+        tasks.append(task)
+        project_names.append(project_name)
+    
+    projects = {}
+    project_employees = {}
+    all_employees = {}
+    if not tasks:
+        return projects, project_employees, all_employees
+    
+    count = len(tasks)
+    employee_names = [task.get('employee_name', 'Unknown') for task in tasks]
+    employee_emails = [task.get('employee_email', '') for task in tasks]
+    has_worklog = np.fromiter((bool(task.get('has_worklog', False)) for task in tasks), dtype=bool, count=count)
+    est = np.fromiter((task.get('original_estimate_hours', 0) or 0 for task in tasks), dtype=np.float64, count=count)
+    act = np.fromiter((task.get('total_hours', 0) or 0 for task in tasks), dtype=np.float64, count=count)
+    time_saved = np.fromiter((task.get('time_saved_hours', 0) for task in tasks), dtype=np.float64, count=count)
+    
+    # Mặt nạ tính một lần thay cho rẽ nhánh theo từng task: chỉ task có log work mới được cộng giờ,
+    # thời gian tiết kiệm chỉ tính khi có estimate và > 0
+    # (time_saved == -1: không có log work, -2: có log work nhưng không có estimate)
+    # Các mặt nạ được áp dụng tại chỗ trên mảng đã có để không tạo thêm mảng tạm
+    with_worklog = has_worklog.astype(np.float64)
+    saved_mask = est > 0
+    saved_mask &= has_worklog
+    saved_mask &= time_saved > 0
+    est_contrib = np.multiply(est, with_worklog, out=est)
+    act_contrib = np.multiply(act, with_worklog, out=act)
+    saved_contrib = np.multiply(time_saved, saved_mask, out=time_saved)
+    
+    # Mã hóa dự án / nhân viên / cặp (dự án, nhân viên) theo thứ tự xuất hiện đầu tiên.
+    # Dùng dict (như _aggregate_employee_stats_numpy) thay vì pd.factorize: tên NaN/None được mã hóa
+    # giống hệt khóa dict của vòng lặp Python, không bị gán mã -1 làm np.bincount lỗi
+    def _encode(values):
+        ids = {}
+        codes = np.fromiter((ids.setdefault(value, len(ids)) for value in values), dtype=np.intp, count=len(values))
+        return codes, list(ids)
+    
+    project_codes, project_uniques = _encode(project_names)
+    employee_codes, employee_uniques = _encode(employee_names)
+    pair_codes, pair_uniques = _encode(list(zip(project_codes.tolist(), employee_codes.tolist())))
+    
+    def _group_sums(codes, size):
+        # np.bincount cộng tuần tự theo thứ tự task, cho kết quả giống hệt vòng lặp Python
+        total = np.bincount(codes, minlength=size)
+        with_logwork = np.bincount(codes, weights=with_worklog, minlength=size).astype(np.int64)
+        return (
+            total,
+            with_logwork,
+            total - with_logwork,
+            np.bincount(codes, weights=est_contrib, minlength=size),
+            np.bincount(codes, weights=act_contrib, minlength=size),
+            np.bincount(codes, weights=saved_contrib, minlength=size),
+        )
+    
+    def _to_stats(sums, i):
+        return {
+            'total_tasks': int(sums[0][i]),
+            'tasks_with_worklog': int(sums[1][i]),
+            'tasks_without_worklog': int(sums[2][i]),
+            'estimated_hours': float(sums[3][i]),
+            'actual_hours': float(sums[4][i]),
+            'saved_hours': float(sums[5][i])
+        }
+    
+    project_sums = _group_sums(project_codes, len(project_uniques))
+    for i, project_name in enumerate(project_uniques):
+        stats = _to_stats(project_sums, i)
+        stats.update({
+            'employee_set': set(),
+            'employees_with_worklog': set(),
+            'employees_without_worklog': set()
+        })
+        projects[project_name] = stats
+        project_employees[project_name] = {}
+    
+    # Email lấy từ task đầu tiên của mỗi nhóm (giống vòng lặp Python)
+    employee_sums = _group_sums(employee_codes, len(employee_uniques))
+    employee_first = np.unique(employee_codes, return_index=True)[1]
+    for i, employee_name in enumerate(employee_uniques):
+        stats = {'email': employee_emails[employee_first[i]]}
+        stats.update(_to_stats(employee_sums, i))
+        stats['projects'] = []
+        all_employees[employee_name] = stats
+    
+    pair_sums = _group_sums(pair_codes, len(pair_uniques))
+    pair_first = np.unique(pair_codes, return_index=True)[1]
+    for i in range(len(pair_uniques)):
+        first = pair_first[i]
+        project_name = project_names[first]
+        employee_name = employee_names[first]
+        stats = {'email': employee_emails[first]}
+        stats.update(_to_stats(pair_sums, i))
+        project_employees[project_name][employee_name] = stats
+        
+        project_data = projects[project_name]
+        project_data['employee_set'].add(employee_name)
+        if stats['tasks_with_worklog'] > 0:
+            project_data['employees_with_worklog'].add(employee_name)
+        if stats['tasks_without_worklog'] > 0:
+            project_data['employees_without_worklog'].add(employee_name)
+        all_employees[employee_name]['projects'].append(project_name)
+    
+    return projects, project_employees, all_employees
+
+def _write_top_table(f, title, header, separator, rows, row_fmt, row_fields):
+    """
+    Ghi một bảng Top N nhân viên của báo cáo tổng hợp
+    
+    Args:
+        f: File (hoặc buffer) đang ghi báo cáo
+        title (str): Dòng tiêu đề của bảng
+        header (str): Dòng tiêu đề cột
+        separator (str): Dòng phân cách dưới tiêu đề cột
+        rows (list): Danh sách (tên nhân viên, thống kê) đã sắp xếp
+        row_fmt (str): Mẫu dòng (các trường idx, name và các trường do row_fields trả về)
+        row_fields (callable): Hàm nhận thống kê và trả về dict giá trị cho row_fmt
+    """
+    f.write(title)
+    if not rows:
+        f.write("Không có dữ liệu\n")
+        return
+    
+    f.write(header)
+    f.write(separator)
+    f.write(''.join(
+        row_fmt.format(idx=idx, name=name[:28], **row_fields(stats))
+        for idx, (name, stats) in enumerate(rows, 1)
+    ))
+
+def create_projects_summary_report(all_tasks, output_file, csv_output_file, rolled_up=False):
     """
     Tạo báo cáo tổng hợp cho tất cả các dự án thực tế
     
@@ -4303,6 +4835,7 @@ def create_projects_summary_report(all_tasks, output_file, csv_output_file):
         all_tasks (list): Danh sách tất cả các task
         output_file (str): Đường dẫn đến file báo cáo tổng hợp dạng txt
         csv_output_file (str): Đường dẫn đến file báo cáo tổng hợp dạng csv
+        rolled_up (bool): True nếu all_tasks đã được cập nhật logwork/estimate từ task con (bỏ qua bước cập nhật)
         
     Returns:
         bool: True nếu thành công, False nếu thất bại
@@ -4317,44 +4850,50 @@ def create_projects_summary_report(all_tasks, output_file, csv_output_file):
         # Tạo từ điển để lưu thông tin nhân viên tổng hợp
         all_employees = {}
         
-        # Tạo từ điển ánh xạ từ task cha đến danh sách các task con
-        parent_to_children = {}
-        
-        # Xác định mối quan hệ cha-con giữa các task
-        for task in all_tasks:
-            # Nếu là task con, thêm vào danh sách con của task cha
-            if task.get('is_subtask') and task.get('parent_key'):
-                parent_key = task.get('parent_key')
-                if parent_key not in parent_to_children:
-                    parent_to_children[parent_key] = []
-                parent_to_children[parent_key].append(task)
-        
-        # Cập nhật trạng thái log work của task cha dựa trên con
-        for task in all_tasks:
-            # Nếu task là task cha (không phải là subtask) và có các task con
-            task_key = task.get('key')
-            if not task.get('is_subtask') and task_key in parent_to_children:
+        if not rolled_up:
+            # Tạo từ điển ánh xạ từ task cha đến danh sách các task con
+            parent_to_children = {}
+            
+            # Xác định mối quan hệ cha-con giữa các task
+            for task in all_tasks:
+                # Nếu là task con, thêm vào danh sách con của task cha
+                if task.get('is_subtask') and task.get('parent_key'):
+                    parent_key = task.get('parent_key')
+                    if parent_key not in parent_to_children:
+                        parent_to_children[parent_key] = []
+                    parent_to_children[parent_key].append(task)
+            
+            # Cập nhật trạng thái log work của task cha dựa trên con
+            tasks_by_key = {task['key']: task for task in all_tasks if task.get('key')}
+            for task_key, children in parent_to_children.items():
+                # Nếu task là task cha (không phải là subtask) và có các task con
+                task = tasks_by_key.get(task_key)
+                if task is None or task.get('is_subtask'):
+                    continue
+                # Gộp các phép cộng trên task con vào một lượt duyệt duy nhất
+                total_child_estimate = 0
+                children_total_hours = 0
+                any_child_logwork = False
+                for child in children:
+                    total_child_estimate += child.get('original_estimate_hours', 0) or 0
+                    if child.get('has_worklog', False):
+                        children_total_hours += child.get('total_hours', 0) or 0
+                        any_child_logwork = True
                 # Kiểm tra xem có task con nào đã log work không
                 if not task.get('has_worklog'):  # Nếu task cha chưa có log work
-                    children_with_logwork = [child for child in parent_to_children[task_key] if child.get('has_worklog', False)]
-                    if children_with_logwork:  # Nếu có ít nhất một task con đã log work
+                    if any_child_logwork:  # Nếu có ít nhất một task con đã log work
                         # Đánh dấu task cha là đã log work
                         task['has_worklog'] = True
                         task['has_child_with_logwork'] = True  # Thêm trường để đánh dấu
                         
                         # Quan trọng: Cập nhật time_saved_hours nếu đang là -1 (không có logwork)
                         if task.get('time_saved_hours', -1) == -1:
-                            # Tính tổng thời gian thực tế từ các task con
-                            children_total_hours = sum(child.get('total_hours', 0) for child in children_with_logwork)
-                            
-                            # Cập nhật thời gian thực tế cho task cha
+                            # Cập nhật thời gian thực tế cho task cha (tổng từ các task con)
                             if task.get('total_hours', 0) == 0:  # Chỉ cập nhật nếu task cha chưa có giá trị
                                 task['total_hours'] = children_total_hours
                             
                             # Nếu task cha không có estimate nhưng các task con có estimate
                             if task.get('original_estimate_hours', 0) == 0:
-                                # Tính tổng estimate từ task con
-                                total_child_estimate = sum(child.get('original_estimate_hours', 0) for child in parent_to_children[task_key])
                                 if total_child_estimate > 0:
                                     # Cập nhật estimate cho task cha
                                     task['original_estimate_hours'] = total_child_estimate
@@ -4366,198 +4905,42 @@ def create_projects_summary_report(all_tasks, output_file, csv_output_file):
                             else:
                                 # Nếu thực sự không có estimate nào (cả cha và con đều không có)
                                 task['time_saved_hours'] = -2  # Đánh dấu đặc biệt: có logwork nhưng không có estimate
+    
+        # Gộp thống kê: NumPy cho danh sách task lớn, vòng lặp Python cho danh sách nhỏ
+        if len(all_tasks) > VECTORIZE_MIN_TASKS:
+            projects, project_employees, all_employees = _aggregate_summary_stats_vectorized(all_tasks)
+        else:
+            projects, project_employees, all_employees = _aggregate_summary_stats_loop(all_tasks)
         
-        # Xử lý từng task để thu thập thông tin
-        for task in all_tasks:
-            project_name = task.get('actual_project', task.get('project', 'Unknown'))
-            
-            # Bỏ qua các dự án không mong muốn trong báo cáo tổng hợp
-            if project_name in ["FC", "IMS"]:
-                continue
-                
-            # DEBUG: Kiểm tra PKT và WAK có được gán đúng actual_project không
-            # if task.get('project') == 'PKT' and project_name != '[Project] Kho Tổng + PIM':
-            #     print(f"🔍 DEBUG: Task {task.get('key')} từ PKT có actual_project = '{project_name}' thay vì '[Project] Kho Tổng + PIM'!")
-            
-            # if task.get('project') == 'WAK' and project_name != 'Web App KHLC':
-            #     print(f"🔍 DEBUG: Task {task.get('key')} từ WAK có actual_project = '{project_name}' thay vì 'Web App KHLC'!")
-                
-            # DEBUG: Cảnh báo nếu PKT hoặc WAK vẫn xuất hiện như tên dự án
-            # if project_name in ['PKT', 'WAK']:
-            #     print(f"🚨 CẢNH BÁO: Task {task.get('key')} có actual_project = '{project_name}' - logic get_actual_project() KHÔNG hoạt động!")
-                
-            employee_name = task.get('employee_name', 'Unknown')
-            employee_email = task.get('employee_email', '')
-            has_worklog = task.get('has_worklog', False)
-            estimated_hours = task.get('original_estimate_hours', 0) or 0
-            actual_hours = task.get('total_hours', 0) or 0
-            time_saved = task.get('time_saved_hours', 0)
-            
-            # Cập nhật thông tin dự án
-            if project_name not in projects:
-                projects[project_name] = {
-                    'total_tasks': 0,
-                    'tasks_with_worklog': 0,
-                    'tasks_without_worklog': 0,
-                    'estimated_hours': 0,
-                    'actual_hours': 0,
-                    'saved_hours': 0,
-                    'employee_set': set(),
-                    'employees_with_worklog': set(),
-                    'employees_without_worklog': set(),
-                    'employee_task_status': {}  # Thêm từ điển để theo dõi trạng thái log work của nhân viên
-                }
-            
-            projects[project_name]['total_tasks'] += 1
-            projects[project_name]['employee_set'].add(employee_name)
-            
-            # Khởi tạo trạng thái log work của nhân viên nếu chưa có
-            if employee_name not in projects[project_name]['employee_task_status']:
-                projects[project_name]['employee_task_status'][employee_name] = {'has_log': False, 'no_log': False}
-            
-            if has_worklog:
-                projects[project_name]['tasks_with_worklog'] += 1
-                projects[project_name]['estimated_hours'] += estimated_hours
-                projects[project_name]['actual_hours'] += actual_hours
-                
-                # Cập nhật trạng thái log work của nhân viên
-                projects[project_name]['employee_task_status'][employee_name]['has_log'] = True
-                
-                # Tính toán thời gian tiết kiệm cho những task có log work và có estimate
-                if estimated_hours > 0 and time_saved != -1 and time_saved != -2:
-                    # time_saved == -1 nghĩa là không có log work
-                    # time_saved == -2 nghĩa là có log work nhưng không có estimate
-                    if time_saved > 0:
-                        projects[project_name]['saved_hours'] += time_saved
-            else:
-                projects[project_name]['tasks_without_worklog'] += 1
-                # Cập nhật trạng thái log work của nhân viên
-                projects[project_name]['employee_task_status'][employee_name]['no_log'] = True
-            
-            # Cập nhật thông tin nhân viên trong dự án
-            if project_name not in project_employees:
-                project_employees[project_name] = {}
-            
-            if employee_name not in project_employees[project_name]:
-                project_employees[project_name][employee_name] = {
-                    'email': employee_email,
-                    'total_tasks': 0,
-                    'tasks_with_worklog': 0,
-                    'tasks_without_worklog': 0,
-                    'estimated_hours': 0,
-                    'actual_hours': 0,
-                    'saved_hours': 0
-                }
-            
-            project_employees[project_name][employee_name]['total_tasks'] += 1
-            
-            if has_worklog:
-                project_employees[project_name][employee_name]['tasks_with_worklog'] += 1
-                project_employees[project_name][employee_name]['estimated_hours'] += estimated_hours
-                project_employees[project_name][employee_name]['actual_hours'] += actual_hours
-                
-                # Tính toán thời gian tiết kiệm
-                if estimated_hours > 0 and time_saved != -1 and time_saved != -2:
-                    if time_saved > 0:
-                        project_employees[project_name][employee_name]['saved_hours'] += time_saved
-            else:
-                project_employees[project_name][employee_name]['tasks_without_worklog'] += 1
-            
-            # Cập nhật thông tin nhân viên tổng hợp
-            if employee_name not in all_employees:
-                all_employees[employee_name] = {
-                    'email': employee_email,
-                    'total_tasks': 0,
-                    'tasks_with_worklog': 0,
-                    'tasks_without_worklog': 0,
-                    'estimated_hours': 0,
-                    'actual_hours': 0,
-                    'saved_hours': 0,
-                    'projects': set()
-                }
-            
-            all_employees[employee_name]['total_tasks'] += 1
-            all_employees[employee_name]['projects'].add(project_name)
-            
-            if has_worklog:
-                all_employees[employee_name]['tasks_with_worklog'] += 1
-                all_employees[employee_name]['estimated_hours'] += estimated_hours
-                all_employees[employee_name]['actual_hours'] += actual_hours
-                
-                # Tính toán thời gian tiết kiệm
-                if estimated_hours > 0 and time_saved != -1 and time_saved != -2:
-                    if time_saved > 0:
-                        all_employees[employee_name]['saved_hours'] += time_saved
-            else:
-                all_employees[employee_name]['tasks_without_worklog'] += 1
-        
-        # Tính toán các chỉ số phái sinh cho dự án
+        # Tính toán các chỉ số phái sinh cho dự án và nhân viên trong dự án (một lượt duyệt)
         for project_name, stats in projects.items():
-            if stats['total_tasks'] > 0:
-                stats['logwork_ratio'] = (stats['tasks_with_worklog'] / stats['total_tasks']) * 100
-            else:
-                stats['logwork_ratio'] = 0
-                
-            # Tính lại thời gian tiết kiệm: tổng ước tính - tổng thực tế
-            #stats['saved_hours'] = stats['estimated_hours'] - stats['actual_hours']
-                
-            if stats['estimated_hours'] > 0:
-                stats['saving_ratio'] = (stats['saved_hours'] / stats['estimated_hours']) * 100
-            else:
-                stats['saving_ratio'] = 0
-                
-            # Cập nhật danh sách nhân viên dựa trên trạng thái log work
-            stats['employees_with_worklog'] = set()
-            stats['employees_without_worklog'] = set()
+            _fill_summary_ratios(stats)
             
-            for emp_name, emp_status in stats['employee_task_status'].items():
-                if emp_status['has_log']:
-                    stats['employees_with_worklog'].add(emp_name)
-                if emp_status['no_log'] and not emp_status['has_log']:
-                    stats['employees_without_worklog'].add(emp_name)
+            # Nhân viên không log work: chỉ những người không có task nào đã log work trong dự án
+            stats['employees_without_worklog'] -= stats['employees_with_worklog']
             
             stats['total_employees'] = len(stats['employee_set'])
             stats['employees_with_worklog_count'] = len(stats['employees_with_worklog'])
             stats['employees_without_worklog_count'] = len(stats['employees_without_worklog'])
+            
+            for employee_stats in project_employees.get(project_name, {}).values():
+                _fill_summary_ratios(employee_stats)
         
-        # Tính toán các chỉ số phái sinh cho nhân viên trong từng dự án
-        for project_name, employees in project_employees.items():
-            for employee_name, stats in employees.items():
-                if stats['total_tasks'] > 0:
-                    stats['logwork_ratio'] = (stats['tasks_with_worklog'] / stats['total_tasks']) * 100
-                    stats['no_logwork_ratio'] = (stats['tasks_without_worklog'] / stats['total_tasks']) * 100
-                else:
-                    stats['logwork_ratio'] = 0
-                    stats['no_logwork_ratio'] = 0
-                    
-                if stats['estimated_hours'] > 0:
-                    stats['saving_ratio'] = (stats['saved_hours'] / stats['estimated_hours']) * 100
-                else:
-                    stats['saving_ratio'] = 0
-        
-        # Tính toán các chỉ số phái sinh cho nhân viên tổng hợp
+        # Tính toán các chỉ số phái sinh cho nhân viên tổng hợp, đồng thời đếm số nhân viên có log work
+        employees_with_worklog_total = 0
         for employee_name, stats in all_employees.items():
-            if stats['total_tasks'] > 0:
-                stats['logwork_ratio'] = (stats['tasks_with_worklog'] / stats['total_tasks']) * 100
-                stats['no_logwork_ratio'] = (stats['tasks_without_worklog'] / stats['total_tasks']) * 100
-            else:
-                stats['logwork_ratio'] = 0
-                stats['no_logwork_ratio'] = 0
-                
-            if stats['estimated_hours'] > 0:
-                stats['saving_ratio'] = (stats['saved_hours'] / stats['estimated_hours']) * 100
-            else:
-                stats['saving_ratio'] = 0
-            
-            stats['project_count'] = len(stats['projects'])
+            _fill_summary_ratios(stats)
+            stats['project_count'] = len(set(stats['projects']))
+            if stats['tasks_with_worklog'] > 0:
+                employees_with_worklog_total += 1
         
         # Tạo danh sách top 10
         # Top 10 nhân viên có tỷ lệ log work cao nhất
-        top_logwork_ratio = sorted(
-            [item for item in all_employees.items()],
-            key=lambda x: x[1]['logwork_ratio'],
-            reverse=True
-        )[:10]
+        top_logwork_ratio = heapq.nlargest(
+            10,
+            all_employees.items(),
+            key=lambda x: x[1]['logwork_ratio']
+        )
         
         # Thêm kiểm tra tính nhất quán giữa báo cáo dự án và báo cáo tổng hợp
         # Lưu thông tin để so sánh sau khi tạo báo cáo chi tiết
@@ -4570,39 +4953,56 @@ def create_projects_summary_report(all_tasks, output_file, csv_output_file):
             }
         
         # Top 10 nhân viên có thời gian tiết kiệm lớn nhất
-        top_time_saving = sorted(
+        top_time_saving = heapq.nlargest(
+            10,
             all_employees.items(),
-            key=lambda x: x[1]['saved_hours'],
-            reverse=True
-        )[:10]
+            key=lambda x: x[1]['saved_hours']
+        )
         
         # Top 10 nhân viên không log work
-        top_no_logwork = sorted(
-            [item for item in all_employees.items() if item[1]['tasks_without_worklog'] > 0],
-            key=lambda x: (x[1]['tasks_without_worklog'], -x[1]['total_tasks']),
-            reverse=True
-        )[:10]
+        top_no_logwork = heapq.nlargest(
+            10,
+            (item for item in all_employees.items() if item[1]['tasks_without_worklog'] > 0),
+            key=lambda x: (x[1]['tasks_without_worklog'], -x[1]['total_tasks'])
+        )
         
         # Top 10 nhân viên có tỷ lệ không log work cao nhất
-        top_no_logwork_ratio = sorted(
-            [item for item in all_employees.items() if item[1].get('tasks_without_logwork', 0) > 0],
-            key=lambda x: x[1].get('no_logwork_ratio', 0),
-            reverse=True
-        )[:10]
+        top_no_logwork_ratio = heapq.nlargest(
+            10,
+            (item for item in all_employees.items() if item[1].get('tasks_without_logwork', 0) > 0),
+            key=lambda x: x[1].get('no_logwork_ratio', 0)
+        )
+        
+        # Sắp xếp dự án theo số task một lần, dùng chung cho báo cáo txt và csv
+        sorted_projects = sorted(projects.items(), key=lambda x: x[1]['total_tasks'], reverse=True)
         
-        # Tạo báo cáo tổng hợp
-        with open(output_file, 'w', encoding='utf-8') as f:
+        # Tạo báo cáo tổng hợp (buffer lớn để gom các lần ghi xuống đĩa)
+        with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
             f.write("=== BÁO CÁO TỔNG HỢP CÁC DỰ ÁN ===\n\n")
             
             # Thống kê tổng quan
-            # Loại bỏ dự án FC khỏi tổng số (dự phòng)
-            filtered_projects = {name: stats for name, stats in projects.items() if name != "FC"}
-            total_projects = len(filtered_projects)
-            total_tasks = sum(stats['total_tasks'] for stats in filtered_projects.values())
+            # (projects không chứa các dự án trong EXCLUDED_PROJECTS, đã lọc khi gộp thống kê)
+            total_projects = len(projects)
             total_employees = len(all_employees)
-            total_estimated_hours = sum(stats['estimated_hours'] for stats in filtered_projects.values())
-            total_actual_hours = sum(stats['actual_hours'] for stats in filtered_projects.values())
-            total_saved_hours = sum(stats['saved_hours'] for stats in filtered_projects.values())
+            
+            # Cộng dồn các chỉ số tổng trong một lượt duyệt; số giờ cộng bằng math.fsum
+            # (tổng chính xác, không tích lũy sai số làm tròn qua từng dự án)
+            total_tasks = 0
+            total_tasks_with_worklog = 0
+            estimated_hours_list = []
+            actual_hours_list = []
+            saved_hours_list = []
+            for stats in projects.values():
+                total_tasks += stats['total_tasks']
+                total_tasks_with_worklog += stats['tasks_with_worklog']
+                estimated_hours_list.append(stats['estimated_hours'])
+                actual_hours_list.append(stats['actual_hours'])
+                saved_hours_list.append(stats['saved_hours'])
+            total_estimated_hours = math.fsum(estimated_hours_list)
+            total_actual_hours = math.fsum(actual_hours_list)
+            total_saved_hours = math.fsum(saved_hours_list)
+            
+            employees_without_worklog_total = total_employees - employees_with_worklog_total
             
             f.write("📊 THỐNG KÊ TỔNG QUAN:\n")
             f.write(f"- Tổng số dự án: {total_projects}\n")
@@ -4625,18 +5025,15 @@ def create_projects_summary_report(all_tasks, output_file, csv_output_file):
             f.write(header)
             f.write(separator)
             
-            # In dữ liệu từng dự án
-            for project_name, stats in sorted(projects.items(), key=lambda x: x[1]['total_tasks'], reverse=True):
-                # Bỏ qua dự án FC trong bảng thống kê
-                if project_name == "FC":
-                    continue
-                    
-                row = "| {:<30} | {:>5} | {:>5} | {:>6.1f} | {:>8.1f} | {:>8.1f} | {:>8.1f} | {:>6.1f} | {:>8} | {:>8} | {:>8} |\n".format(
+            # In dữ liệu từng dự án (gom các dòng rồi ghi một lần)
+            row_fmt = "| {:<30} | {:>5} | {:>5} | {:>6.1f} | {:>8.1f} | {:>8.1f} | {:>8.1f} | {:>6.1f} | {:>8} | {:>8} | {:>8} |\n"
+            rows = [
+                row_fmt.format(
                     project_name[:30],
                     stats['total_tasks'],
                     stats['tasks_with_worklog'],
                     stats['logwork_ratio'],
-                stats['estimated_hours'], 
+                    stats['estimated_hours'],
                     stats['actual_hours'],
                     stats['saved_hours'],
                     stats['saving_ratio'],
@@ -4644,100 +5041,105 @@ def create_projects_summary_report(all_tasks, output_file, csv_output_file):
                     stats['employees_with_worklog_count'],
                     stats['employees_without_worklog_count']
                 )
-                f.write(row)
+                for project_name, stats in sorted_projects
+            ]
+            f.write(''.join(rows))
             
             f.write(separator)
             
             # Tổng cộng
-            total_row = "| {:<30} | {:>5} | {:>5} | {:>6.1f} | {:>8.1f} | {:>8.1f} | {:>8.1f} | {:>6.1f} | {:>8} | {:>8} | {:>8} |\n".format(
+            total_row = row_fmt.format(
                 "TỔNG CỘNG",
                 total_tasks,
-                sum(stats['tasks_with_worklog'] for stats in filtered_projects.values()),
-                (sum(stats['tasks_with_worklog'] for stats in filtered_projects.values()) / total_tasks * 100) if total_tasks > 0 else 0,
+                total_tasks_with_worklog,
+                (total_tasks_with_worklog / total_tasks * 100) if total_tasks > 0 else 0,
                 total_estimated_hours,
                 total_actual_hours,
                 total_saved_hours,
                 (total_saved_hours / total_estimated_hours * 100) if total_estimated_hours > 0 else 0,
                 total_employees,
-                len([e for e in all_employees.values() if e['tasks_with_worklog'] > 0]),
-                len([e for e in all_employees.values() if e['tasks_with_worklog'] == 0])
+                employees_with_worklog_total,
+                employees_without_worklog_total
             )
             f.write(total_row)
             f.write(separator)
             f.write("\n\n")
             
             # Top 10 nhân viên có tỷ lệ log work cao nhất
-            f.write("🔝 TOP 10 NHÂN VIÊN CÓ TỶ LỆ LOG WORK CAO NHẤT:\n")
-            if top_logwork_ratio:
-                header = f"{'STT':<5}{'Tên nhân viên':<30}{'Số dự án':<10}{'Tổng task':<10}{'Có log':<10}{'Tỷ lệ log':<10}{'Thời gian':<10}\n"
-                f.write(header)
-                f.write("-" * 85 + "\n")
-                
-                for idx, (name, stats) in enumerate(top_logwork_ratio, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['project_count']:<10}{stats['total_tasks']:<10}{stats['tasks_with_worklog']:<10}{stats['logwork_ratio']:.1f}%{' ':<5}{stats['actual_hours']:.1f}h\n"
-                    f.write(row)
-            else:
-                f.write("Không có dữ liệu\n")
+            _write_top_table(
+                f, "🔝 TOP 10 NHÂN VIÊN CÓ TỶ LỆ LOG WORK CAO NHẤT:\n",
+                f"{'STT':<5}{'Tên nhân viên':<30}{'Số dự án':<10}{'Tổng task':<10}{'Có log':<10}{'Tỷ lệ log':<10}{'Thời gian':<10}\n", _DASH85,
+                top_logwork_ratio, SUMMARY_LOGWORK_RATIO_ROW_FMT,
+                lambda stats: {'projects': stats['project_count'], 'total': stats['total_tasks'], 'with_lw': stats['tasks_with_worklog'], 'ratio': stats['logwork_ratio'], 'actual': stats['actual_hours']}
+            )
             f.write("\n")
             
             # Top 10 nhân viên có thời gian tiết kiệm lớn nhất
-            f.write("💰 TOP 10 NHÂN VIÊN TIẾT KIỆM THỜI GIAN NHIỀU NHẤT:\n")
-            if top_time_saving:
-                header = f"{'STT':<5}{'Tên nhân viên':<30}{'Tổng task':<10}{'Ước tính':<10}{'Thực tế':<10}{'Tiết kiệm':<10}{'Tỷ lệ':<10}\n"
-                f.write(header)
-                f.write("-" * 85 + "\n")
-                
-                for idx, (name, stats) in enumerate(top_time_saving, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['total_tasks']:<10}{stats['estimated_hours']:.1f}h{' ':<5}{stats['actual_hours']:.1f}h{' ':<5}{stats['saved_hours']:.1f}h{' ':<5}{stats['saving_ratio']:.1f}%\n"
-                    f.write(row)
-            else:
-                f.write("Không có dữ liệu\n")
+            _write_top_table(
+                f, "💰 TOP 10 NHÂN VIÊN TIẾT KIỆM THỜI GIAN NHIỀU NHẤT:\n",
+                f"{'STT':<5}{'Tên nhân viên':<30}{'Tổng task':<10}{'Ước tính':<10}{'Thực tế':<10}{'Tiết kiệm':<10}{'Tỷ lệ':<10}\n", _DASH85,
+                top_time_saving, SUMMARY_SAVING_ROW_FMT,
+                lambda stats: {'total': stats['total_tasks'], 'estimated': stats['estimated_hours'], 'actual': stats['actual_hours'], 'saved': stats['saved_hours'], 'ratio': stats['saving_ratio']}
+            )
             f.write("\n")
             
+            no_logwork_header = f"{'STT':<5}{'Tên nhân viên':<30}{'Số dự án':<10}{'Tổng task':<10}{'Không log':<10}{'Tỷ lệ':<10}\n"
+            no_logwork_fields = lambda stats: {'projects': stats['project_count'], 'total': stats['total_tasks'], 'no_lw': stats['tasks_without_worklog'], 'ratio': stats['no_logwork_ratio']}
+            
             # Top 10 nhân viên không log work
-            f.write("⚠️ TOP 10 NHÂN VIÊN CÓ NHIỀU TASK KHÔNG LOG WORK:\n")
-            if top_no_logwork:
-                header = f"{'STT':<5}{'Tên nhân viên':<30}{'Số dự án':<10}{'Tổng task':<10}{'Không log':<10}{'Tỷ lệ':<10}\n"
-                f.write(header)
-                f.write("-" * 75 + "\n")
-                
-                for idx, (name, stats) in enumerate(top_no_logwork, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['project_count']:<10}{stats['total_tasks']:<10}{stats['tasks_without_worklog']:<10}{stats['no_logwork_ratio']:.1f}%\n"
-                    f.write(row)
-            else:
-                f.write("Không có dữ liệu\n")
+            _write_top_table(
+                f, "⚠️ TOP 10 NHÂN VIÊN CÓ NHIỀU TASK KHÔNG LOG WORK:\n",
+                no_logwork_header, _DASH75,
+                top_no_logwork, SUMMARY_NO_LOGWORK_ROW_FMT, no_logwork_fields
+            )
             f.write("\n")
             
             # Top 10 nhân viên có tỷ lệ không log work cao nhất
-            f.write("🚫 TOP 10 NHÂN VIÊN CÓ TỶ LỆ KHÔNG LOG WORK CAO NHẤT:\n")
-            if top_no_logwork_ratio:
-                header = f"{'STT':<5}{'Tên nhân viên':<30}{'Số dự án':<10}{'Tổng task':<10}{'Không log':<10}{'Tỷ lệ':<10}\n"
-                f.write(header)
-                f.write("-" * 75 + "\n")
-                
-                for idx, (name, stats) in enumerate(top_no_logwork_ratio, 1):
-                    row = f"{idx:<5}{name[:28]:<30}{stats['project_count']:<10}{stats['total_tasks']:<10}{stats['tasks_without_worklog']:<10}{stats['no_logwork_ratio']:.1f}%\n"
-                    f.write(row)
-            else:
-                f.write("Không có dữ liệu\n")
+            _write_top_table(
+                f, "🚫 TOP 10 NHÂN VIÊN CÓ TỶ LỆ KHÔNG LOG WORK CAO NHẤT:\n",
+                no_logwork_header, _DASH75,
+                top_no_logwork_ratio, SUMMARY_NO_LOGWORK_ROW_FMT, no_logwork_fields
+            )
         
         # Tạo báo cáo CSV
-        with open(csv_output_file, 'w', encoding='utf-8', newline='') as f:
+        with open(csv_output_file, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            
             # Header
-            f.write("Project,Tasks,TasksWithLog,LogRatio,EstimatedHours,ActualHours,SavedHours,SavingRatio,Employees,EmployeesWithLog,EmployeesWithoutLog\n")
+            writer.writerow(["Project", "Tasks", "TasksWithLog", "LogRatio", "EstimatedHours", "ActualHours", "SavedHours", "SavingRatio", "Employees", "EmployeesWithLog", "EmployeesWithoutLog"])
             
-            # Dữ liệu từng dự án
-            for project_name, stats in sorted(projects.items(), key=lambda x: x[1]['total_tasks'], reverse=True):
-                # Bỏ qua dự án FC trong báo cáo CSV
-                if project_name == "FC":
-                    continue
-                    
-                row = f"{project_name.replace(',', ';')},{stats['total_tasks']},{stats['tasks_with_worklog']},{stats['logwork_ratio']:.1f},{stats['estimated_hours']:.1f},{stats['actual_hours']:.1f},{stats['saved_hours']:.1f},{stats['saving_ratio']:.1f},{stats['total_employees']},{stats['employees_with_worklog_count']},{stats['employees_without_worklog_count']}\n"
-                f.write(row)
+            # Dữ liệu từng dự án (số thực đã định dạng sẵn 1 chữ số thập phân; tên có dấu phẩy được csv tự đặt trong ngoặc kép)
+            writer.writerows(
+                (
+                    project_name,
+                    stats['total_tasks'],
+                    stats['tasks_with_worklog'],
+                    f"{stats['logwork_ratio']:.1f}",
+                    f"{stats['estimated_hours']:.1f}",
+                    f"{stats['actual_hours']:.1f}",
+                    f"{stats['saved_hours']:.1f}",
+                    f"{stats['saving_ratio']:.1f}",
+                    stats['total_employees'],
+                    stats['employees_with_worklog_count'],
+                    stats['employees_without_worklog_count']
+                )
+                for project_name, stats in sorted_projects
+            )
                 
             # Tổng cộng
-            total_row = f"TỔNG CỘNG,{total_tasks},{sum(stats['tasks_with_worklog'] for stats in filtered_projects.values())},{(sum(stats['tasks_with_worklog'] for stats in filtered_projects.values()) / total_tasks * 100) if total_tasks > 0 else 0:.1f},{total_estimated_hours:.1f},{total_actual_hours:.1f},{total_saved_hours:.1f},{(total_saved_hours / total_estimated_hours * 100) if total_estimated_hours > 0 else 0:.1f},{total_employees},{len([e for e in all_employees.values() if e['tasks_with_worklog'] > 0])},{len([e for e in all_employees.values() if e['tasks_with_worklog'] == 0])}\n"
-            f.write(total_row)
+            writer.writerow((
+                "TỔNG CỘNG",
+                total_tasks,
+                total_tasks_with_worklog,
+                f"{(total_tasks_with_worklog / total_tasks * 100) if total_tasks > 0 else 0:.1f}",
+                f"{total_estimated_hours:.1f}",
+                f"{total_actual_hours:.1f}",
+                f"{total_saved_hours:.1f}",
+                f"{(total_saved_hours / total_estimated_hours * 100) if total_estimated_hours > 0 else 0:.1f}",
+                total_employees,
+                employees_with_worklog_total,
+                employees_without_worklog_total
+            ))
         
         print(f"✅ Đã tạo báo cáo tổng hợp: {output_file}")
         print(f"✅ Đã tạo báo cáo CSV: {csv_output_file}")
@@ -4749,13 +5151,14 @@ def create_projects_summary_report(all_tasks, output_file, csv_output_file):
         traceback.print_exc()
         return None
 
-def check_consistency(project_summary_stats, project_report_files):
+def check_consistency(project_summary_stats, per_project_recomputed_stats):
     """
     Kiểm tra tính nhất quán giữa báo cáo tổng hợp và báo cáo chi tiết dự án
     
     Args:
         project_summary_stats (dict): Thông tin thời gian tiết kiệm từ báo cáo tổng hợp
-        project_report_files (list): Danh sách file báo cáo dự án
+        per_project_recomputed_stats (dict): Số liệu tổng của từng báo cáo dự án (theo tên dự án),
+            do create_project_report ghi vào tham số project_totals
         
     Returns:
         bool: True nếu nhất quán, False nếu có sự khác biệt
@@ -4763,69 +5166,41 @@ def check_consistency(project_summary_stats, project_report_files):
             # print("\n🔍 KIỂM TRA TÍNH NHẤT QUÁN GIỮA BÁO CÁO TỔNG HỢP VÀ BÁO CÁO DỰ ÁN:")
     
     inconsistencies = []
+    tolerance = 1.0  # Tăng dung sai lên 1 giờ
     
-    for report_file in project_report_files:
-        # Lấy tên dự án từ tên file báo cáo
-        file_name = os.path.basename(report_file)
-        
-        # Bỏ qua file báo cáo tổng hợp
-        if file_name.startswith("all_projects_summary"):
+    # So sánh trực tiếp trong bộ nhớ, không đọc lại file báo cáo dự án
+    for project_name, report_stats in per_project_recomputed_stats.items():
+        # Bỏ qua nếu dự án không có trong báo cáo tổng hợp
+        summary_stats = project_summary_stats.get(project_name)
+        if not summary_stats:
             continue
-            
-        # Trích xuất thông tin thời gian tiết kiệm từ file báo cáo dự án
-        try:
-            with open(report_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-                # Tìm tên dự án
-                match = re.search(r"=== BÁO CÁO DỰ ÁN: (.*?) ===", content)
-                if not match:
-                    continue
-                    
-                project_name = match.group(1)
-                
-                # Bỏ qua nếu dự án không có trong báo cáo tổng hợp
-                if project_name not in project_summary_stats:
-                    continue
-                
-                # Tìm thông tin thời gian từ báo cáo dự án
-                est_match = re.search(r"- Tổng thời gian ước tính: ([\d\.]+) giờ", content)
-                act_match = re.search(r"- Tổng thời gian thực tế: ([\d\.]+) giờ", content)
-                save_match = re.search(r"- Thời gian tiết kiệm: ([\d\.]+) giờ", content)
-                
-                if est_match and act_match and save_match:
-                    report_est = float(est_match.group(1))
-                    report_act = float(act_match.group(1))
-                    report_save = float(save_match.group(1))
-                    
-                    # So sánh với thông tin từ báo cáo tổng hợp
-                    summary_est = project_summary_stats[project_name]['estimated_hours']
-                    summary_act = project_summary_stats[project_name]['actual_hours']
-                    summary_save = project_summary_stats[project_name]['saved_hours']
-                    
-                    # Kiểm tra sự chênh lệch (cho phép sai số nhỏ do làm tròn)
-                    est_diff = abs(report_est - summary_est)
-                    act_diff = abs(report_act - summary_act)
-                    save_diff = abs(report_save - summary_save)
-                    
-                    tolerance = 1.0  # Tăng dung sai lên 1 giờ
-                    
-                    if est_diff > tolerance or act_diff > tolerance or save_diff > tolerance:
-                        inconsistencies.append({
-                            'project': project_name,
-                            'report_file': file_name,
-                            'report_est': report_est,
-                            'summary_est': summary_est,
-                            'est_diff': est_diff,
-                            'report_act': report_act,
-                            'summary_act': summary_act,
-                            'act_diff': act_diff,
-                            'report_save': report_save,
-                            'summary_save': summary_save,
-                            'save_diff': save_diff
-                        })
-        except Exception as e:
-            print(f"⚠️ Lỗi khi kiểm tra file {file_name}: {str(e)}")
+        
+        report_est = report_stats['estimated_hours']
+        report_act = report_stats['actual_hours']
+        report_save = report_stats['saved_hours']
+        summary_est = summary_stats['estimated_hours']
+        summary_act = summary_stats['actual_hours']
+        summary_save = summary_stats['saved_hours']
+        
+        # Kiểm tra sự chênh lệch (cho phép sai số nhỏ do làm tròn)
+        est_diff = abs(report_est - summary_est)
+        act_diff = abs(report_act - summary_act)
+        save_diff = abs(report_save - summary_save)
+        
+        if est_diff > tolerance or act_diff > tolerance or save_diff > tolerance:
+            inconsistencies.append({
+                'project': project_name,
+                'report_file': report_stats.get('report_file', project_name),
+                'report_est': report_est,
+                'summary_est': summary_est,
+                'est_diff': est_diff,
+                'report_act': report_act,
+                'summary_act': summary_act,
+                'act_diff': act_diff,
+                'report_save': report_save,
+                'summary_save': summary_save,
+                'save_diff': save_diff
+            })
     
     # Hiển thị kết quả
     if inconsistencies:
@@ -4874,9 +5249,13 @@ def synchronize_reports(all_tasks, output_dir, timestamp):
         bool: True nếu thành công, False nếu thất bại
     """
     try:
-        # Lấy danh sách tất cả file báo cáo
-        report_files = [os.path.join(output_dir, f) for f in os.listdir(output_dir) 
-                         if f.endswith(f"{timestamp}.txt")]
+        # Lấy danh sách tất cả file báo cáo dự án (bỏ qua báo cáo tổng hợp), tên file -> đường dẫn
+        suffix = f"{timestamp}.txt"
+        with os.scandir(output_dir) as entries:
+            report_files = {
+                entry.name: entry.path for entry in entries
+                if entry.name.endswith(suffix) and "all_projects_summary" not in entry.name and entry.is_file()
+            }
         
         # Đọc báo cáo tổng hợp
         summary_file = os.path.join(output_dir, f"all_projects_summary_{timestamp}.txt")
@@ -4884,28 +5263,45 @@ def synchronize_reports(all_tasks, output_dir, timestamp):
             print(f"⚠️ Không tìm thấy báo cáo tổng hợp: {summary_file}")
             return False
             
-        # Tạo dictionary để lưu thông tin dự án
-        projects_tasks = {}
+        # Gán mã cho từng dự án (theo thứ tự xuất hiện) và gom số liệu task vào mảng NumPy
+        project_codes = {}
+        codes = []
+        tasks = []
         for task in all_tasks:
             project_name = task.get('actual_project', task.get('project', 'Unknown'))
-            if project_name in ["FC", "IMS"]:  # Bỏ qua các dự án không mong muốn
+            if project_name in EXCLUDED_PROJECTS:  # Bỏ qua các dự án không mong muốn
                 continue
-                
-            if project_name not in projects_tasks:
-                projects_tasks[project_name] = []
-            projects_tasks[project_name].append(task)
+            
+            code = project_codes.get(project_name)
+            if code is None:
+                code = project_codes[project_name] = len(project_codes)
+            codes.append(code)
+            tasks.append(task)
+        
+        count = len(tasks)
+        codes = np.asarray(codes, dtype=np.intp)
+        est = np.fromiter((task.get('original_estimate_hours', 0) or 0 for task in tasks), dtype=np.float64, count=count)
+        act = np.fromiter((task.get('total_hours', 0) or 0 for task in tasks), dtype=np.float64, count=count)
+        has_worklog = np.fromiter((bool(task.get('has_worklog', False)) for task in tasks), dtype=np.float64, count=count)
+        
+        # Tổng theo dự án trong một lượt (np.bincount cộng tuần tự, cùng kết quả với sum() của Python)
+        size = len(project_codes)
+        task_counts = np.bincount(codes, minlength=size)
+        logwork_counts = np.bincount(codes, weights=has_worklog, minlength=size)
+        est_sums = np.bincount(codes, weights=est, minlength=size)
+        act_sums = np.bincount(codes, weights=act, minlength=size)
         
         # Tính toán lại thời gian tiết kiệm cho từng dự án
         project_stats = {}
-        for project_name, tasks in projects_tasks.items():
-            total_estimated_hours = sum(task.get('original_estimate_hours', 0) or 0 for task in tasks)
-            total_actual_hours = sum(task.get('total_hours', 0) or 0 for task in tasks)
+        for project_name, code in project_codes.items():
+            total_estimated_hours = float(est_sums[code])
+            total_actual_hours = float(act_sums[code])
             saved_hours = total_estimated_hours - total_actual_hours
             saving_ratio = (saved_hours / total_estimated_hours * 100) if total_estimated_hours > 0 else 0
             
             project_stats[project_name] = {
-                'total_tasks': len(tasks),
-                'tasks_with_logwork': len([task for task in tasks if task.get('has_worklog', False)]),
+                'total_tasks': int(task_counts[code]),
+                'tasks_with_logwork': int(logwork_counts[code]),
                 'total_estimated_hours': total_estimated_hours,
                 'total_actual_hours': total_actual_hours,
                 'saved_hours': saved_hours,
@@ -4916,24 +5312,30 @@ def synchronize_reports(all_tasks, output_dir, timestamp):
         with open(summary_file, 'r', encoding='utf-8') as f:
             content = f.read()
             
-        # Cập nhật từng dự án trong báo cáo tổng hợp
-        for project_name, stats in project_stats.items():
-            # Tìm dòng thông tin dự án trong báo cáo
-            pattern = r"\|\s+" + re.escape(project_name) + r"\s+\|\s+(\d+)\s+\|\s+(\d+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+([\d\.]+)\s+\|\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\d+)\s+\|"
-            replacement = f"| {project_name:<30} | {stats['total_tasks']:>5} | {stats['tasks_with_logwork']:>5} | {(stats['tasks_with_logwork']/stats['total_tasks']*100) if stats['total_tasks'] > 0 else 0:>6.1f} | {stats['total_estimated_hours']:>8.1f} | {stats['total_actual_hours']:>8.1f} | {stats['saved_hours']:>8.1f} | {stats['saving_ratio']:>6.1f} | {0:>8} | {0:>8} | {0:>8} |"
-            content = re.sub(pattern, replacement, content)
-            
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Cập nhật từng dự án trong báo cáo tổng hợp: quét nội dung một lần,
+        # mỗi dòng bảng tra cứu số liệu theo tên dự án thay vì chạy một regex cho mỗi dự án
+        def _replace_summary_row(match):
+            project_name = match.group(1)
+            stats = project_stats.get(project_name)
+            if stats is None:
+                return match.group(0)
+            return f"| {project_name:<30} | {stats['total_tasks']:>5} | {stats['tasks_with_logwork']:>5} | {(stats['tasks_with_logwork']/stats['total_tasks']*100) if stats['total_tasks'] > 0 else 0:>6.1f} | {stats['total_estimated_hours']:>8.1f} | {stats['total_actual_hours']:>8.1f} | {stats['saved_hours']:>8.1f} | {stats['saving_ratio']:>6.1f} | {0:>8} | {0:>8} | {0:>8} |"
+        
+        content = _SUMMARY_ROW_RE.sub(_replace_summary_row, content)
+        
+        # Ghi lại bằng cùng cách đã tạo báo cáo (encode một lần, giữ nguyên kiểu xuống dòng)
+        _write_report_file(summary_file, content)
             
         # Cập nhật từng báo cáo dự án
         for project_name, stats in project_stats.items():
-            # Tìm file báo cáo dự án
-            project_file = None
-            for file in report_files:
-                if project_name in os.path.basename(file) and "all_projects_summary" not in os.path.basename(file):
-                    project_file = file
-                    break
+            # Tìm file báo cáo dự án: ưu tiên đúng tên "<dự án>_<timestamp>.txt", nếu không có
+            # thì lấy file đầu tiên có chứa tên dự án
+            project_file = report_files.get(f"{project_name}_{suffix}")
+            if project_file is None:
+                for file_name, file_path in report_files.items():
+                    if project_name in file_name:
+                        project_file = file_path
+                        break
                     
             if not project_file:
                 continue
@@ -4943,18 +5345,16 @@ def synchronize_reports(all_tasks, output_dir, timestamp):
                 content = f.read()
                 
             # Cập nhật thời gian tiết kiệm
-            est_pattern = r"- Tổng thời gian ước tính: ([\d\.]+) giờ"
-            act_pattern = r"- Tổng thời gian thực tế: ([\d\.]+) giờ"
-            save_pattern = r"- Thời gian tiết kiệm: ([\d\.]+) giờ \(([\d\.]+)%\)"
-            
-            # Đảm bảo số liệu ước tính và thực tế khớp với đã tính toán
-            content = re.sub(est_pattern, f"- Tổng thời gian ước tính: {stats['total_estimated_hours']:.1f} giờ", content)
-            content = re.sub(act_pattern, f"- Tổng thời gian thực tế: {stats['total_actual_hours']:.1f} giờ", content)
-            content = re.sub(save_pattern, f"- Thời gian tiết kiệm: {stats['saved_hours']:.1f} giờ ({stats['saving_ratio']:.1f}%)", content)
+            # Đảm bảo số liệu ước tính và thực tế khớp với đã tính toán (một lượt quét cho cả ba dòng)
+            replacements = {
+                'est': f"- Tổng thời gian ước tính: {stats['total_estimated_hours']:.1f} giờ",
+                'act': f"- Tổng thời gian thực tế: {stats['total_actual_hours']:.1f} giờ",
+                'save': f"- Thời gian tiết kiệm: {stats['saved_hours']:.1f} giờ ({stats['saving_ratio']:.1f}%)",
+            }
+            content = _PROJECT_TOTALS_RE.sub(lambda match: replacements[match.lastgroup], content)
             
             # Ghi nội dung mới
-            with open(project_file, 'w', encoding='utf-8') as f:
-                f.write(content)
+            _write_report_file(project_file, content)
                 
         print(f"✅ Đã đồng bộ hóa tất cả các báo cáo thành công!")
         return True
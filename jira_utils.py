@@ -1,14 +1,85 @@
 import os
 import json
 import time
+import functools
+import itertools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 
 from logger import get_logger
 
+# orjson (tuỳ chọn, khai báo trong requirements-optional.txt) parse/serialize JSON nhanh hơn nhiều so với json chuẩn; không có thì dùng json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+# Số luồng tải worklog song song khi chuẩn hoá nhiều issue
+WORKLOG_FETCH_WORKERS = 8
+
+# Component của FC ánh xạ sang dự án thực tế (dùng trong fallback của _compute_actual_project)
+FC_RSA_COMPONENTS = frozenset({"LC Offline Q1", "LC RSA Ecom", "B05. RSA/RSA ECOM", "LCD", "Tuning RSA Ecom"})
+FC_PAYMENT_COMPONENTS = frozenset({"PaymentTenacy"})
+
+# Các field cần cho search_recent_tasks: chỉ những field build_task_object và rule nhắc việc thực sự đọc
+RECENT_TASK_FIELDS = (
+    "summary",
+    "status",
+    "updated",
+    "issuetype",
+    "priority",
+    "project",
+    "components",
+    "timeoriginalestimate",
+    "assignee",
+    "reporter",
+    "description",
+    "fixVersions",
+    "statuscategorychangedate",
+    "worklog",
+)
+
+# Buffer của file log request/response (ghi xuống đĩa theo khối thay vì từng dòng)
+LOG_FILE_BUFFER_SIZE = 64 * 1024
+
+# Số mục tối đa trong cache get_issue/get_worklog của một client (LRU, bỏ mục ít dùng nhất khi đầy)
+CACHE_MAX_ENTRIES = 1024
+
+# Kích thước connection pool của session, đủ cho các luồng tải song song (trang JQL + worklog)
+HTTP_POOL_SIZE = 32
+
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_iso(iso_str: str) -> str:
+    """Đổi thời gian ISO của Jira sang "dd/mm/YYYY HH:MM" (có cache: timestamp trong một lượt chạy lặp lại nhiều)."""
+    if not iso_str:
+        return ""
+    try:
+        return datetime.fromisoformat(iso_str.replace("Z", "+00:00")).strftime("%d/%m/%Y %H:%M")
+    except Exception:
+        return iso_str
+
 
 class JiraClient:
     """
@@ -21,10 +92,10 @@ class JiraClient:
     - Chuẩn hoá dữ liệu về dạng task object thống nhất
 
     Cách dùng cơ bản:
-        client = JiraClient(jira_url, username, password)
-        issues = client.search_issues("assignee = 'user@domain' AND updatedDate >= '2025-10-01'")
-        for issue in issues:
-            task = client.build_task_object(issue)
+        with JiraClient(jira_url, username, password) as client:
+            issues = client.search_issues("assignee = 'user@domain' AND updatedDate >= '2025-10-01'")
+            for issue in issues:
+                task = client.build_task_object(issue)
     """
 
     def __init__(
@@ -40,8 +111,14 @@ class JiraClient:
         default_headers: Optional[Dict[str, str]] = None,
         log_file: Optional[str] = None,
         log_response_json: bool = False,
+        async_workers: int = 5,
+        cache_ttl_seconds: int = 60,
+        cache_max_entries: int = CACHE_MAX_ENTRIES,
+        verbose: bool = True,
     ) -> None:
         self.jira_url = jira_url.rstrip("/")
+        # verbose: in các thông báo tổng quan (bắt đầu/kết thúc tìm kiếm, ping...) ra stdout
+        self.verbose = verbose
         self.username = username
         # Fallback: nếu dùng basic mà không truyền password/token, lấy từ env JIRA_PASSWORD
         if (auth_type or "basic").lower() == "basic" and (not password_or_token):
@@ -53,6 +130,8 @@ class JiraClient:
         if self.auth_type == "basic":
             self.auth = HTTPBasicAuth(username, password_or_token)
         self.timeout_seconds = timeout_seconds
+        # Số luồng tải song song các trang kết quả JQL (1 = tuần tự)
+        self.async_workers = max(1, int(async_workers or 1))
         self.session = requests.Session()
         # SSL verify: env overrides default if not specified
         if verify_ssl is None:
@@ -62,6 +141,20 @@ class JiraClient:
             else:
                 verify_ssl = True
         self.session.verify = verify_ssl
+        # Connection pool đủ lớn cho các luồng song song (giữ kết nối keep-alive), tự retry GET khi lỗi tạm thời
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods={"GET"},
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
         # Proxies: inherit from environment automatically
         # requests will read HTTP[S]_PROXY, no extra code needed
@@ -72,28 +165,78 @@ class JiraClient:
             self.default_headers["Authorization"] = f"Bearer {password_or_token}"
         if default_headers:
             self.default_headers.update(default_headers)
+        # Gắn header/auth mặc định vào session để mọi luồng dùng chung
+        self.session.headers.update(self.default_headers)
+        self.session.auth = self.auth
 
         self.logger = get_logger()
         self.log_response_json = log_response_json
+        # JIRA_DEBUG=1: in curl/trạng thái từng request ra stdout (mặc định tắt vì tốn chi phí trên hot path)
+        self._debug = os.getenv("JIRA_DEBUG", "0").strip().lower() in ("1", "true", "yes")
         self.log_file = log_file
+        self._log_lock = threading.Lock()
+        self._log_fh = None
         if self.log_file:
             # Đảm bảo thư mục tồn tại
-            os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+            os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+            # Mở file log một lần với buffer lớn, ghi dồn thay vì mở/đóng file cho mỗi dòng log
+            # Đóng bằng close() (hoặc dùng client trong khối with)
+            self._log_fh = open(self.log_file, "a", encoding="utf-8", buffering=LOG_FILE_BUFFER_SIZE)
+        # Cache LRU có TTL cho get_issue/get_worklog: key -> (thời điểm lưu, dữ liệu).
+        # Giới hạn cache_max_entries để cache không phình theo số issue; khoá vì các luồng prefetch dùng chung
+        self._cache: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._cache_ttl = cache_ttl_seconds
+        self._cache_max_entries = max(0, int(cache_max_entries))
+        self._cache_lock = threading.Lock()
+        # Import logic get_actual_project của script chính một lần (None nếu không import được)
+        try:
+            from get_lc_tasks_with_worklog_final import get_actual_project as external_actual_project
+        except Exception:
+            external_actual_project = None
+        self._external_actual_project = external_actual_project
         # Cached project list for convenience in reminder flows
         self.projects = [p.strip().upper() for p in (projects or []) if p and p.strip()]
         if not self.projects:
             # Mặc định bao gồm PPFP
             self.projects = ["FC", "FSS", "PKT", "WAK", "PPFP"]
-            print(f"[Jira] Không có danh sách projects, dùng mặc định: {', '.join(self.projects)}")
+            if self.verbose:
+                print(f"[Jira] Không có danh sách projects, dùng mặc định: {', '.join(self.projects)}")
+        # Mệnh đề JQL theo projects dựng sẵn một lần (danh sách không đổi sau khi khởi tạo)
+        self._project_jql = "project in ({})".format(", ".join("'{}'".format(p) for p in self.projects)) if self.projects else ""
 
     # -----------------------------
     # Low-level helpers
     # -----------------------------
     def _write_log_file(self, message: str) -> None:
-        if not self.log_file:
+        if self._log_fh is None:
+            return
+        # Nhiều luồng (phân trang/worklog song song) cùng ghi một file: khoá để các khối log không chen nhau
+        with self._log_lock:
+            # Kiểm tra lại trong khoá: close() có thể vừa đóng file ở luồng khác
+            if self._log_fh is not None:
+                self._log_fh.write(message + "\n")
+
+    def flush_log(self) -> None:
+        """Đẩy phần log đang nằm trong buffer xuống file."""
+        if self._log_fh is None:
             return
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(message + "\n")
+        with self._log_lock:
+            if self._log_fh is not None:
+                self._log_fh.flush()
+
+    def close(self) -> None:
+        """Đóng file log và các kết nối HTTP của session; gọi lại nhiều lần không lỗi."""
+        with self._log_lock:
+            if self._log_fh is not None:
+                self._log_fh.close()
+                self._log_fh = None
+        self.session.close()
+
+    def __enter__(self) -> "JiraClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
     def _curl_from_request(
         self,
@@ -129,55 +272,90 @@ class JiraClient:
         if not url_or_path.lower().startswith("http"):
             url = f"{self.jira_url}{url_or_path}"
 
-        merged_headers = dict(self.default_headers)
-        if headers:
-            merged_headers.update(headers)
-
-        curl_cmd = self._curl_from_request(method, url, merged_headers, json_body)
-        start = time.time()
-        self.logger.info(f"Jira API {method.upper()} {url}")
-        print(f"[Jira] {method.upper()} {url}")
-        self.logger.debug(f"curl: {curl_cmd}")
-        print(f"[Jira] curl: {curl_cmd}")
-        self._write_log_file(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {method.upper()} {url}")
-        self._write_log_file(f"curl: {curl_cmd}")
-
+        start = time.perf_counter()
+        # Truyền tham số cho loguru thay vì f-string: chuỗi chỉ được format khi log thực sự được ghi
+        self.logger.info("Jira API {} {}", method.upper(), url)
+        # Chỉ dựng lệnh curl khi thực sự dùng tới (debug hoặc có file log)
+        if self._debug or self.log_file:
+            merged_headers = {**self.default_headers, **headers} if headers else self.default_headers
+            curl_cmd = self._curl_from_request(method, url, merged_headers, json_body)
+            if self._debug:
+                self.logger.debug("curl: {}", curl_cmd)
+            self._write_log_file(
+                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {method.upper()} {url}\ncurl: {curl_cmd}"
+            )
+
+        # Header/auth mặc định đã gắn vào session, chỉ truyền header riêng của lần gọi (nếu có)
         resp = self.session.request(
             method=method,
             url=url,
-            auth=self.auth,
-            headers=merged_headers,
+            headers=headers,
             json=json_body,
             params=params,
             timeout=self.timeout_seconds,
         )
 
-        duration = (time.time() - start) * 1000
-        self.logger.info(f"Status: {resp.status_code} | {duration:.1f} ms")
-        print(f"[Jira] → {resp.status_code} ({duration:.1f} ms)")
-        self._write_log_file(f"Status: {resp.status_code} | {duration:.1f} ms")
+        duration = (time.perf_counter() - start) * 1000
+        self.logger.info("Status: {} | {:.1f} ms", resp.status_code, duration)
+        status_line = f"Status: {resp.status_code} | {duration:.1f} ms"
 
-        if self.log_response_json:
+        # Chỉ parse/serialize lại JSON khi thực sự ghi ra file log (một dòng, không indent)
+        if self.log_response_json and self.log_file:
             try:
-                pretty = json.dumps(resp.json(), ensure_ascii=False, indent=2)
-                self._write_log_file(pretty)
+                body = _json_dumps(_json_loads(resp.content))
             except Exception:
                 # Not JSON
-                self._write_log_file(resp.text[:4000])
+                body = resp.text[:4000]
+            self._write_log_file(f"{status_line}\n{body}")
+        else:
+            self._write_log_file(status_line)
 
         return resp
 
+    def _cache_get(self, key: Tuple) -> Optional[Any]:
+        if self._cache_ttl <= 0 or self._cache_max_entries <= 0:
+            return None
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at >= self._cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, key: Tuple, value: Any) -> None:
+        if self._cache_ttl <= 0 or self._cache_max_entries <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.time(), value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, issue_key: Optional[str] = None) -> None:
+        """Xoá cache của một issue (sau khi ghi/cập nhật), hoặc toàn bộ cache nếu không truyền key."""
+        with self._cache_lock:
+            if issue_key is None:
+                self._cache.clear()
+                return
+            for key in [k for k in self._cache if k[1] == issue_key]:
+                del self._cache[key]
+
     def ping(self) -> bool:
         """Kiểm tra kết nối/JWT/BASIC hợp lệ bằng endpoint /myself."""
         try:
             resp = self._request("GET", "/rest/api/2/myself")
             if resp.status_code == 200:
-                print("[Jira] Ping OK: authenticated")
+                if self.verbose:
+                    print("[Jira] Ping OK: authenticated")
                 return True
-            print(f"[Jira] Ping FAILED: {resp.status_code} - {resp.text[:200]}")
+            self.logger.warning("[Jira] Ping FAILED: {} - {}", resp.status_code, resp.text[:200])
             return False
         except Exception as ex:
-            print(f"[Jira] Ping error: {ex}")
+            self.logger.warning("[Jira] Ping error: {}", ex)
             return False
 
     # -----------------------------
@@ -187,68 +365,179 @@ class JiraClient:
         self,
         jql: str,
         *,
-        fields: Optional[List[str]] = None,
+        fields: Optional[Sequence[str]] = None,
         expand: Optional[List[str]] = None,
         max_results: int = 1000,
         start_at: int = 0,
         show_first_url: bool = True,
     ) -> List[Dict[str, Any]]:
-        """Truy vấn issues bằng JQL (tự động phân trang)."""
-        collected: List[Dict[str, Any]] = []
-        page = start_at
-        print("[Jira] Bắt đầu tìm kiếm issues theo JQL...")
-        print(f"[Jira] JQL: {jql}")
-
-        while True:
-            params: Dict[str, Any] = {
-                "jql": jql,
-                "maxResults": max_results,
-                "startAt": page,
-            }
-            if fields:
-                params["fields"] = ",".join(fields)
-            if expand:
-                params["expand"] = ",".join(expand)
-
-            if show_first_url and page == start_at:
-                self.logger.info("Search API initialized (URL hidden, see curl in debug logs)")
-
-            print(f"[Jira] Trang {int(page/max_results)+1} (startAt={page}, maxResults={max_results})")
-            resp = self._request("GET", "/rest/api/2/search", params=params)
-            if resp.status_code != 200:
-                details = resp.text.strip() if isinstance(resp.text, str) else ""
-                raise RuntimeError(
-                    f"JQL search failed: {resp.status_code} | auth_type={self.auth_type} | verify_ssl={self.session.verify} | body={details[:300]}"
-                )
-
-            data = resp.json()
-            issues = data.get("issues", [])
-            collected.extend(issues)
-
-            total = data.get("total", 0)
-            print(f"[Jira] Thu được {len(issues)} issue (tổng lũy kế: {len(collected)}/{total})")
-            if len(issues) < max_results or page + len(issues) >= total:
-                break
-            page += max_results
-
-        print(f"[Jira] Hoàn tất tìm kiếm. Tổng số issue: {len(collected)}")
+        """Truy vấn issues bằng JQL (tự động phân trang).
+
+        Trang đầu tiên cho biết `total`; các trang còn lại được tải song song
+        (tối đa `self.async_workers` luồng) và ghép lại theo đúng thứ tự startAt.
+        """
+        if self.verbose:
+            print("[Jira] Bắt đầu tìm kiếm issues theo JQL...")
+            print(f"[Jira] JQL: {jql}")
+
+        base_params: Dict[str, Any] = {
+            "jql": jql,
+            "maxResults": max_results,
+        }
+        if fields:
+            base_params["fields"] = ",".join(fields)
+        if expand:
+            base_params["expand"] = ",".join(expand)
+
+        if show_first_url:
+            self.logger.info("Search API initialized (URL hidden, see curl in debug logs)")
+
+        issues, total = self._search_page(base_params, start_at, max_results)
+        # Cấp phát sẵn danh sách kết quả theo `total`, mỗi trang ghi thẳng vào vị trí startAt của nó
+        collected: List[Optional[Dict[str, Any]]] = [None] * max(total - start_at, len(issues))
+        collected[:len(issues)] = issues
+        filled = len(issues)
+        if self._debug:
+            self.logger.debug("[Jira] Thu được {} issue (tổng lũy kế: {}/{})", len(issues), filled, total)
+
+        if len(issues) >= max_results and start_at + len(issues) < total:
+            offsets = range(start_at + max_results, total, max_results)
+            workers = min(self.async_workers, len(offsets))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._search_page, base_params, page, max_results): page for page in offsets}
+                # Trang nào xong trước ghi trước, không cần sắp xếp lại
+                for future in as_completed(futures):
+                    issues, _ = future.result()
+                    pos = futures[future] - start_at
+                    collected[pos:pos + len(issues)] = issues
+                    filled += len(issues)
+                    if self._debug:
+                        self.logger.debug("[Jira] Thu được {} issue (tổng lũy kế: {}/{})", len(issues), filled, total)
+
+        # Bỏ các ô trống còn lại (trang trả về ít hơn dự kiến)
+        if filled != len(collected):
+            collected = [issue for issue in collected if issue is not None]
+
+        self.flush_log()
+        if self.verbose:
+            print(f"[Jira] Hoàn tất tìm kiếm. Tổng số issue: {len(collected)}")
         return collected
 
+    def iter_search_pages(
+        self,
+        jql: str,
+        *,
+        fields: Optional[Sequence[str]] = None,
+        expand: Optional[List[str]] = None,
+        max_results: int = 1000,
+        start_at: int = 0,
+    ) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        """Duyệt kết quả JQL theo từng trang (đúng thứ tự startAt), yield (issues, total).
+
+        Trong lúc người gọi xử lý trang hiện tại, tối đa `self.async_workers` trang kế tiếp
+        được tải trước song song. Bộ nhớ chỉ giữ các trang đang chờ xử lý, không gom toàn bộ
+        kết quả như search_issues.
+        """
+        base_params: Dict[str, Any] = {
+            "jql": jql,
+            "maxResults": max_results,
+        }
+        if fields:
+            base_params["fields"] = ",".join(fields)
+        if expand:
+            base_params["expand"] = ",".join(expand)
+
+        # Trang đầu tải đồng bộ để biết `total`
+        issues, total = self._search_page(base_params, start_at, max_results)
+        yield issues, total
+        if len(issues) < max_results or start_at + len(issues) >= total:
+            return
+
+        offsets = iter(range(start_at + max_results, total, max_results))
+        executor = ThreadPoolExecutor(max_workers=self.async_workers)
+        try:
+            pending: deque = deque()
+            # Giữ tối đa async_workers trang đang tải trước; mỗi lần yield một trang thì gửi thêm một trang
+            for page in itertools.islice(offsets, self.async_workers):
+                pending.append(executor.submit(self._search_page, base_params, page, max_results))
+            while pending:
+                issues, _ = pending.popleft().result()
+                page = next(offsets, None)
+                if page is not None:
+                    pending.append(executor.submit(self._search_page, base_params, page, max_results))
+                yield issues, total
+        finally:
+            # Người gọi dừng giữa chừng (hoặc lỗi): huỷ các trang chưa bắt đầu tải
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _search_page(self, base_params: Dict[str, Any], page: int, max_results: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Tải một trang kết quả JQL, trả về (issues, total)."""
+        params = dict(base_params)
+        params["startAt"] = page
+        if self._debug:
+            self.logger.debug("[Jira] Trang {} (startAt={}, maxResults={})", int(page/max_results)+1, page, max_results)
+        resp = self._request("GET", "/rest/api/2/search", params=params)
+        if resp.status_code != 200:
+            details = resp.text.strip() if isinstance(resp.text, str) else ""
+            raise RuntimeError(
+                f"JQL search failed: {resp.status_code} | auth_type={self.auth_type} | verify_ssl={self.session.verify} | body={details[:300]}"
+            )
+
+        data = _json_loads(resp.content)
+        return data.get("issues", []), data.get("total", 0)
+
     def get_issue(self, issue_key: str, *, expand: Optional[List[str]] = None) -> Dict[str, Any]:
+        cache_key = ("issue", issue_key, tuple(expand or ()))
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         params = {"expand": ",".join(expand)} if expand else None
         resp = self._request("GET", f"/rest/api/2/issue/{issue_key}", params=params)
         if resp.status_code != 200:
             raise RuntimeError(f"get_issue failed for {issue_key}: {resp.status_code} - {resp.text}")
-        return resp.json()
+        issue = _json_loads(resp.content)
+        self._cache_put(cache_key, issue)
+        return issue
 
     def get_worklog(self, issue_key: str) -> List[Dict[str, Any]]:
+        cache_key = ("worklog", issue_key)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         resp = self._request("GET", f"/rest/api/2/issue/{issue_key}/worklog")
         if resp.status_code != 200:
-            # Trả về rỗng thay vì raise để không gián đoạn pipeline
+            # Trả về rỗng thay vì raise để không gián đoạn pipeline (không lưu cache để lần sau thử lại)
             self.logger.warning(f"get_worklog failed for {issue_key}: {resp.status_code}")
             return []
-        data = resp.json()
-        return data.get("worklogs", [])
+        data = _json_loads(resp.content)
+        worklogs = data.get("worklogs", [])
+        self._cache_put(cache_key, worklogs)
+        return worklogs
+
+    def prefetch_worklogs(self, keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Tải song song worklog của nhiều issue, trả về dict key -> danh sách worklog (rỗng nếu lỗi)."""
+        keys = [key for key in dict.fromkeys(keys) if key]
+        wl_map: Dict[str, List[Dict[str, Any]]] = {}
+        if not keys:
+            return wl_map
+        with ThreadPoolExecutor(max_workers=min(WORKLOG_FETCH_WORKERS, len(keys))) as executor:
+            futures = {key: executor.submit(self.get_worklog, key) for key in keys}
+            for key, future in futures.items():
+                try:
+                    wl_map[key] = future.result()
+                except Exception as ex:
+                    self.logger.warning(f"get_worklog failed for {key}: {ex}")
+                    wl_map[key] = []
+        return wl_map
+
+    def prefetch_assignee_changes(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        """Lấy song song thời điểm đổi assignee gần nhất của nhiều issue, trả về dict key -> ISO (hoặc None)."""
+        keys = [key for key in dict.fromkeys(keys) if key]
+        if not keys:
+            return {}
+        # get_last_assignee_change tự bắt lỗi và trả None nên map thẳng được
+        with ThreadPoolExecutor(max_workers=min(WORKLOG_FETCH_WORKERS, len(keys))) as executor:
+            return dict(zip(keys, executor.map(self.get_last_assignee_change, keys)))
 
     def get_last_assignee_change(self, issue_key: str) -> Optional[str]:
         """Lấy thời gian (ISO) khi assignee được thay đổi lần cuối, hoặc None nếu không tìm thấy."""
@@ -270,7 +559,7 @@ class JiraClient:
             return None
 
     def get_issue_with_worklog(self, issue_key: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
-        print(f"[Jira] Lấy thông tin issue + worklog: {issue_key}")
+        self.logger.debug("[Jira] Lấy thông tin issue + worklog: {}", issue_key)
         issue = self.get_issue(issue_key)
         worklogs = self.get_worklog(issue_key)
         return issue, worklogs
@@ -287,20 +576,15 @@ class JiraClient:
         return cur if cur != {} else default
 
     def _format_iso(self, iso_str: str) -> str:
-        if not iso_str:
-            return ""
-        try:
-            return datetime.fromisoformat(iso_str.replace("Z", "+00:00")).strftime("%d/%m/%Y %H:%M")
-        except Exception:
-            return iso_str
+        return _fmt_iso(iso_str)
 
     def _compute_actual_project(self, project_key: str, component_names: List[str]) -> str:
         # Cố gắng dùng logic có sẵn nếu import được
-        try:
-            from get_lc_tasks_with_worklog_final import get_actual_project as external_actual_project
-            return external_actual_project(project_key, component_names)
-        except Exception:
-            pass
+        if self._external_actual_project is not None:
+            try:
+                return self._external_actual_project(project_key, component_names)
+            except Exception:
+                pass
 
         # Fallback tối giản (đồng bộ với logic chính ở mức cơ bản)
         if project_key == "PKT":
@@ -313,80 +597,118 @@ class JiraClient:
             return "Noti + Loyalty + Core Cust"
         # FC: cố gắng nhận diện theo component phổ biến
         if project_key == "FC":
-            if any(c in ["LC Offline Q1", "LC RSA Ecom", "B05. RSA/RSA ECOM", "LCD", "Tuning RSA Ecom"] for c in component_names):
+            component_set = set(component_names)
+            if FC_RSA_COMPONENTS & component_set:
                 return "RSA + RSA eCom + Shipment"
             if any(c.startswith("Ecom - ") for c in component_names):
                 return "Web App KHLC"
-            if any(c in ["PaymentTenacy"] for c in component_names):
+            if FC_PAYMENT_COMPONENTS & component_set:
                 return "Payment FPT Pay"
         return project_key
 
+    def _inline_worklogs(self, fields: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Worklog trả kèm trong /search (fields=worklog); None nếu không có hoặc bị cắt bớt."""
+        worklog_field = fields.get("worklog")
+        if not isinstance(worklog_field, dict):
+            return None
+        worklogs = worklog_field.get("worklogs") or []
+        total = worklog_field.get("total", len(worklogs)) or 0
+        # Jira chỉ trả tối đa ~20 worklog mỗi issue trong /search, phần còn lại phải gọi /worklog
+        if total > len(worklogs):
+            return None
+        return worklogs
+
     def _normalize_worklogs(self, worklogs: List[Dict[str, Any]], project_key: str, project_name: str) -> Tuple[List[Dict[str, Any]], float]:
         result: List[Dict[str, Any]] = []
-        total_hours = 0.0
+        append = result.append
+        total_seconds = 0.0
         for wl in worklogs or []:
+            if not isinstance(wl, dict):
+                continue
             try:
-                author = self._safe_get(wl, ["author", "displayName"], "")
-                time_spent_seconds = wl.get("timeSpentSeconds", 0) or 0
-                started = wl.get("started", "")
-                comment = wl.get("comment", "")
-                hours = float(time_spent_seconds) / 3600.0
-                total_hours += hours
-                result.append({
-                    "author": author,
-                    "time_spent": wl.get("timeSpent", ""),
-                    "hours_spent": round(hours, 2),
-                    "started": self._format_iso(started),
-                    "comment": comment,
-                    "project_key": project_key,
-                    "project_name": project_name,
-                })
-            except Exception:
+                seconds = float(wl.get("timeSpentSeconds", 0) or 0)
+            except (TypeError, ValueError):
                 continue
-        return result, round(total_hours, 2)
+            author = wl.get("author")
+            total_seconds += seconds
+            append({
+                "author": author.get("displayName", "") if isinstance(author, dict) else "",
+                "time_spent": wl.get("timeSpent", ""),
+                "hours_spent": round(seconds / 3600.0, 2),
+                "started": _fmt_iso(wl.get("started", "")),
+                "comment": wl.get("comment", ""),
+                "project_key": project_key,
+                "project_name": project_name,
+            })
+        # Cộng số giây (số nguyên) rồi mới đổi ra giờ: một lần chia, không cộng dồn sai số làm tròn
+        return result, round(total_seconds / 3600.0, 2)
 
     def build_task_object(
         self,
         issue: Dict[str, Any],
         worklogs: Optional[List[Dict[str, Any]]] = None,
+        *,
+        wl_prefetch: Optional[Dict[str, List[Dict[str, Any]]]] = None,
     ) -> Dict[str, Any]:
-        """Chuẩn hoá issue của Jira thành task object thống nhất."""
+        """Chuẩn hoá issue của Jira thành task object thống nhất.
+
+        Worklog lấy theo thứ tự: tham số `worklogs`, `wl_prefetch[key]` (từ prefetch_worklogs),
+        worklog trả kèm trong /search; chỉ gọi /worklog khi cả ba đều không có.
+        """
         key = issue.get("key", "")
-        print(f"[Jira] Chuẩn hoá task: {key}")
+        self.logger.debug("[Jira] Chuẩn hoá task: {}", key)
         fields = issue.get("fields", {}) if isinstance(issue, dict) else {}
 
+        # Đọc trực tiếp các trường lồng nhau bằng dict.get (thay cho _safe_get trên hot path)
+        status_obj = fields.get("status")
+        issuetype_obj = fields.get("issuetype")
+        priority_obj = fields.get("priority")
+        project_obj = fields.get("project")
+        if not isinstance(project_obj, dict):
+            project_obj = {}
+
         summary = fields.get("summary", "")
-        status = self._safe_get(fields, ["status", "name"], "")
+        status = status_obj.get("name", "") if isinstance(status_obj, dict) else ""
         updated = fields.get("updated", "")
-        issue_type = self._safe_get(fields, ["issuetype", "name"], "")
-        priority = self._safe_get(fields, ["priority", "name"], "")
-        project_key = self._safe_get(fields, ["project", "key"], "").upper()
-        project_name = self._safe_get(fields, ["project", "name"], "")
+        issue_type = issuetype_obj.get("name", "") if isinstance(issuetype_obj, dict) else ""
+        priority = priority_obj.get("name", "") if isinstance(priority_obj, dict) else ""
+        project_key = project_obj.get("key", "").upper()
+        project_name = project_obj.get("name", "")
 
         components_raw = fields.get("components", []) or []
         component_names = [c.get("name", "") for c in components_raw if isinstance(c, dict)]
         component_str = ", ".join([c for c in component_names if c]) if component_names else "Không có component"
 
         # Parent (nếu có)
-        parent_key = self._safe_get(fields, ["parent", "key"], "")
-        parent_summary = self._safe_get(fields, ["parent", "fields", "summary"], "")
+        parent_key = ""
+        parent_summary = ""
+        parent_obj = fields.get("parent")
+        if isinstance(parent_obj, dict):
+            parent_key = parent_obj.get("key", "")
+            parent_fields = parent_obj.get("fields")
+            if isinstance(parent_fields, dict):
+                parent_summary = parent_fields.get("summary", "")
         is_subtask = (issue_type == "Sub-task")
 
         # Original estimate (giây)
         original_estimate_seconds = fields.get("timeoriginalestimate", 0) or 0
         original_estimate_hours = round((original_estimate_seconds / 3600.0), 2) if original_estimate_seconds else 0.0
 
-        # Worklogs
+        # Worklogs: ưu tiên dữ liệu đã tải sẵn / trả kèm trong /search, chỉ gọi thêm /worklog khi thiếu
+        if worklogs is None and wl_prefetch is not None:
+            worklogs = wl_prefetch.get(key)
+        if worklogs is None:
+            worklogs = self._inline_worklogs(fields)
         if worklogs is None:
             worklogs = self.get_worklog(key)
         norm_worklogs, total_hours = self._normalize_worklogs(worklogs, project_key, project_name)
-        print(f"[Jira] → Worklogs: {len(norm_worklogs)}, Tổng giờ: {total_hours}")
+        self.logger.debug("[Jira] → Worklogs: {}, Tổng giờ: {}", len(norm_worklogs), total_hours)
 
         task = {
             "key": key,
             "summary": summary,
             "status": status,
-            "updated": self._format_iso(updated),
+            "updated": _fmt_iso(updated),
             "type": issue_type,
             "priority": priority,
             "project": project_key,
@@ -414,6 +736,8 @@ class JiraClient:
         # Status last changed time (ISO)
         last_status_change = fields.get("statuscategorychangedate") or ""
         task["last_status_changed_at"] = last_status_change
+        # Thời điểm cập nhật gần nhất (ISO gốc, còn timezone) - dùng để lọc sơ bộ rule đổi assignee
+        task["updated_at"] = updated
         # FixVersions and release dates mapping
         fix_versions = fields.get("fixVersions") or []
         task["fixVersions"] = fix_versions
@@ -444,36 +768,27 @@ class JiraClient:
     # -----------------------------
     def search_recent_tasks(self, minutes: int) -> List[Dict[str, Any]]:
         """Tìm tasks cập nhật trong X phút gần đây theo self.projects."""
-        if self.projects:
-            project_values = ", ".join(["'{}'".format(p) for p in self.projects])
-            proj_clause = f"project in ({project_values})"
-        else:
-            proj_clause = ""
         time_clause = f"updated >= -{int(minutes)}m"
-        jql = " AND ".join([c for c in [proj_clause, time_clause] if c]) + " ORDER BY updated DESC"
-        fields = [
-            "summary",
-            "status",
-            "updated",
-            "issuetype",
-            "priority",
-            "project",
-            "components",
-            "timeoriginalestimate",
-            "assignee",
-            "reporter",
-            "description",
-            "fixVersions",
-            "statuscategorychangedate",
-            "labels",
-        ]
-        issues = self.search_issues(jql, fields=fields, expand=None, max_results=200)
+        # Không thêm điều kiện status vào JQL: chỉ rule MISSING_LOGTIME phụ thuộc status ("READY CI TESTING"),
+        # các rule còn lại (description, fix version, đổi assignee) áp dụng cho task ở mọi status
+        jql = " AND ".join([c for c in [self._project_jql, time_clause] if c]) + " ORDER BY updated DESC"
+
+        # Chuẩn hoá theo từng trang rồi bỏ trang đó, không giữ toàn bộ issue thô trong bộ nhớ
         tasks: List[Dict[str, Any]] = []
-        for idx, issue in enumerate(issues, 1):
-            print(f"[Jira] Chuẩn hoá task {idx}/{len(issues)}: {issue.get('key')}")
-            task = self.build_task_object(issue)
-            tasks.append(task)
-        print(f"[Jira] Tổng tasks chuẩn hoá: {len(tasks)}")
+        for issues, total in self.iter_search_pages(jql, fields=RECENT_TASK_FIELDS, expand=None, max_results=200):
+            # Tải song song worklog của các issue mà /search không trả đủ (thay vì từng issue một trong build_task_object)
+            wl_map = self.prefetch_worklogs([
+                issue.get("key", "") for issue in issues
+                if self._inline_worklogs(issue.get("fields") or {}) is None
+            ])
+
+            for issue in issues:
+                self.logger.debug("[Jira] Chuẩn hoá task {}/{}: {}", len(tasks) + 1, total, issue.get("key"))
+                task = self.build_task_object(issue, wl_prefetch=wl_map)
+                tasks.append(task)
+        self.flush_log()
+        if self.verbose:
+            print(f"[Jira] Tổng tasks chuẩn hoá: {len(tasks)}")
         return tasks
 
 
@@ -1,17 +1,28 @@
 from loguru import logger
+import os
 import sys
 
 # Configure logger once at import
+# Mức log: LOG_LEVEL nếu có, JIRA_DEBUG=1 thì hiện cả DEBUG (curl, từng trang JQL), mặc định INFO
+_level = (os.getenv("LOG_LEVEL") or "").strip().upper() or ("DEBUG" if os.getenv("JIRA_DEBUG", "0").strip().lower() in ("1", "true", "yes") else "INFO")
+# Tên level của loguru phân biệt hoa thường; level không tồn tại thì dùng INFO thay vì lỗi lúc import
+_invalid_level = None
+try:
+    logger.level(_level)
+except ValueError:
+    _invalid_level, _level = _level, "INFO"
 logger.remove()
 logger.add(
     sys.stdout,
-    level="INFO",
+    level=_level,
     enqueue=True,
     backtrace=False,
     diagnose=False,
     colorize=True,
     format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
 )
+if _invalid_level:
+    logger.warning(f"Unknown LOG_LEVEL {_invalid_level!r}, falling back to INFO")
 
 
 def get_logger():
@@ -1,10 +1,14 @@
 import os
 import sys
+import csv
 import json
 import argparse
+import contextlib
+import functools
+import tempfile
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple, List
-import pandas as pd
  
 from dotenv import load_dotenv
  
@@ -16,66 +20,205 @@ from rules import (
      evaluate_pre_version_reminder,
      evaluate_post_version_alert,
      evaluate_assignee_changed,
+     assignee_change_possible,
      MISSING_LOGTIME,
      MISSING_DESCRIPTION,
      PRE_VERSION_REMINDER,
      POST_VERSION_ALERT,
      ASSIGNEE_CHANGED,
 )
-from chat_api import send_message_fpt
+from chat_api import iter_send_message_fpt
+ 
+# python-calamine (tuỳ chọn) đọc Excel bằng Rust, nhanh hơn openpyxl; không có thì để pandas tự chọn engine
+try:
+     import python_calamine  # noqa: F401
+     EXCEL_ENGINE = "calamine"
+except ImportError:
+     EXCEL_ENGINE = None
  
 logger = get_logger()
  
+# Số luồng tối đa gửi tin nhắn chat song song trong một lượt chạy
+CHAT_SEND_WORKERS = 8
+ 
+# Thứ tự cột của file lịch sử gửi nhắc việc (data/reminder_logs.csv).
+# Tin nhắn gộp nhiều rule chỉ ghi một dòng, khi đó cột rule_type là JSON list (vd ["missing_logtime", "missing_description"])
+HISTORY_FIELDS = ["task_key", "rule_type", "to", "sent_at", "status", "response"]
+ 
+# Tên cột (lowercase) được đọc từ file nhân viên Excel
+EMPLOYEE_COLUMNS = frozenset(("email", "e-mail", "chat_id"))
+ 
 def _load_json(path: str) -> dict:
      with open(path, "r", encoding="utf-8") as f:
          return json.load(f)
  
+@dataclass(frozen=True, slots=True)
+class Config:
+     """Cấu hình của một lượt chạy: biến môi trường + rules_config.json."""
+     jira_url: Optional[str]
+     jira_user: Optional[str]
+     jira_token: Optional[str]
+     jira_auth_type: str
+     chat_base_url: str
+     chat_bot_id: str
+     schedule_minutes: int
+     employees_file: str
+     projects: Tuple[str, ...]
+     history_path: str
+     ci_wait: int
+     pre_days: int
+     resend_after_hours: int
+     assignee_change_wait: int
+     domains_allowed: Tuple[str, ...]
+ 
+@functools.lru_cache(maxsize=1)
+def _load_rules_config(config_path: str, mtime: Optional[float]) -> dict:
+     """Đọc rules_config.json; cache theo (path, mtime) nên chỉ đọc lại khi file thay đổi."""
+     return _load_json(config_path) if mtime is not None else {}
+ 
+def get_config() -> Config:
+     """Dựng Config cho một lượt chạy.
+
+     Biến môi trường được đọc lại mỗi lần gọi (load_dotenv không ghi đè biến đã có trong tiến trình),
+     chỉ phần rules_config.json được cache.
+     """
+     load_dotenv()
+     config_path = os.path.join(os.getcwd(), "rules_config.json")
+     try:
+         mtime = os.path.getmtime(config_path)
+     except OSError:
+         mtime = None
+     config = _load_rules_config(config_path, mtime)
+     #projects = [p.strip() for p in (os.getenv("JIRA_PROJECTS", "FC,FSS,PPFP").split(",")) if p.strip()]
+     projects = tuple(p.strip() for p in (os.getenv("JIRA_PROJECTS", "PPFP").split(",")) if p.strip())
+     return Config(
+         jira_url=os.getenv("JIRA_URL"),
+         jira_user=os.getenv("JIRA_USERNAME"),
+         jira_token=os.getenv("JIRA_TOKEN"),
+         jira_auth_type=os.getenv("JIRA_AUTH_TYPE", "basic").lower(),
+         # FPT Chat API
+         chat_base_url=os.getenv("FPT_CHAT_BASE_URL", "https://api-chat.fpt.com/bot-external-api/ext-bot"),
+         chat_bot_id=os.getenv("FPT_CHAT_BOT_ID", ""),
+         schedule_minutes=int(os.getenv("SCHEDULE_INTERVAL_MINUTES", "15")),
+         employees_file=os.getenv("EMPLOYEES_FILE", "employees.csv"),
+         projects=projects,
+         history_path=os.getenv("REMINDER_HISTORY_FILE", "data/reminder_logs.csv"),
+         ci_wait=int(config.get("ci_testing_wait_minutes", 5)),
+         pre_days=int(config.get("pre_version_days", 2)),
+         resend_after_hours=int(config.get("resend_after_hours", 8)),
+         assignee_change_wait=int(config.get("assignee_change_wait_minutes", 5)),
+         domains_allowed=tuple(config.get("domains_allowed", ["FRT"])),
+     )
+ 
 def _ensure_dirs(path: str):
      os.makedirs(os.path.dirname(path), exist_ok=True)
  
-def _read_employees(path: str) -> pd.DataFrame:
+def _load_employees_cache(path: str, cache_path: str) -> Optional[dict]:
+     """Đọc chat map đã cache (JSON) nếu file cache không cũ hơn file nguồn; lỗi bất kỳ coi như chưa có cache."""
+     try:
+         if os.path.getmtime(cache_path) < os.path.getmtime(path):
+             return None
+         with open(cache_path, "r", encoding="utf-8") as f:
+             chat_map = json.load(f)
+     except Exception:
+         return None
+     if not isinstance(chat_map, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in chat_map.items()):
+         return None
+     return chat_map
+ 
+def _write_employees_cache(cache_path: str, chat_map: dict):
+     """Ghi chat map ra file tạm rồi os.replace vào cache_path, tránh để lại file cache ghi dở."""
+     fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(cache_path) + ".", suffix=".tmp", dir=os.path.dirname(cache_path) or ".")
+     try:
+         with os.fdopen(fd, "w", encoding="utf-8") as f:
+             json.dump(chat_map, f, ensure_ascii=False)
+         os.replace(tmp_path, cache_path)
+     except BaseException:
+         with contextlib.suppress(OSError):
+             os.remove(tmp_path)
+         raise
+ 
+def _read_employees(path: str) -> dict:
+     """Đọc file nhân viên thành dict email (lowercase) -> chat_id; email trùng thì giữ dòng đầu tiên."""
      logger.info(f"Loading employees mapping from: {path}")
      if not os.path.exists(path):
          logger.warning(f"Employees file not found: {path}")
-         return pd.DataFrame(columns=["email", "chat_id"]) 
+         return {}
      _, ext = os.path.splitext(path.lower())
+     cache_path = None
      if ext in (".xlsx", ".xls"):
-         df = pd.read_excel(path)
+         # Đọc Excel tốn thời gian (pandas + openpyxl): dùng chat map đã cache ở file <path>.cache.json khi file nguồn chưa đổi
+         cache_path = path + ".cache.json"
+         chat_map = _load_employees_cache(path, cache_path)
+         if chat_map is not None:
+             logger.info(f"Loaded employees from cache {cache_path}: {len(chat_map)} emails")
+             return chat_map
+         # Excel hiếm dùng nên mới cần tới pandas (import tại chỗ)
+         import pandas as pd
+         # dtype=str: bỏ suy luận kiểu (mọi ô đều được dùng dưới dạng chuỗi), chat_id số không bị đổi thành "123.0"
+         # usecols: chỉ nạp cột email/chat_id, bỏ qua các cột khác của sheet (file nhân viên thường rất rộng)
+         df = pd.read_excel(path, engine=EXCEL_ENGINE, dtype=str, usecols=lambda c: str(c).lower() in EMPLOYEE_COLUMNS)
+         if not any(str(c).lower() in ("email", "e-mail") for c in df.columns):
+             # Sheet không có cột email: đọc lại đầy đủ, cột đầu tiên được coi là email
+             df = pd.read_excel(path, engine=EXCEL_ENGINE, dtype=str)
+         header = [str(c) for c in df.columns]
+         rows = df.fillna("").values.tolist()
      else:
-         # Try normal read first (expects header row). If no email-like column is found, fallback to no-header.
-         df = pd.read_csv(path, keep_default_na=False)
-         lower_cols = [c.lower() for c in df.columns]
-         if not any(c in ("email", "e-mail", "chat_id") for c in lower_cols):
-             logger.info("employees.csv seems to have no header; re-reading with header=None")
-             df = pd.read_csv(path, header=None, names=["email", "chat_id"], keep_default_na=False)
+         with open(path, "r", encoding="utf-8-sig", newline="") as f:
+             rows = [row for row in csv.reader(f) if row]
+         header = rows[0] if rows else []
+         # Dòng đầu là header nếu có cột email-like; ngược lại coi file không có header (email, chat_id)
+         if any(c.lower() in ("email", "e-mail", "chat_id") for c in header):
+             rows = rows[1:]
+         else:
+             logger.info("employees.csv seems to have no header; reading as (email, chat_id) rows")
+             header = ["email", "chat_id"]
      # Normalize columns
-     cols = {c.lower(): c for c in df.columns}
-     email_col = cols.get("email") or cols.get("e-mail") or list(df.columns)[0]
-     chat_col = cols.get("chat_id") if "chat_id" in cols else None
-     if chat_col is None:
-         df = df.rename(columns={email_col: "email"})
-         df["chat_id"] = ""
-     else:
-         df = df.rename(columns={email_col: "email", chat_col: "chat_id"})
-     df["email"] = df["email"].fillna("").astype(str).str.strip()
-     df["chat_id"] = df["chat_id"].fillna("").astype(str).str.strip()
-     # Drop empty or invalid email rows
-     df = df[(df["email"] != "") & (df["email"].str.lower() != "nan")]
-     logger.info(f"Loaded employees: {len(df)} rows")
-     return df[["email", "chat_id"]]
- 
-def _lookup_chat_id(df: pd.DataFrame, email: str) -> str:
+     cols = {c.lower(): i for i, c in enumerate(header)}
+     email_idx = cols.get("email", cols.get("e-mail", 0))
+     chat_idx = cols.get("chat_id")
+     chat_map = {}
+     count = 0
+     for row in rows:
+         email = row[email_idx].strip() if email_idx < len(row) else ""
+         # Drop empty or invalid email rows
+         if not email or email.lower() == "nan":
+             continue
+         count += 1
+         chat_id = row[chat_idx].strip() if chat_idx is not None and chat_idx < len(row) else ""
+         chat_map.setdefault(email.lower(), chat_id)
+     logger.info(f"Loaded employees: {count} rows")
+     if cache_path:
+         try:
+             _write_employees_cache(cache_path, chat_map)
+         except OSError as ex:
+             logger.warning(f"Cannot write employees cache {cache_path}: {ex}")
+     return chat_map
+ 
+def _lookup_chat_id(chat_map: dict, email: str) -> str:
      if not email:
          return ""
-     row = df.loc[df["email"].str.lower() == str(email).lower()]
-     if row.empty:
+     chat_id = chat_map.get(str(email).lower())
+     if chat_id is None:
          logger.debug(f"No chat_id mapping for email: {email}")
          return ""
-     chat_id = row.iloc[0]["chat_id"]
      logger.debug(f"Mapped email {email} -> chat_id '{chat_id}'")
-     return chat_id if isinstance(chat_id, str) else ""
+     return chat_id
+ 
+# Mốc thời gian dùng cho bản ghi lịch sử không đọc được sent_at: luôn coi là "vừa gửi" (không gửi lại)
+_UNKNOWN_SENT_AT = datetime.max.replace(tzinfo=timezone.utc)
+ 
+def _parse_sent_at(value) -> datetime:
+     try:
+         sent_at = datetime.fromisoformat(value)
+     except Exception:
+         return _UNKNOWN_SENT_AT
+     if sent_at.tzinfo is None:
+         sent_at = sent_at.replace(tzinfo=timezone.utc)
+     return sent_at
  
 def _load_history(path: str):
+     """Đọc lịch sử gửi; cột sent_at được parse sẵn thành datetime (UTC) ngay khi load."""
      if not os.path.exists(path):
          return []
      try:
@@ -83,55 +226,101 @@ def _load_history(path: str):
          if os.path.getsize(path) == 0:
              logger.info(f"History file exists but empty: {path}")
              return []
-         rows = pd.read_csv(path).to_dict(orient="records")
+         with open(path, "r", encoding="utf-8", newline="") as f:
+             rows = list(csv.DictReader(f))
+         for r in rows:
+             r["sent_at"] = _parse_sent_at(r.get("sent_at"))
          logger.info(f"Loaded reminder history: {len(rows)} records from {path}")
          return rows
      except Exception as ex:
          logger.exception(f"Failed to load history from {path}: {ex}")
          return []
  
-def _append_history(path: str, record: dict):
+@contextlib.contextmanager
+def _history_writer(path: str):
+     """Mở file lịch sử một lần (append) cho cả lượt chạy và trả về csv.DictWriter; ghi header nếu file mới/rỗng.
+
+     File mở ở chế độ line-buffered: mỗi dòng được ghi xuống đĩa ngay, không chờ đóng file.
+     """
      _ensure_dirs(path)
-     exists = os.path.exists(path)
-     is_empty = False
-     if exists:
+     with open(path, "a", encoding="utf-8", newline="", buffering=1) as f:
+         writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS, lineterminator="\n", extrasaction="ignore")
+         # Mở ở chế độ append nên vị trí hiện tại chính là kích thước file: 0 nghĩa là file mới/rỗng, cần header
+         if f.tell() == 0:
+             writer.writeheader()
+         yield writer
+ 
+def _row_rule_types(row: dict) -> List[str]:
+     """Danh sách rule của một dòng lịch sử: rule_type dạng đơn (định dạng cũ) hoặc JSON list (tin nhắn gộp)."""
+     value = str(row.get("rule_types") or row.get("rule_type") or "")
+     if value.startswith("["):
          try:
-             is_empty = os.path.getsize(path) == 0
-         except Exception:
-             is_empty = False
-     header_needed = (not exists) or is_empty
-     df = pd.DataFrame([record])
-     df.to_csv(path, mode='a', header=header_needed, index=False)
-     logger.debug(f"Appended history record for task {record.get('task_key')} rule {record.get('rule_type')} -> {record.get('status')}")
- 
-def _already_sent(history_rows: list, task_key: str, rule_code: str, to_value: str, resend_after_hours: int) -> bool:
-     now = datetime.now(timezone.utc)
+             codes = json.loads(value)
+             if isinstance(codes, list):
+                 return [str(code) for code in codes]
+         except ValueError:
+             pass
+     return [value]
+ 
+def _build_sent_index(history_rows: list) -> dict:
+     """Dựng dict (task_key, rule_type, to) -> thời điểm gửi gần nhất, để kiểm tra trùng bằng một lần tra dict."""
+     sent_index = {}
      for r in history_rows:
-         if r.get("task_key") == task_key and r.get("rule_type") == rule_code and r.get("to") == to_value:
-             try:
-                 sent_at = datetime.fromisoformat(r.get("sent_at"))
-             except Exception:
-                 return True
-             if now - sent_at < timedelta(hours=resend_after_hours):
-                 logger.debug(f"Skip send: recently sent for {task_key} {rule_code} to {to_value}")
-                 return True
+         task_key, to_value = r.get("task_key"), r.get("to")
+         sent_at = r.get("sent_at")
+         if not isinstance(sent_at, datetime):
+             sent_at = _parse_sent_at(sent_at)
+         for rule_code in _row_rule_types(r):
+             key = (task_key, rule_code, to_value)
+             latest = sent_index.get(key)
+             if latest is None or sent_at > latest:
+                 sent_index[key] = sent_at
+     return sent_index
+ 
+def _already_sent(sent_index: dict, task_key: str, rule_code: str, to_value: str, now: datetime, resend_delta: timedelta) -> bool:
+     sent_at = sent_index.get((task_key, rule_code, to_value))
+     if sent_at is None:
+         return False
+     if now - sent_at < resend_delta:
+         logger.debug(f"Skip send: recently sent for {task_key} {rule_code} to {to_value}")
+         return True
      return False
  
+# Mẫu tin nhắn theo từng rule, dựng sẵn một lần ở mức module (thay cho chuỗi if/elif mỗi lần gọi)
+_MESSAGE_TEMPLATES = {
+     MISSING_LOGTIME: "⚠️ Task {key} ({summary}) đã ở CI Testing một thời gian mà chưa có logtime. Vui lòng logtime: {url}",
+     MISSING_DESCRIPTION: "📝 Task {key} ({summary}) hiện chưa có description. Reporter: {reporter}. Vui lòng bổ sung: {url}",
+     PRE_VERSION_REMINDER: "⏰ Task {key} thuộc Fix Version {fv_name} sắp release trong {days} ngày, chưa lên UAT. Vui lòng kiểm tra: {url}",
+     POST_VERSION_ALERT: "🚨 Task {key} thuộc Fix Version {fv_name} đã quá hạn release ({release_date}) nhưng chưa lên Production. Kiểm tra gấp: {url}",
+     ASSIGNEE_CHANGED: "👤 Task {key} ({summary}) vừa được gán cho bạn. Vui lòng kiểm tra: {url}",
+}
+ 
+# Dòng tương ứng trong tin nhắn gộp nhiều rule của cùng một task
+_COMBINED_TEMPLATES = {
+     MISSING_LOGTIME: "⚠️ Đã ở CI Testing một thời gian mà chưa có logtime. Vui lòng logtime.",
+     MISSING_DESCRIPTION: "📝 Chưa có description. Reporter: {reporter}. Vui lòng bổ sung.",
+     PRE_VERSION_REMINDER: "⏰ Thuộc Fix Version {fv_name} sắp release trong {days} ngày, chưa lên UAT. Vui lòng kiểm tra.",
+     POST_VERSION_ALERT: "🚨 Thuộc Fix Version {fv_name} đã quá hạn release ({release_date}) nhưng chưa lên Production. Kiểm tra gấp.",
+     ASSIGNEE_CHANGED: "👤 Vừa được gán cho bạn.",
+}
+ 
+# Các rule chỉ dựng được tin nhắn khi có data đi kèm (fix version, thời điểm đổi assignee...)
+_RULES_NEEDING_DATA = frozenset((PRE_VERSION_REMINDER, POST_VERSION_ALERT, ASSIGNEE_CHANGED))
+ 
+def _message_context(task: dict, data: Optional[dict]) -> dict:
+     ctx = dict(data) if data else {}
+     ctx["key"] = task.get("key", "")
+     ctx["summary"] = task.get("summary", "")
+     ctx["url"] = task.get("task_url")
+     ctx["reporter"] = task.get("reporter_email") or ""
+     return ctx
+ 
 def build_message(task: dict, code: str, data: Optional[dict]) -> str:
      """Build message for a single rule."""
-     url = task.get("task_url")
-     if code == MISSING_LOGTIME:
-         return f"⚠️ Task {task['key']} ({task['summary']}) đã ở CI Testing một thời gian mà chưa có logtime. Vui lòng logtime: {url}"
-     if code == MISSING_DESCRIPTION:
-         reporter = task.get("reporter_email") or ""
-         return f"📝 Task {task['key']} ({task['summary']}) hiện chưa có description. Reporter: {reporter}. Vui lòng bổ sung: {url}"
-     if code == PRE_VERSION_REMINDER and data:
-         return f"⏰ Task {task['key']} thuộc Fix Version {data['fv_name']} sắp release trong {data['days']} ngày, chưa lên UAT. Vui lòng kiểm tra: {url}"
-     if code == POST_VERSION_ALERT and data:
-         return f"🚨 Task {task['key']} thuộc Fix Version {data['fv_name']} đã quá hạn release ({data['release_date']}) nhưng chưa lên Production. Kiểm tra gấp: {url}"
-     if code == ASSIGNEE_CHANGED and data:
-         return f"👤 Task {task['key']} ({task['summary']}) vừa được gán cho bạn. Vui lòng kiểm tra: {url}"
-     return f"ℹ️ Task {task['key']}: {url}"
+     template = _MESSAGE_TEMPLATES.get(code)
+     if template is None or (code in _RULES_NEEDING_DATA and not data):
+         return f"ℹ️ Task {task['key']}: {task.get('task_url')}"
+     return template.format_map(_message_context(task, data))
 
 def build_combined_message(task: dict, findings: List[Tuple[str, Optional[dict], str]]) -> str:
      """Build combined message for multiple rules of the same task."""
@@ -141,189 +330,214 @@ def build_combined_message(task: dict, findings: List[Tuple[str, Optional[dict],
      
      messages = []
      for code, data, _ in findings:
-         if code == MISSING_LOGTIME:
-             messages.append("⚠️ Đã ở CI Testing một thời gian mà chưa có logtime. Vui lòng logtime.")
-         elif code == MISSING_DESCRIPTION:
-             reporter = task.get("reporter_email") or ""
-             messages.append(f"📝 Chưa có description. Reporter: {reporter}. Vui lòng bổ sung.")
-         elif code == PRE_VERSION_REMINDER and data:
-             messages.append(f"⏰ Thuộc Fix Version {data['fv_name']} sắp release trong {data['days']} ngày, chưa lên UAT. Vui lòng kiểm tra.")
-         elif code == POST_VERSION_ALERT and data:
-             messages.append(f"🚨 Thuộc Fix Version {data['fv_name']} đã quá hạn release ({data['release_date']}) nhưng chưa lên Production. Kiểm tra gấp.")
-         elif code == ASSIGNEE_CHANGED and data:
-             messages.append("👤 Vừa được gán cho bạn.")
+         template = _COMBINED_TEMPLATES.get(code)
+         if template is None or (code in _RULES_NEEDING_DATA and not data):
+             continue
+         messages.append(template.format_map(_message_context(task, data)))
      
      if messages:
-         combined = f"Task {task_key} ({task_summary}):\n" + "\n".join(f"• {msg}" for msg in messages) + f"\n\nVui lòng kiểm tra: {url}"
-         return combined
+         bullets = "\n".join([f"• {msg}" for msg in messages])
+         return f"Task {task_key} ({task_summary}):\n{bullets}\n\nVui lòng kiểm tra: {url}"
      
      return f"ℹ️ Task {task_key}: {url}"
  
-def run_once():
-    load_dotenv()
-    jira_url = os.getenv("JIRA_URL")
-    jira_user = os.getenv("JIRA_USERNAME")
-    jira_token = os.getenv("JIRA_TOKEN")
-    jira_auth_type = os.getenv("JIRA_AUTH_TYPE", "basic").lower()
-    # FPT Chat API
-    chat_base_url = os.getenv("FPT_CHAT_BASE_URL", "https://api-chat.fpt.com/bot-external-api/ext-bot")
-    chat_bot_id = os.getenv("FPT_CHAT_BOT_ID", "")
-    schedule_minutes = int(os.getenv("SCHEDULE_INTERVAL_MINUTES", "15"))
-    employees_file = os.getenv("EMPLOYEES_FILE", "employees.csv")
-    #projects = [p.strip() for p in (os.getenv("JIRA_PROJECTS", "FC,FSS,PPFP").split(",")) if p.strip()]
-    projects = [p.strip() for p in (os.getenv("JIRA_PROJECTS", "PPFP").split(",")) if p.strip()]
-    history_path = os.getenv("REMINDER_HISTORY_FILE", "data/reminder_logs.csv")
+@dataclass(frozen=True, slots=True)
+class _RunContext:
+     """Tài nguyên chỉ-đọc dùng chung khi đánh giá các task trong một lượt chạy."""
+     chat_map: dict
+     sent_index: dict
+     now: datetime
+     resend_delta: timedelta
+     resend_after_hours: int
+     ci_wait: int
+     pre_days: int
+     assignee_change_wait: int
+ 
+def _process_task(task: dict, ctx: _RunContext) -> List[Tuple[str, List[str], str, Optional[str], str]]:
+     """Đánh giá rule cho một task, trả về các tin cần gửi (task_key, rule_codes, recipient_email, group_id, text)."""
+     pending_sends = []
+     # Đọc các trường dùng nhiều lần một lần duy nhất cho mỗi task
+     key = task.get("key")
+     summary = task.get("summary")
+     status = task.get("status")
+     assignee_email = task.get("assignee_email")
+     reporter_email = task.get("reporter_email")
+     logger.info(f"task {key} - {summary} - {assignee_email} - {reporter_email} - {status}")
+     print(f"[Bot] Evaluate task {key} status={status} assignee={assignee_email} reporter={reporter_email}")
+     # Evaluate rules
+     findings = []  # (code, data, recipient_email)
 
-    config_path = os.path.join(os.getcwd(), "rules_config.json")
-    config = _load_json(config_path) if os.path.exists(config_path) else {}
-    ci_wait = int(config.get("ci_testing_wait_minutes", 5))
-    pre_days = int(config.get("pre_version_days", 2))
-    resend_after_hours = int(config.get("resend_after_hours", 8))
-    assignee_change_wait = int(config.get("assignee_change_wait_minutes", 5))
-    domains_allowed = config.get("domains_allowed", ["FRT"])
+     r1 = evaluate_missing_logtime(task, ctx.ci_wait)
+     if r1:
+         logger.debug(f"Rule hit: MISSING_LOGTIME for {key}")
+         findings.append((MISSING_LOGTIME, None, assignee_email))
 
-    logger.info("Starting reminder run")
-    logger.debug(f"Jira URL: {jira_url}, user: {jira_user}, auth: {jira_auth_type}")
-    logger.debug(f"Projects: {projects}, schedule_minutes: {schedule_minutes}")
-    logger.debug(f"Config -> ci_wait: {ci_wait} min, pre_days: {pre_days}, resend_after_hours: {resend_after_hours}, assignee_change_wait: {assignee_change_wait} min")
-    logger.debug(f"Employees file: {employees_file}, history path: {history_path}")
+     r2 = evaluate_missing_description(task)
+     if r2:
+         logger.debug(f"Rule hit: MISSING_DESCRIPTION for {key}")
+         findings.append((MISSING_DESCRIPTION, None, reporter_email))
 
-    # Prepare services
-    jira = JiraClient(jira_url, jira_user, jira_token, projects, auth_type=jira_auth_type)
-    # Ping để xác nhận kết nối Jira
-    print(f"[Bot] Jira ping...")
-    jira.ping()
-    employees_df = _read_employees(employees_file)
-    history_rows = _load_history(history_path)
+     r3 = evaluate_pre_version_reminder(task, ctx.pre_days)
+     if isinstance(r3, dict):
+         logger.debug(f"Rule hit: PRE_VERSION_REMINDER for {key} -> {r3}")
+         findings.append((PRE_VERSION_REMINDER, r3, assignee_email))
 
-    # Fetch tasks updated recently
-    logger.info(f"Fetching tasks updated in last {schedule_minutes} minutes for projects {projects}")
-    print(f"[Bot] Fetching tasks: last {schedule_minutes} minutes, projects={projects}")
-    tasks = jira.search_recent_tasks(schedule_minutes)
-    logger.info(f"Fetched {len(tasks)} tasks")
-    print(f"[Bot] Tasks fetched: {len(tasks)}")
+     r4 = evaluate_post_version_alert(task)
+     if isinstance(r4, dict):
+         # Send to assignee and leader if available; here we only handle assignee + optional reporter as leader fallback
+         logger.debug(f"Rule hit: POST_VERSION_ALERT for {key} -> {r4}")
+         findings.append((POST_VERSION_ALERT, r4, assignee_email))
 
-    count_attempt = 0
-    count_sent = 0
+     # Check assignee changed - last_assignee_changed_at đã được prefetch trước khi đánh giá
+     if assignee_email:
+         r5 = evaluate_assignee_changed(task, ctx.assignee_change_wait)
+         if isinstance(r5, dict):
+             logger.debug(f"Rule hit: ASSIGNEE_CHANGED for {key} -> {r5}")
+             findings.append((ASSIGNEE_CHANGED, r5, assignee_email))
 
-    for task in tasks:
-        logger.info(f"task {task.get('key')} - {task.get('summary')} - {task.get('assignee_email')} - {task.get('reporter_email')} - {task.get('status')}")
-        print(f"[Bot] Evaluate task {task.get('key')} status={task.get('status')} assignee={task.get('assignee_email')} reporter={task.get('reporter_email')}")
-        # Evaluate rules
-        findings = []  # (code, data, recipient_email)
+     print(f"[Bot] Findings for {key}: {len(findings)}")
+
+     # Normalize recipients and group findings by recipient
+     recipient_findings = {}  # recipient_email -> list of (code, data, recipient_email)
+     for code, data, recipient_email in findings:
+         if not recipient_email:
+             recipient_email = reporter_email
+         if not recipient_email:
+             logger.debug(f"Skip send: no recipient for task {key} rule {code}")
+             print(f"[Bot] Skip send {key} {code}: no recipient")
+             continue
+         
+         if recipient_email not in recipient_findings:
+             recipient_findings[recipient_email] = []
+         recipient_findings[recipient_email].append((code, data, recipient_email))
 
-        r1 = evaluate_missing_logtime(task, ci_wait)
-        if r1:
-            logger.debug(f"Rule hit: MISSING_LOGTIME for {task.get('key')}")
-            findings.append((MISSING_LOGTIME, None, task.get("assignee_email")))
+     # Send one combined message per recipient
+     for recipient_email, recipient_finding_list in recipient_findings.items():
+         # Check if any rule was already sent (use first rule for dedup check)
+         # Note: We check if ALL rules were sent, if any was sent recently, skip this recipient
+         should_skip = False
+         for code, data, _ in recipient_finding_list:
+             if _already_sent(ctx.sent_index, key, code, recipient_email, ctx.now, ctx.resend_delta):
+                 logger.debug(f"Skip send: rule {code} for task {key} already sent within last {ctx.resend_after_hours}h to {recipient_email}")
+                 should_skip = True
+                 break
+         
+         if should_skip:
+             print(f"[Bot] Skip send {key}: already sent to {recipient_email} within last {ctx.resend_after_hours}h")
+             continue
 
-        r2 = evaluate_missing_description(task)
-        if r2:
-            logger.debug(f"Rule hit: MISSING_DESCRIPTION for {task.get('key')}")
-            findings.append((MISSING_DESCRIPTION, None, task.get("reporter_email")))
+         # Build combined message
+         if len(recipient_finding_list) == 1:
+             # Single rule - use original message format
+             code, data, _ = recipient_finding_list[0]
+             text = build_message(task, code, data)
+             rule_codes = [code]
+         else:
+             # Multiple rules - use combined format
+             text = build_combined_message(task, recipient_finding_list)
+             rule_codes = [code for code, _, _ in recipient_finding_list]
 
-        r3 = evaluate_pre_version_reminder(task, pre_days)
-        if isinstance(r3, dict):
-            logger.debug(f"Rule hit: PRE_VERSION_REMINDER for {task.get('key')} -> {r3}")
-            findings.append((PRE_VERSION_REMINDER, r3, task.get("assignee_email")))
+         # mapping chat id
+         chat_id = _lookup_chat_id(ctx.chat_map, recipient_email) or recipient_email
+         group_id = chat_id if chat_id and chat_id != recipient_email else None
+         print(f"[Bot] Send -> task={key} rules={rule_codes} to={recipient_email} group={group_id}")
 
-        r4 = evaluate_post_version_alert(task)
-        if isinstance(r4, dict):
-            # Send to assignee and leader if available; here we only handle assignee + optional reporter as leader fallback
-            logger.debug(f"Rule hit: POST_VERSION_ALERT for {task.get('key')} -> {r4}")
-            findings.append((POST_VERSION_ALERT, r4, task.get("assignee_email")))
+         # Gom lại để gửi song song sau vòng lặp (mỗi lần gửi là một HTTP round trip)
+         pending_sends.append((key, rule_codes, recipient_email, group_id, text))
+
+     return pending_sends
+ 
+def run_once():
+    cfg = get_config()
+    logger.info("Starting reminder run")
+    logger.debug(f"Jira URL: {cfg.jira_url}, user: {cfg.jira_user}, auth: {cfg.jira_auth_type}")
+    logger.debug(f"Projects: {cfg.projects}, schedule_minutes: {cfg.schedule_minutes}")
+    logger.debug(f"Config -> ci_wait: {cfg.ci_wait} min, pre_days: {cfg.pre_days}, resend_after_hours: {cfg.resend_after_hours}, assignee_change_wait: {cfg.assignee_change_wait} min")
+    logger.debug(f"Employees file: {cfg.employees_file}, history path: {cfg.history_path}")
 
-        # Check assignee changed - need to get changelog info first
-        # Only check if task was recently updated to avoid unnecessary API calls
-        if task.get("assignee_email"):
-            # Lazy load last_assignee_changed_at only when needed
-            if task.get("last_assignee_changed_at") is None:
-                try:
-                    changed_at = jira.get_last_assignee_change(task.get("key"))
-                    task["last_assignee_changed_at"] = changed_at
-                except Exception as ex:
-                    logger.warning(f"Failed to get last assignee change for {task.get('key')}: {ex}")
-                    task["last_assignee_changed_at"] = None
-            
-            r5 = evaluate_assignee_changed(task, assignee_change_wait)
-            if isinstance(r5, dict):
-                logger.debug(f"Rule hit: ASSIGNEE_CHANGED for {task.get('key')} -> {r5}")
-                findings.append((ASSIGNEE_CHANGED, r5, task.get("assignee_email")))
+    # Prepare services (client Jira đóng file log/kết nối khi ra khỏi khối with)
+    with JiraClient(cfg.jira_url, cfg.jira_user, cfg.jira_token, cfg.projects, auth_type=cfg.jira_auth_type) as jira:
+        # Ping để xác nhận kết nối Jira
+        print(f"[Bot] Jira ping...")
+        jira.ping()
+        chat_map = _read_employees(cfg.employees_file)
+        sent_index = _build_sent_index(_load_history(cfg.history_path))
 
-        print(f"[Bot] Findings for {task.get('key')}: {len(findings)}")
+        # Fetch tasks updated recently
+        logger.info(f"Fetching tasks updated in last {cfg.schedule_minutes} minutes for projects {cfg.projects}")
+        print(f"[Bot] Fetching tasks: last {cfg.schedule_minutes} minutes, projects={cfg.projects}")
+        tasks = jira.search_recent_tasks(cfg.schedule_minutes)
+        logger.info(f"Fetched {len(tasks)} tasks")
+        print(f"[Bot] Tasks fetched: {len(tasks)}")
 
-        # Normalize recipients and group findings by recipient
-        recipient_findings = {}  # recipient_email -> list of (code, data, recipient_email)
-        for code, data, recipient_email in findings:
-            if not recipient_email:
-                recipient_email = task.get("reporter_email")
-            if not recipient_email:
-                logger.debug(f"Skip send: no recipient for task {task.get('key')} rule {code}")
-                print(f"[Bot] Skip send {task.get('key')} {code}: no recipient")
-                continue
-            
-            if recipient_email not in recipient_findings:
-                recipient_findings[recipient_email] = []
-            recipient_findings[recipient_email].append((code, data, recipient_email))
+        # Lấy changelog (đổi assignee) song song, chỉ cho các task mà rule ASSIGNEE_CHANGED còn có thể hit
+        assignee_keys = [
+            t.get("key") for t in tasks
+            if t.get("last_assignee_changed_at") is None and assignee_change_possible(t, cfg.assignee_change_wait)
+        ]
+        if assignee_keys:
+            logger.debug(f"Prefetching assignee changelog for {len(assignee_keys)} tasks")
+            assignee_changes = jira.prefetch_assignee_changes(assignee_keys)
+            for t in tasks:
+                if t.get("key") in assignee_changes:
+                    t["last_assignee_changed_at"] = assignee_changes[t.get("key")]
 
-        # Send one combined message per recipient
-        for recipient_email, recipient_finding_list in recipient_findings.items():
-            # Check if any rule was already sent (use first rule for dedup check)
-            # Note: We check if ALL rules were sent, if any was sent recently, skip this recipient
-            should_skip = False
-            for code, data, _ in recipient_finding_list:
-                if _already_sent(history_rows, task["key"], code, recipient_email, resend_after_hours):
-                    logger.debug(f"Skip send: rule {code} for task {task.get('key')} already sent within last {resend_after_hours}h to {recipient_email}")
-                    should_skip = True
-                    break
-            
-            if should_skip:
-                print(f"[Bot] Skip send {task.get('key')}: already sent to {recipient_email} within last {resend_after_hours}h")
-                continue
+    # Mốc thời gian và khoảng gửi lại dùng chung cho mọi lần kiểm tra trùng trong lượt chạy
+    now = datetime.now(timezone.utc)
+    resend_delta = timedelta(hours=cfg.resend_after_hours)
 
-            # Build combined message
-            if len(recipient_finding_list) == 1:
-                # Single rule - use original message format
-                code, data, _ = recipient_finding_list[0]
-                text = build_message(task, code, data)
-                rule_codes = [code]
-            else:
-                # Multiple rules - use combined format
-                text = build_combined_message(task, recipient_finding_list)
-                rule_codes = [code for code, _, _ in recipient_finding_list]
+    count_attempt = 0
+    count_sent = 0
+    pending_sends = []  # (task_key, rule_codes, recipient_email, group_id, text)
 
-            # mapping chat id
-            chat_id = _lookup_chat_id(employees_df, recipient_email) or recipient_email
-            print(f"[Bot] Send -> task={task.get('key')} rules={rule_codes} to={recipient_email} group={chat_id if chat_id and chat_id != recipient_email else None}")
+    ctx = _RunContext(
+        chat_map=chat_map,
+        sent_index=sent_index,
+        now=now,
+        resend_delta=resend_delta,
+        resend_after_hours=cfg.resend_after_hours,
+        ci_wait=cfg.ci_wait,
+        pre_days=cfg.pre_days,
+        assignee_change_wait=cfg.assignee_change_wait,
+    )
+    for task in tasks:
+        pending_sends.extend(_process_task(task, ctx))
 
+    if pending_sends:
+        send_items = []
+        for task_key, rule_codes, recipient_email, group_id, text in pending_sends:
             # Attempt send: try by email first; if fails, fallback to groupId (from employees.csv chat_id column)
-            logger.info(f"Sending combined message for {task.get('key')} rules {rule_codes} to {recipient_email} (group_id: {chat_id if chat_id and chat_id != recipient_email else None})")
-            ok, resp = send_message_fpt(
-                chat_base_url,
-                chat_bot_id,
-                text,
-                user_emails=[recipient_email] if recipient_email else None,
-                group_id=chat_id if chat_id and chat_id != recipient_email else None,
-            )
-            count_attempt += 1
-            if ok:
-                count_sent += 1
-                logger.info(f"Sent OK for {task.get('key')} rules {rule_codes} to {recipient_email}")
-            else:
-                logger.warning(f"Send FAILED for {task.get('key')} rules {rule_codes} to {recipient_email}")
-            logger.debug(f"Send response: {resp}")
+            logger.info(f"Sending combined message for {task_key} rules {rule_codes} to {recipient_email} (group_id: {group_id})")
+            send_items.append({
+                "base_url": cfg.chat_base_url,
+                "bot_id": cfg.chat_bot_id,
+                "text": text,
+                "user_emails": [recipient_email] if recipient_email else None,
+                "group_id": group_id,
+            })
+        # Ghi lịch sử ngay khi từng tin gửi xong (mỗi dòng một sent_at riêng): nếu tiến trình dừng giữa chừng,
+        # các tin đã gửi vẫn có trong lịch sử và không bị gửi lại ở lượt sau
+        with _history_writer(cfg.history_path) as history_writer:
+            for i, (ok, resp) in iter_send_message_fpt(send_items, max_workers=CHAT_SEND_WORKERS):
+                task_key, rule_codes, recipient_email, _, _ = pending_sends[i]
+                count_attempt += 1
+                if ok:
+                    count_sent += 1
+                    logger.info(f"Sent OK for {task_key} rules {rule_codes} to {recipient_email}")
+                else:
+                    logger.warning(f"Send FAILED for {task_key} rules {rule_codes} to {recipient_email}")
+                logger.debug(f"Send response: {resp}")
 
-            # Log history for each rule (to track individual rule sends)
-            for code, data, _ in recipient_finding_list:
-                record = {
-                    "task_key": task["key"],
-                    "rule_type": code,
+                # Một dòng lịch sử cho mỗi lần gửi; tin nhắn gộp ghi danh sách rule dạng JSON
+                history_writer.writerow({
+                    "task_key": task_key,
+                    "rule_type": rule_codes[0] if len(rule_codes) == 1 else json.dumps(rule_codes),
                     "to": recipient_email,
                     "sent_at": datetime.now(timezone.utc).isoformat(),
                     "status": "sent" if ok else "failed",
                     "response": json.dumps(resp) if isinstance(resp, dict) else str(resp),
-                }
-                _append_history(history_path, record)
+                })
+        logger.debug(f"Appended history for {count_attempt} sends to {cfg.history_path}")
 
     logger.info(f"Attempts: {count_attempt}, Sent: {count_sent}")
  
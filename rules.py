@@ -118,6 +118,34 @@ def evaluate_post_version_alert(task):
     return None
 
 
+# Các định dạng thời gian Jira trả về (changelog.created, fields.updated)
+_JIRA_TS_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S")
+
+
+def assignee_change_possible(task, assignee_change_wait_minutes):
+    """
+    Kiểm tra nhanh (không cần changelog) xem evaluate_assignee_changed có thể hit hay không.
+    Đổi assignee luôn làm thay đổi 'updated' của issue, nên nếu issue không được cập nhật
+    trong X phút gần đây thì chắc chắn không có lần đổi assignee nào trong X phút.
+    Trả về True khi không đủ dữ liệu để loại trừ (để không bỏ sót).
+    """
+    if not task.get("assignee_email"):
+        return False
+    updated_str = task.get("updated_at")
+    if not updated_str:
+        return True
+    for fmt in _JIRA_TS_FORMATS:
+        try:
+            updated = datetime.strptime(updated_str, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        return True
+    now = datetime.now(updated.tzinfo) if updated.tzinfo else datetime.now()
+    return now - updated <= timedelta(minutes=assignee_change_wait_minutes)
+
+
 def evaluate_assignee_changed(task, assignee_change_wait_minutes):
     """
     Kiểm tra nếu assignee được thay đổi trong vòng X phút.
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+import requests
+
+import chat_api
+
+
+class _Response:
+    def __init__(self, status_code, body=""):
+        self.status_code = status_code
+        self.text = body
+        self.content = body.encode("utf-8")
+        self.headers = {"Content-Length": str(len(self.content))}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Thay _SESSION.post bằng kịch bản phản hồi cố định; ghi lại payload của từng lần gửi, không sleep thật."""
+    calls = []
+    script = []
+
+    def post(url, data=None, headers=None, timeout=None, **kwargs):
+        calls.append(json.loads(data))
+        result = script.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.delenv("FPT_CHAT_HTTP2", raising=False)
+    chat_api._http2_client.cache_clear()
+    monkeypatch.setattr(chat_api._SESSION, "post", post)
+    monkeypatch.setattr(chat_api.time, "sleep", lambda seconds: None)
+    yield script, calls
+    chat_api._http2_client.cache_clear()
+
+
+def test_unrecoverable_status_is_not_retried(transport):
+    script, calls = transport
+    script.extend([_Response(403, "forbidden")] * 3)
+    ok, result = chat_api.send_message_fpt("http://chat", "bot", "hi", user_emails=["a@fpt.com"], max_retries=3)
+    assert not ok
+    assert result == {"status": 403, "detail": "forbidden"}
+    assert len(calls) == 1
+
+
+def test_server_errors_are_retried_until_success(transport):
+    script, calls = transport
+    script.extend([_Response(500, "e"), requests.ConnectionError("reset"), _Response(200, '{"id": 1}')])
+    ok, result = chat_api.send_message_fpt("http://chat", "bot", "hi", group_id="g1", max_retries=3)
+    assert ok
+    assert result == {"id": 1}
+    assert len(calls) == 3
+
+
+def test_email_not_found_falls_back_to_group(transport):
+    script, calls = transport
+    script.extend([_Response(404, "no user"), _Response(204)])
+    ok, result = chat_api.send_message_fpt("http://chat", "bot", "hi", user_emails=["a@fpt.com"], group_id="g1")
+    assert ok
+    assert result == {"status": 204}
+    assert calls == [{"userEmails": ["a@fpt.com"], "text": "hi"}, {"groupId": "g1", "text": "hi"}]
+
+
+def test_backoff_is_capped_with_jitter():
+    for attempt in range(1, 10):
+        delay = chat_api._backoff(attempt)
+        base = min(chat_api.BACKOFF_MAX_SECONDS, chat_api.BACKOFF_BASE_SECONDS * 2 ** attempt)
+        assert base <= delay <= base * 1.5
+
+
+def test_encode_payload_writes_nan_as_null_in_both_branches(monkeypatch):
+    payload = {"text": "hi", "extra": {"ratio": float("nan"), "values": [1.5, float("inf")]}}
+    expected = {"text": "hi", "extra": {"ratio": None, "values": [1.5, None]}}
+    monkeypatch.setattr(chat_api, "orjson", None)
+    assert json.loads(chat_api._encode_payload(payload)) == expected
+    orjson = pytest.importorskip("orjson")
+    monkeypatch.setattr(chat_api, "orjson", orjson)
+    assert json.loads(chat_api._encode_payload(payload)) == expected
@@ -0,0 +1,46 @@
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from reminder_bot import _load_employees_cache, _read_employees
+
+
+def _write_employees_xlsx(path):
+    pd.DataFrame({"email": ["A@fpt.com", "b@fpt.com"], "chat_id": ["101", "g2"]}).to_excel(path, index=False)
+
+
+def test_excel_is_cached_as_json(tmp_path):
+    path = tmp_path / "employees.xlsx"
+    _write_employees_xlsx(path)
+    chat_map = _read_employees(str(path))
+    assert chat_map == {"a@fpt.com": "101", "b@fpt.com": "g2"}
+    cache_path = str(path) + ".cache.json"
+    with open(cache_path, encoding="utf-8") as f:
+        assert json.load(f) == chat_map
+    # Không để lại file tạm sau khi ghi
+    assert sorted(os.listdir(tmp_path)) == ["employees.xlsx", "employees.xlsx.cache.json"]
+    assert _load_employees_cache(str(path), cache_path) == chat_map
+
+
+def test_bad_cache_is_a_miss(tmp_path):
+    path = tmp_path / "employees.xlsx"
+    _write_employees_xlsx(path)
+    cache_path = str(path) + ".cache.json"
+    bad_caches = [
+        b"\x80\x09garbage",  # "unsupported pickle protocol" với pickle cũ
+        pickle.dumps({"a@fpt.com": "101"}),
+        b"{not json",
+        json.dumps(["a@fpt.com"]).encode(),
+        json.dumps({"a@fpt.com": 101}).encode(),
+    ]
+    for payload in bad_caches:
+        with open(cache_path, "wb") as f:
+            f.write(payload)
+        assert _load_employees_cache(str(path), cache_path) is None
+    # Cache hỏng thì đọc lại Excel và ghi đè cache
+    assert _read_employees(str(path)) == {"a@fpt.com": "101", "b@fpt.com": "g2"}
+    # Cache cũ hơn file nguồn cũng bị bỏ qua
+    os.utime(cache_path, (0, 0))
+    assert _load_employees_cache(str(path), cache_path) is None
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from reminder_bot import (
+    HISTORY_FIELDS,
+    _UNKNOWN_SENT_AT,
+    _already_sent,
+    _build_sent_index,
+    _history_writer,
+    _load_history,
+    _parse_sent_at,
+    _row_rule_types,
+)
+from rules import MISSING_LOGTIME, MISSING_DESCRIPTION, PRE_VERSION_REMINDER
+
+NOW = datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc)
+RESEND = timedelta(hours=24)
+
+
+def _write_history(path, rows):
+    lines = [",".join(HISTORY_FIELDS)]
+    lines += [",".join(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_row_rule_types_scalar_and_json_list():
+    assert _row_rule_types({"rule_type": MISSING_LOGTIME}) == [MISSING_LOGTIME]
+    row = {"rule_type": f'["{MISSING_LOGTIME}", "{MISSING_DESCRIPTION}"]'}
+    assert _row_rule_types(row) == [MISSING_LOGTIME, MISSING_DESCRIPTION]
+    # JSON hỏng thì giữ nguyên chuỗi như một rule đơn
+    assert _row_rule_types({"rule_type": "[broken"}) == ["[broken"]
+
+
+def test_parse_sent_at_naive_is_utc_and_garbage_is_sentinel():
+    assert _parse_sent_at("2025-10-01T10:00:00") == datetime(2025, 10, 1, 10, 0, tzinfo=timezone.utc)
+    assert _parse_sent_at("not a date") is _UNKNOWN_SENT_AT
+    assert _parse_sent_at(None) is _UNKNOWN_SENT_AT
+
+
+def test_history_old_and_new_rows_drive_already_sent(tmp_path):
+    path = tmp_path / "reminder_logs.csv"
+    recent = (NOW - timedelta(hours=2)).isoformat()
+    old = (NOW - timedelta(hours=48)).isoformat()
+    _write_history(path, [
+        # Định dạng cũ: một rule mỗi dòng
+        ["FC-1", MISSING_LOGTIME, "a@fpt.com", recent, "sent", "{}"],
+        ["FC-2", MISSING_LOGTIME, "a@fpt.com", old, "sent", "{}"],
+        # Định dạng mới: tin nhắn gộp, rule_type là JSON list (cần quote vì có dấu phẩy)
+        ["FC-3", f'"[""{MISSING_LOGTIME}"", ""{MISSING_DESCRIPTION}""]"', "b@fpt.com", recent, "sent", "{}"],
+        # sent_at không đọc được
+        ["FC-4", PRE_VERSION_REMINDER, "c@fpt.com", "???", "sent", "{}"],
+    ])
+    index = _build_sent_index(_load_history(str(path)))
+
+    assert _already_sent(index, "FC-1", MISSING_LOGTIME, "a@fpt.com", NOW, RESEND)
+    assert not _already_sent(index, "FC-1", MISSING_DESCRIPTION, "a@fpt.com", NOW, RESEND)
+    assert not _already_sent(index, "FC-1", MISSING_LOGTIME, "other@fpt.com", NOW, RESEND)
+    # Đã quá resend_after_hours thì được gửi lại
+    assert not _already_sent(index, "FC-2", MISSING_LOGTIME, "a@fpt.com", NOW, RESEND)
+    # Dòng gộp chặn gửi lại từng rule trong list
+    assert _already_sent(index, "FC-3", MISSING_LOGTIME, "b@fpt.com", NOW, RESEND)
+    assert _already_sent(index, "FC-3", MISSING_DESCRIPTION, "b@fpt.com", NOW, RESEND)
+    assert not _already_sent(index, "FC-3", PRE_VERSION_REMINDER, "b@fpt.com", NOW, RESEND)
+    # sent_at không đọc được: coi như vừa gửi, không bao giờ gửi lại
+    assert index[("FC-4", PRE_VERSION_REMINDER, "c@fpt.com")] is _UNKNOWN_SENT_AT
+    assert _already_sent(index, "FC-4", PRE_VERSION_REMINDER, "c@fpt.com", NOW + timedelta(days=365), RESEND)
+
+
+def test_history_writer_round_trips_combined_rows(tmp_path):
+    path = tmp_path / "data" / "reminder_logs.csv"
+    sent_at = (NOW - timedelta(hours=1)).isoformat()
+    with _history_writer(str(path)) as writer:
+        writer.writerow({"task_key": "FC-5", "rule_type": MISSING_LOGTIME, "to": "a@fpt.com",
+                         "sent_at": sent_at, "status": "sent", "response": "{}"})
+    with _history_writer(str(path)) as writer:
+        writer.writerow({"task_key": "FC-5", "rule_type": json.dumps([MISSING_DESCRIPTION, PRE_VERSION_REMINDER]),
+                         "to": "a@fpt.com", "sent_at": sent_at, "status": "sent", "response": "{}"})
+    lines = path.read_text(encoding="utf-8").splitlines()
+    # Header chỉ ghi một lần dù mở file hai lần
+    assert lines[0] == ",".join(HISTORY_FIELDS) and len(lines) == 3
+    index = _build_sent_index(_load_history(str(path)))
+    for rule in (MISSING_LOGTIME, MISSING_DESCRIPTION, PRE_VERSION_REMINDER):
+        assert _already_sent(index, "FC-5", rule, "a@fpt.com", NOW, RESEND)
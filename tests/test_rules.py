@@ -4,6 +4,7 @@ from rules import (
     evaluate_missing_description,
     evaluate_pre_version_reminder,
     evaluate_post_version_alert,
+    assignee_change_possible,
     MISSING_LOGTIME,
     MISSING_DESCRIPTION,
     PRE_VERSION_REMINDER,
@@ -47,3 +48,15 @@ def test_post_version_alert_after_release():
     res = evaluate_post_version_alert(task)
     assert isinstance(res, dict) and res["code"] == POST_VERSION_ALERT
 
+
+
+def test_assignee_change_possible_recently_updated():
+    updated = (datetime.now(timezone.utc) - timedelta(minutes=2)).strftime("%Y-%m-%dT%H:%M:%S.000%z")
+    task = {"assignee_email": "a@fpt.com", "updated_at": updated}
+    assert assignee_change_possible(task, 5) is True
+
+
+def test_assignee_change_not_possible_when_stale_or_unassigned():
+    updated = (datetime.now(timezone.utc) - timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%S.000%z")
+    assert assignee_change_possible({"assignee_email": "a@fpt.com", "updated_at": updated}, 5) is False
+    assert assignee_change_possible({"assignee_email": "", "updated_at": updated}, 5) is False
@@ -0,0 +1,54 @@
+import get_lc_tasks_with_worklog_final as glc
+
+
+def _make_tasks():
+    # Ô NAME trống trong file Excel -> NaN; dự án None cũng phải gộp được như vòng lặp Python
+    nan = float("nan")
+    names = ["An", "Bình", nan, "An", None, nan, "Cường", "Bình", nan]
+    projects = ["Ecom - A", "Ecom - A", "Misc", "Misc", None, "Ecom - A", None, "Misc", "FC"]
+    tasks = []
+    for i, (name, project) in enumerate(zip(names, projects)):
+        has_worklog = i % 3 != 0
+        estimate = [0, 2.5, 4, 8][i % 4]
+        total = 1.5 if has_worklog else 0
+        if not has_worklog:
+            saved = -1
+        elif not estimate:
+            saved = -2
+        else:
+            saved = estimate - total
+        tasks.append({
+            "key": f"T-{i}",
+            "actual_project": project,
+            "employee_name": name,
+            "employee_email": f"e{i}@fpt.com",
+            "has_worklog": has_worklog,
+            "original_estimate_hours": estimate,
+            "total_hours": total,
+            "time_saved_hours": saved,
+        })
+    return tasks
+
+
+def test_summary_vectorized_matches_loop_with_missing_names():
+    tasks = _make_tasks()
+    loop = glc._aggregate_summary_stats_loop(tasks)
+    vectorized = glc._aggregate_summary_stats_vectorized(tasks)
+    # So sánh cả thứ tự khóa (báo cáo ghi theo thứ tự xuất hiện đầu tiên)
+    for loop_part, vec_part in zip(loop, vectorized):
+        assert list(vec_part) == list(loop_part)
+    assert vectorized == loop
+
+
+def test_summary_report_uses_vectorized_path_above_threshold(tmp_path, monkeypatch):
+    tasks = [t for t in _make_tasks() if isinstance(t["employee_name"], str) and t["actual_project"]]
+    results = []
+    for threshold in (10 ** 9, 0):
+        monkeypatch.setattr(glc, "VECTORIZE_MIN_TASKS", threshold)
+        txt = tmp_path / f"summary_{threshold}.txt"
+        csv_file = tmp_path / f"summary_{threshold}.csv"
+        stats = glc.create_projects_summary_report([dict(t) for t in tasks], str(txt), str(csv_file))
+        report = [line for line in txt.read_text(encoding="utf-8").splitlines() if "Thời gian tạo" not in line]
+        results.append((stats, report, csv_file.read_text(encoding="utf-8")))
+    assert results[0][0] is not None
+    assert results[1] == results[0]